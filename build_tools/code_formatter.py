@@ -171,46 +171,52 @@ class code_formatter(metaclass=code_formatter_meta):
         self._data = []
 
     def write(self, *args):
-        f = open(os.path.join(*args), "w")
-        name, extension = os.path.splitext(f.name)
+        path = os.path.join(*args)
+        name, extension = os.path.splitext(path)
 
         # Add a comment to inform which file generated the generated file
         # to make it easier to backtrack and modify generated code
         frame = inspect.currentframe().f_back
         if re.match(r"^\.(cc|hh|c|h)$", extension) is not None:
-            f.write(
-                f"""/**
+            header = f"""/**
  * DO NOT EDIT THIS FILE!
  * File automatically generated by
  *   {frame.f_code.co_filename}:{frame.f_lineno}
  */
 
 """
-            )
         elif re.match(r"^\.py$", extension) is not None:
-            f.write(
-                f"""#
+            header = f"""#
 # DO NOT EDIT THIS FILE!
 # File automatically generated by
 #   {frame.f_code.co_filename}:{frame.f_lineno}
 #
 
 """
-            )
         elif re.match(r"^\.html$", extension) is not None:
-            f.write(
-                f"""<!--
+            header = f"""<!--
  DO NOT EDIT THIS FILE!
  File automatically generated by
    {frame.f_code.co_filename}:{frame.f_lineno}
 -->
 
 """
-            )
+        else:
+            header = ""
+
+        contents = header + "".join(self._data)
+
+        # Leave a file with the same contents untouched, so that its
+        # timestamp doesn't change and what depends on it isn't rebuilt
+        try:
+            with open(path) as f:
+                if f.read() == contents:
+                    return
+        except (OSError, UnicodeDecodeError):
+            pass
 
-        for data in self._data:
-            f.write(data)
-        f.close()
+        with open(path, "w") as f:
+            f.write(contents)
 
     def __str__(self):
         data = "".join(self._data)
@@ -0,0 +1,460 @@
+"""Content-addressed cache of fast-forward checkpoints for the SPEC launchers.
+
+Every permutation of a sweep fast-forwards the same binary with the same
+options before switching to the detailed CPU. This module lets a launcher
+fast-forward each benchmark once, store the resulting checkpoint under a key
+derived from everything that influences the fast-forwarded state, and have
+every permutation restore it through `--checkpoint-restore`.
+
+A restored run is not the same experiment as a run that fast-forwards
+itself: its caches are cold when the detailed CPU starts. The cache is
+therefore opt-in and the launchers keep the jobs and stats of restored runs
+apart from the others.
+
+Layout of the cache directory:
+
+    <root>/<key>/cpt.<bench>.<fast_forward>/   gem5 checkpoint
+    <root>/<key>/meta.json                    what the key was built from
+    <root>/locks/<key>.lock                   per-entry flock
+
+Entries are filled in a temporary directory and renamed into place, so a
+reader never sees a partial checkpoint. Writers hold an exclusive lock on the
+entry while filling it and runs hold a shared lock while restoring from it,
+which keeps eviction from deleting a checkpoint that is still in use.
+Eviction removes the least recently used entries once the cache grows past
+its size limit, except the entries pinned by this process, i.e. those that
+runs of the current session are restoring or about to restore.
+"""
+
+import contextlib
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import time
+
+_digest_memo = {}
+
+
+def file_digest(path):
+    """Returns the sha256 hex digest of a file, memoized per (size, mtime)."""
+    st = os.stat(path)
+    memo_key = (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _digest_memo:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _digest_memo[memo_key] = h.hexdigest()
+    return _digest_memo[memo_key]
+
+
+def input_files(run_dir, opts):
+    """Returns the files in `run_dir` that the benchmark options refer to.
+
+    Any token of `opts` (including a `<` stdin redirect) that names an
+    existing regular file relative to the run directory is treated as an
+    input of the benchmark.
+    """
+    files = []
+    for token in shlex.split(opts or ""):
+        token = token.lstrip("<")
+        if not token:
+            continue
+        path = os.path.join(run_dir, token)
+        if os.path.isfile(path):
+            files.append(path)
+    return sorted(set(files))
+
+
+def _dir_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class CheckpointCache:
+    """A directory of fast-forward checkpoints shared between workers.
+
+    :param root: Directory holding the cache entries.
+    :param max_bytes: Size limit for the whole cache. Least recently used
+        entries are evicted once it is exceeded. `None` disables eviction.
+    """
+
+    def __init__(self, root, max_bytes=None):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.pinned = set()
+        os.makedirs(os.path.join(self.root, "locks"), exist_ok=True)
+
+    def key(self, binary, opts, inputs, fast_forward, extra=None):
+        """Returns the cache key of a fast-forwarded benchmark.
+
+        :param binary: Path to the benchmark binary.
+        :param opts: Benchmark command line options.
+        :param inputs: Input files read by the benchmark.
+        :param fast_forward: Number of fast-forwarded instructions.
+        :param extra: Any other JSON-serializable state that changes the
+            checkpoint, e.g. the gem5 binary or the config script.
+        """
+        description = {
+            "binary": file_digest(binary),
+            "opts": opts or "",
+            "inputs": {
+                os.path.basename(f): file_digest(f) for f in sorted(inputs)
+            },
+            "fast_forward": int(fast_forward),
+            "extra": extra or {},
+        }
+        blob = json.dumps(description, sort_keys=True).encode()
+        return hashlib.sha256(blob).hexdigest()[:32]
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def _lock_path(self, key):
+        return os.path.join(self.root, "locks", f"{key}.lock")
+
+    @contextlib.contextmanager
+    def _lock(self, path, mode, blocking=True):
+        with open(path, "a") as f:
+            flags = mode if blocking else mode | fcntl.LOCK_NB
+            try:
+                fcntl.flock(f, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def pin(self, keys):
+        """Keeps this process from evicting the entries `keys`.
+
+        The cache may grow past its size limit while they are pinned.
+        """
+        self.pinned.update(keys)
+
+    def unpin(self, keys):
+        """Lets this process evict the entries `keys` again."""
+        self.pinned.difference_update(keys)
+
+    def contains(self, key):
+        return os.path.isfile(os.path.join(self.entry_dir(key), "meta.json"))
+
+    def fill(self, key, fill_fn, meta=None):
+        """Makes sure the entry `key` exists, creating it if needed.
+
+        `fill_fn(tmp_dir)` is called at most once across all concurrent
+        workers and must leave the checkpoint directory inside `tmp_dir`.
+        It returns True on success. Returns the entry directory, or None if
+        the fill failed.
+        """
+        with self._lock(self._lock_path(key), fcntl.LOCK_EX):
+            entry = self.entry_dir(key)
+            if self.contains(key):
+                os.utime(entry)
+                return entry
+
+            tmp_dir = f"{entry}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            start = time.time()
+            if not fill_fn(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return None
+
+            meta = dict(meta or {})
+            meta.update(
+                {
+                    "key": key,
+                    "created": time.time(),
+                    "fill_seconds": time.time() - start,
+                    "bytes": _dir_size(tmp_dir),
+                }
+            )
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump(meta, f, indent=4)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.rename(tmp_dir, entry)
+
+        self.evict(keep=key)
+        return entry
+
+    @contextlib.contextmanager
+    def use(self, key):
+        """Holds the entry `key` for the duration of a restoring run.
+
+        Yields the entry directory, or None if the entry does not exist.
+        """
+        with self._lock(self._lock_path(key), fcntl.LOCK_SH):
+            if not self.contains(key):
+                yield None
+                return
+            entry = self.entry_dir(key)
+            os.utime(entry)
+            yield entry
+
+    def entries(self):
+        """Returns (last_used, bytes, key) for every complete entry."""
+        result = []
+        for key in os.listdir(self.root):
+            if key == "locks" or ".tmp-" in key or not self.contains(key):
+                continue
+            entry = self.entry_dir(key)
+            try:
+                with open(os.path.join(entry, "meta.json")) as f:
+                    size = json.load(f).get("bytes")
+                if size is None:
+                    size = _dir_size(entry)
+                result.append((os.stat(entry).st_mtime, size, key))
+            except (OSError, ValueError):
+                continue
+        return result
+
+    def evict(self, keep=None):
+        """Drops least recently used entries until the cache fits its limit.
+
+        Entries that are being filled or restored from, as well as pinned
+        entries, are skipped.
+        """
+        if self.max_bytes is None:
+            return []
+
+        evicted = []
+        evict_lock = os.path.join(self.root, "locks", "evict.lock")
+        with self._lock(evict_lock, fcntl.LOCK_EX):
+            entries = sorted(self.entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in entries:
+                if total <= self.max_bytes:
+                    break
+                if key == keep or key in self.pinned:
+                    continue
+                with self._lock(
+                    self._lock_path(key), fcntl.LOCK_EX, blocking=False
+                ) as locked:
+                    if not locked:
+                        continue
+                    shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+                total -= size
+                evicted.append(key)
+        return evicted
+
+
+def fill_options(bench, fast_forward, ckpt_dir):
+    """Returns the config options that write a fast-forward checkpoint."""
+    return (
+        f" --fast-forward {int(fast_forward)} --fast-forward-checkpoint"
+        f" --bench {bench} --checkpoint-dir {ckpt_dir}"
+    )
+
+
+def restore_options(cache, key, bench, fast_forward):
+    """Returns the config options that replace `--fast-forward` in a run.
+
+    The run switches CPUs at the restored instruction, as it would after
+    fast-forwarding by itself, but with cold caches: the checkpoint does not
+    hold their contents, which the atomic CPU warmed up in a direct
+    fast-forward.
+    """
+    return (
+        f" --checkpoint-restore {int(fast_forward)} --at-instruction"
+        f" --switch-on-restore --bench {bench}"
+        f" --checkpoint-dir {cache.entry_dir(key)}"
+    )
+
+
+def add_arguments(parser):
+    """Adds the checkpoint cache options of the SPEC launchers to `parser`."""
+    parser.add_argument(
+        "--checkpoint-cache",
+        action="store_true",
+        default=False,
+        help="Restore the runs from cached fast-forward checkpoints instead of"
+        " fast forwarding every run. The restored runs start with cold caches,"
+        " so they are recorded as jobs and stats of their own",
+    )
+    parser.add_argument(
+        "--checkpoint-cache-dir",
+        default="runs/checkpoint_cache",
+        help="Directory of the shared fast-forward checkpoint cache",
+    )
+    parser.add_argument(
+        "--checkpoint-cache-gb",
+        type=float,
+        default=200,
+        help="Size limit of the fast-forward checkpoint cache in GB",
+    )
+    parser.add_argument(
+        "--checkpoint-cache-min-runs",
+        type=int,
+        default=3,
+        help="Runs of the sweep that have to share a fast-forward for it to"
+        " be cached. The others fast forward by themselves",
+    )
+
+
+class FastForwards:
+    """The fast-forward part of the runs of a SPEC launcher.
+
+    Without a cache every run fast-forwards itself. With one, the runs that
+    share a fast-forward with enough other runs restore a cached checkpoint
+    instead. A launcher first registers every run with `key`, then gets the
+    options of each run from `options`.
+
+    :param args: Parsed launcher options, see `add_arguments`.
+    :param root: Directory the cache directory is relative to.
+    :param gem5_bin: gem5 binary of the runs.
+    :param config_file: Config script of the runs.
+    :param trace_dir: Directory for the stdout and stderr of the fills, or
+        None to leave them on the terminal.
+    :param checkpoint_params: Names of the config parameters of the runs
+        that change the fast-forwarded state. They are passed to the fill
+        and are part of the key. None means every parameter.
+    """
+
+    def __init__(
+        self,
+        args,
+        root,
+        gem5_bin,
+        config_file,
+        trace_dir=None,
+        checkpoint_params=None,
+    ):
+        self.gem5_bin = gem5_bin
+        self.config_file = config_file
+        self.trace_dir = trace_dir
+        self.checkpoint_params = checkpoint_params
+        self.cache = None
+        self.fills = {}
+        self.runs = {}
+        if not args.checkpoint_cache:
+            return
+        self.cache = CheckpointCache(
+            os.path.join(root, args.checkpoint_cache_dir),
+            max_bytes=int(args.checkpoint_cache_gb * 2**30),
+        )
+        self.min_runs = args.checkpoint_cache_min_runs
+        self.extra = {
+            "gem5": file_digest(gem5_bin)
+            if os.path.isfile(gem5_bin)
+            else gem5_bin,
+            "config": file_digest(config_file),
+        }
+
+    def key(self, spec_cmd, path, bench, fast_forward, params):
+        """Registers a run and returns the cache key of its fast-forward.
+
+        The key is None without a cache or when the benchmark binary is
+        missing.
+
+        :param spec_cmd: SPEC benchmark command, with "bin" and "opts".
+        :param path: Run directory of the benchmark.
+        :param params: Config parameters of the run.
+        """
+        binary = path + spec_cmd["bin"]
+        if self.cache is None or not os.path.isfile(binary):
+            return None
+
+        fill_params = {
+            k: v
+            for k, v in params.items()
+            if self.checkpoint_params is None or k in self.checkpoint_params
+        }
+        opts = spec_cmd.get("opts", "")
+        key = self.cache.key(
+            binary,
+            opts,
+            input_files(path, opts),
+            fast_forward,
+            dict(self.extra, params=fill_params),
+        )
+        if key not in self.fills:
+            make_cmd = functools.partial(
+                self._fill_cmd,
+                key,
+                spec_cmd,
+                path,
+                bench,
+                fast_forward,
+                fill_params,
+            )
+            self.fills[key] = (bench, fast_forward, make_cmd)
+        self.runs[key] = self.runs.get(key, 0) + 1
+        return key
+
+    def options(self, key, bench, fast_forward):
+        """Returns the cache key and the fast-forward options of a run.
+
+        The key is None when the run fast-forwards itself, i.e. when `key`
+        is None or shared by fewer than `--checkpoint-cache-min-runs` runs.
+
+        :param key: Key of the run returned by `key`.
+        """
+        if key is None or self.runs[key] < self.min_runs:
+            return None, f" --fast-forward {fast_forward}"
+        return key, restore_options(self.cache, key, bench, fast_forward)
+
+    def _fill_cmd(
+        self, key, spec_cmd, path, bench, fast_forward, params, ckpt_dir
+    ):
+        cmd_str = f"(cd {path} && {self.gem5_bin} --outdir={ckpt_dir}/m5out/ "
+        cmd_str += f" {self.config_file} --cmd {spec_cmd['bin']} "
+        for k, v in params.items():
+            cmd_str += f"--{k} {v} "
+        cmd_str += ' --opts \\\\"{}\\\\"'.format(spec_cmd.get("opts", ""))
+        cmd_str += fill_options(bench, fast_forward, ckpt_dir) + ") "
+        if self.trace_dir is not None:
+            name = f"{self.trace_dir}/{bench}_ff{fast_forward}_{key[:8]}"
+            cmd_str += f"1> {name}.stdout 2> {name}.stderr"
+        return cmd_str
+
+    def fill(self, key, started=None):
+        """Creates the entry `key` if it is missing and pins it.
+
+        :param started: Optional callable called with the pid of the gem5
+            process filling the entry, which leads a session of its own.
+        :returns: True if the entry exists.
+        """
+        bench, fast_forward, make_cmd = self.fills[key]
+        cpt_name = f"cpt.{bench}.{int(fast_forward)}"
+
+        def run(tmp_dir):
+            proc = subprocess.Popen(
+                make_cmd(tmp_dir), shell=True, start_new_session=True
+            )
+            if started is not None:
+                started(proc.pid)
+            return proc.wait() == 0 and os.path.isdir(
+                os.path.join(tmp_dir, cpt_name)
+            )
+
+        # Pinned first, so filling another entry cannot evict it before the
+        # runs restoring it hold it
+        self.cache.pin([key])
+        meta = {"bench": bench, "fast_forward": int(fast_forward)}
+        return self.cache.fill(key, run, meta) is not None
+
+    def release(self, key):
+        """Unpins the entry `key` once no run of the session needs it, and
+        evicts entries if the cache is past its size limit."""
+        self.cache.unpin([key])
+        self.cache.evict()
+
+    def hold(self, key):
+        """Returns the `Job.hold` of a run restoring the entry `key`."""
+        if key is None:
+            return None
+        return functools.partial(self.cache.use, key)
@@ -658,6 +658,42 @@ def addCommonOptions(parser, default_isa: Optional[ISA] = None):
         help="""Treat value of --checkpoint-restore or --take-checkpoint as a
                 number of instructions.""",
     )
+    parser.add_argument(
+        "--fast-forward-checkpoint",
+        action="store_true",
+        default=False,
+        help="""Take a checkpoint named cpt.<bench>.<fast-forward> once
+                --fast-forward completes and exit without switching CPUs.
+                It can be restored with --checkpoint-restore <fast-forward>
+                --at-instruction.""",
+    )
+    parser.add_argument(
+        "--switch-on-restore",
+        action="store_true",
+        default=False,
+        help="""Switch CPUs as soon as --checkpoint-restore completes rather
+                than after 10000 ticks, so a run restoring a
+                --fast-forward-checkpoint switches at the same instruction as
+                one that fast-forwards by itself. The caches still start
+                cold, since the checkpoint does not hold their contents.""",
+    )
+    parser.add_argument(
+        "--fork-sweep",
+        default=None,
+        help="""JSON file listing permutations of the parameters of the
+                switch-in CPUs, e.g. [{"decodeToRenameDelay": 2}, ...].
+                The simulation fast-forwards once and then forks one process
+                per permutation, which switches to its own CPUs
+                (system.switch_cpus_p<N>) and writes to the "outdir" of the
+                permutation, by default <outdir>/sweep<N>.""",
+    )
+    parser.add_argument(
+        "--fork-sweep-jobs",
+        type=int,
+        default=None,
+        help="""Maximum number of --fork-sweep permutations simulated at
+                once. By default, the number of host CPUs.""",
+    )
     parser.add_argument(
         "--spec-input",
         default="ref",
@@ -37,6 +37,8 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import json
+import os
 import sys
 from os import getcwd
 from os.path import join as joinpath
@@ -471,6 +473,155 @@ def repeatSwitch(testsys, repeat_switch_cpu_list, maxtick, switch_freq):
             return exit_event
 
 
+def switchCpuParams(options):
+    """Returns the parameters of the switch-in CPUs set by the options."""
+    # NATHAN CODE TAKE OUT LATER MAYBE
+    # If options has an attribute called fetch2ToDecodeForwardDelay
+    # then we are using the switched out CPU
+    if hasattr(options, "fetch2ToDecodeForwardDelay"):
+        return dict(
+            fetch2ToDecodeForwardDelay=options.fetch2ToDecodeForwardDelay,
+            decodeToExecuteForwardDelay=options.decodeToExecuteForwardDelay,
+            executeBranchDelay=options.executeBranchDelay,
+        )
+    elif hasattr(options, "decodeToFetchDelay"):
+        return dict(
+            decodeToFetchDelay=options.decodeToFetchDelay,
+            renameToFetchDelay=options.renameToFetchDelay,
+            iewToFetchDelay=options.iewToFetchDelay,
+            commitToFetchDelay=options.commitToFetchDelay,
+            renameToDecodeDelay=options.renameToDecodeDelay,
+            iewToDecodeDelay=options.iewToDecodeDelay,
+            commitToDecodeDelay=options.commitToDecodeDelay,
+            fetchToDecodeDelay=options.fetchToDecodeDelay,
+            iewToRenameDelay=options.iewToRenameDelay,
+            commitToRenameDelay=options.commitToRenameDelay,
+            decodeToRenameDelay=options.decodeToRenameDelay,
+            commitToIEWDelay=options.commitToIEWDelay,
+            renameToIEWDelay=options.renameToIEWDelay,
+            issueToExecuteDelay=options.issueToExecuteDelay,
+            iewToCommitDelay=options.iewToCommitDelay,
+            renameToROBDelay=options.renameToROBDelay,
+            forwardComSize=options.forwardComSize,
+            backComSize=options.backComSize,
+        )
+    return {}
+
+
+def makeSwitchCpus(options, testsys, cpu_class, params={}):
+    """Creates switched out CPUs of cpu_class to take over from the CPUs of
+    testsys. params override the parameters set by the options."""
+    np = options.num_cpus
+    params = dict(switchCpuParams(options), **params)
+    switch_cpus = [
+        cpu_class(switched_out=True, cpu_id=(i), **params) for i in range(np)
+    ]
+
+    for i in range(np):
+        switch_cpus[i].system = testsys
+        switch_cpus[i].workload = testsys.cpu[i].workload
+        switch_cpus[i].clk_domain = testsys.cpu[i].clk_domain
+        switch_cpus[i].progress_interval = testsys.cpu[i].progress_interval
+        switch_cpus[i].isa = testsys.cpu[i].isa
+        # simulation period
+        if options.maxinsts:
+            switch_cpus[i].max_insts_any_thread = options.maxinsts
+        # Add checker cpu if selected
+        if options.checker:
+            switch_cpus[i].addCheckerCpu()
+        if options.bp_type:
+            bpClass = ObjectList.bp_list.get(options.bp_type)
+            switch_cpus[i].branchPred = bpClass()
+        if options.indirect_bp_type:
+            IndirectBPClass = ObjectList.indirect_bp_list.get(
+                options.indirect_bp_type
+            )
+            switch_cpus[i].branchPred.indirectBranchPred = IndirectBPClass()
+        switch_cpus[i].createThreads()
+
+    # If elastic tracing is enabled attach the elastic trace probe
+    # to the switch CPUs
+    if options.elastic_trace_en:
+        CpuConfig.config_etrace(cpu_class, switch_cpus, options)
+
+    return switch_cpus
+
+
+def loadForkSweep(path):
+    """Reads the permutations of a --fork-sweep file. Each permutation is a
+    JSON object mapping switch-in CPU parameters to their values, with an
+    optional "outdir" entry naming its output directory, relative to the
+    output directory of this simulation. Returns a list of (params, outdir)
+    pairs."""
+    with open(path) as f:
+        permutations = json.load(f)
+    if not isinstance(permutations, list) or not all(
+        isinstance(p, dict) for p in permutations
+    ):
+        fatal("%s must hold a JSON list of objects", path)
+
+    sweep = []
+    for i, permutation in enumerate(permutations):
+        params = dict(permutation)
+        outdir = params.pop("outdir", f"sweep{i}")
+        sweep.append((params, outdir))
+    return sweep
+
+
+def forkSweep(options, testsys, sweep, sweep_cpus):
+    """Forks one simulation per --fork-sweep permutation from the current
+    state, running at most --fork-sweep-jobs of them at once. Returns the
+    CPU switch list of the permutation in the child, and None in the parent
+    once all the children are done."""
+    max_jobs = options.fork_sweep_jobs or os.cpu_count() or 1
+    running = {}
+    failed = []
+
+    def wait():
+        pid, status = os.wait()
+        if pid in running:
+            i = running.pop(pid)
+            if status != 0:
+                failed.append(i)
+
+    for i, (params, outdir) in enumerate(sweep):
+        while len(running) >= max_jobs:
+            wait()
+
+        # Paths in the permutations are relative to the parent's outdir
+        simout = joinpath("%(parent)s", outdir.replace("%", "%%"))
+        # Don't let the children inherit buffered output
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = m5.fork(simout)
+        if pid == 0:
+            # Record which CPUs hold the stats of this permutation
+            with open(joinpath(m5.options.outdir, "sweep.json"), "w") as f:
+                json.dump(
+                    {
+                        "permutation": i,
+                        "params": params,
+                        "switch_cpus": f"{testsys.path()}.switch_cpus_p{i}",
+                    },
+                    f,
+                    indent=4,
+                )
+            return [
+                (testsys.cpu[j], cpu) for j, cpu in enumerate(sweep_cpus[i])
+            ]
+
+        print(f"Forked permutation {i} {params} as pid {pid}")
+        running[pid] = i
+
+    while running:
+        wait()
+
+    if failed:
+        fatal("Permutations %s of the sweep failed", sorted(failed))
+    print(f"All {len(sweep)} permutations of the sweep are done")
+    return None
+
+
 def run(options, root, testsys, cpu_class):
     if options.checkpoint_dir:
         cptdir = options.checkpoint_dir
@@ -482,6 +633,14 @@ def run(options, root, testsys, cpu_class):
     if options.fast_forward and options.checkpoint_restore != None:
         fatal("Can't specify both --fast-forward and --checkpoint-restore")
 
+    if options.fast_forward_checkpoint and not options.fast_forward:
+        fatal("--fast-forward-checkpoint requires --fast-forward")
+
+    if options.switch_on_restore and (
+        options.checkpoint_restore == None or not cpu_class
+    ):
+        fatal("--switch-on-restore requires switching CPUs after a restore")
+
     if options.standard_switch and not options.caches:
         fatal("Must specify --caches when using --standard-switch")
 
@@ -491,6 +650,23 @@ def run(options, root, testsys, cpu_class):
     if options.repeat_switch and options.take_checkpoints:
         fatal("Can't specify both --repeat-switch and --take-checkpoints")
 
+    if options.fork_sweep:
+        if not cpu_class:
+            fatal("--fork-sweep requires switching CPUs after --fast-forward")
+        if (
+            options.standard_switch
+            or options.repeat_switch
+            or options.simpoint
+            or options.fast_forward_checkpoint
+            or options.take_checkpoints != None
+            or options.take_simpoint_checkpoints != None
+        ):
+            fatal(
+                "Can't combine --fork-sweep with --standard-switch, "
+                "--repeat-switch, --simpoint, --fast-forward-checkpoint or "
+                "taking checkpoints"
+            )
+
     # Setup global stat filtering.
     stat_root_simobjs = []
     for stat_root_str in options.stats_root:
@@ -517,112 +693,26 @@ def run(options, root, testsys, cpu_class):
 
     # switching to a future class
     if cpu_class:
-        # NATHAN CODE TAKE OUT LATER MAYBE
-        # If options has an attribute called fetch2ToDecodeForwardDelay
-        # then we are using the switched out CPU
-        if hasattr(options, 'fetch2ToDecodeForwardDelay'):
-            # print(
-            #     "fetch2ToDecodeForwardDelay: ",
-            #     options.fetch2ToDecodeForwardDelay,
-            # )
-            # print(
-            #     "decodeToExecuteForwardDelay: ",
-            #     options.decodeToExecuteForwardDelay,
-            # )
-            # print("executeBranchDelay: ", options.executeBranchDelay)
-            switch_cpus = [
-                cpu_class(
-                    fetch2ToDecodeForwardDelay=options.fetch2ToDecodeForwardDelay,
-                    decodeToExecuteForwardDelay=options.decodeToExecuteForwardDelay,
-                    executeBranchDelay=options.executeBranchDelay,
-                    switched_out=True,
-                    cpu_id=(i),
-                )
-                for i in range(np)
-            ]
-        elif hasattr(options, 'decodeToFetchDelay'):  # NATHAN CODE TAKE OUT LATER MAYBE
-            # print("HELL YEAAAAA 2")
-            # print("decodeToFetchDelay: ", options.decodeToFetchDelay)
-            # print("renameToFetchDelay: ", options.renameToFetchDelay)
-            # print("iewToFetchDelay: ", options.iewToFetchDelay)
-            # print("commitToFetchDelay: ", options.commitToFetchDelay)
-            # print("renameToDecodeDelay: ", options.renameToDecodeDelay)
-            # print("iewToDecodeDelay: ", options.iewToDecodeDelay)
-            # print("commitToDecodeDelay: ", options.commitToDecodeDelay)
-            # print("fetchToDecodeDelay: ", options.fetchToDecodeDelay)
-            # print("iewToRenameDelay: ", options.iewToRenameDelay)cd 
-            # print("commitToRenameDelay: ", options.commitToRenameDelay)
-            # print("decodeToRenameDelay: ", options.decodeToRenameDelay)
-            # print("commitToIEWDelay: ", options.commitToIEWDelay)
-            # print("renameToIEWDelay: ", options.renameToIEWDelay)
-            # print("issueToExecuteDelay: ", options.issueToExecuteDelay)
-            # print("iewToCommitDelay: ", options.iewToCommitDelay)
-            # print("renameToROBDelay: ", options.renameToROBDelay)
-            switch_cpus = [
-                cpu_class(
-                    decodeToFetchDelay=options.decodeToFetchDelay,
-                    renameToFetchDelay=options.renameToFetchDelay,
-                    iewToFetchDelay=options.iewToFetchDelay,
-                    commitToFetchDelay=options.commitToFetchDelay,
-                    renameToDecodeDelay=options.renameToDecodeDelay,
-                    iewToDecodeDelay=options.iewToDecodeDelay,
-                    commitToDecodeDelay=options.commitToDecodeDelay,
-                    fetchToDecodeDelay=options.fetchToDecodeDelay,
-                    iewToRenameDelay=options.iewToRenameDelay,
-                    commitToRenameDelay=options.commitToRenameDelay,
-                    decodeToRenameDelay=options.decodeToRenameDelay,
-                    commitToIEWDelay=options.commitToIEWDelay,
-                    renameToIEWDelay=options.renameToIEWDelay,
-                    issueToExecuteDelay=options.issueToExecuteDelay,
-                    iewToCommitDelay=options.iewToCommitDelay,
-                    renameToROBDelay=options.renameToROBDelay,
-                    forwardComSize=options.forwardComSize,
-                    backComSize=options.backComSize,
-                    switched_out=True,
-                    cpu_id=(i),
-                )
-                for i in range(np)
-            ]
+        if options.fast_forward:
+            for i in range(np):
+                testsys.cpu[i].max_insts_any_thread = int(options.fast_forward)
 
+        if options.fork_sweep:
+            # One set of switched out CPUs per permutation. They all share
+            # the fast-forward and each is switched in by its own fork.
+            sweep = loadForkSweep(options.fork_sweep)
+            sweep_cpus = []
+            for i, (params, outdir) in enumerate(sweep):
+                cpus = makeSwitchCpus(options, testsys, cpu_class, params)
+                setattr(testsys, f"switch_cpus_p{i}", cpus)
+                sweep_cpus.append(cpus)
         else:
-            switch_cpus = [
-                cpu_class(switched_out=True, cpu_id=(i)) for i in range(np)
+            switch_cpus = makeSwitchCpus(options, testsys, cpu_class)
+            testsys.switch_cpus = switch_cpus
+            switch_cpu_list = [
+                (testsys.cpu[i], switch_cpus[i]) for i in range(np)
             ]
 
-        for i in range(np):
-            if options.fast_forward:
-                testsys.cpu[i].max_insts_any_thread = int(options.fast_forward)
-            switch_cpus[i].system = testsys
-            switch_cpus[i].workload = testsys.cpu[i].workload
-            switch_cpus[i].clk_domain = testsys.cpu[i].clk_domain
-            switch_cpus[i].progress_interval = testsys.cpu[i].progress_interval
-            switch_cpus[i].isa = testsys.cpu[i].isa
-            # simulation period
-            if options.maxinsts:
-                switch_cpus[i].max_insts_any_thread = options.maxinsts
-            # Add checker cpu if selected
-            if options.checker:
-                switch_cpus[i].addCheckerCpu()
-            if options.bp_type:
-                bpClass = ObjectList.bp_list.get(options.bp_type)
-                switch_cpus[i].branchPred = bpClass()
-            if options.indirect_bp_type:
-                IndirectBPClass = ObjectList.indirect_bp_list.get(
-                    options.indirect_bp_type
-                )
-                switch_cpus[
-                    i
-                ].branchPred.indirectBranchPred = IndirectBPClass()
-            switch_cpus[i].createThreads()
-
-        # If elastic tracing is enabled attach the elastic trace probe
-        # to the switch CPUs
-        if options.elastic_trace_en:
-            CpuConfig.config_etrace(cpu_class, switch_cpus, options)
-
-        testsys.switch_cpus = switch_cpus
-        switch_cpu_list = [(testsys.cpu[i], switch_cpus[i]) for i in range(np)]
-
     if options.repeat_switch:
         switch_class = getCPUClass(options.cpu_type)[0]
         if switch_class.require_caches() and not options.caches:
@@ -751,6 +841,9 @@ def run(options, root, testsys, cpu_class):
     if options.checkpoint_restore:
         cpt_starttick, checkpoint_dir = findCptDir(options, cptdir, testsys)
     root.apply_config(options.param)
+    if options.fork_sweep:
+        # The simulator can't be forked with listeners enabled
+        m5.disableAllListeners()
     m5.instantiate(checkpoint_dir)
 
     # Initialization is complete.  If we're not in control of simulation
@@ -816,9 +909,38 @@ def run(options, root, testsys, cpu_class):
                 % str(testsys.cpu[0].max_insts_any_thread)
             )
             exit_event = m5.simulate()
+        elif options.switch_on_restore:
+            # The restored state is already drained, switch right away like
+            # a run that fast-forwarded to the same instruction
+            print(f"Switch at restored tick {m5.curTick()}")
         else:
             print(f"Switch at curTick count:{str(10000)}")
             exit_event = m5.simulate(10000)
+
+        if options.fast_forward_checkpoint:
+            # Save the fast-forwarded state so detailed runs can restore it
+            # with --checkpoint-restore instead of repeating the warm-up.
+            if (
+                exit_event.getCause()
+                != "a thread reached the max instruction count"
+            ):
+                fatal(
+                    "Fast-forward ended early because %s",
+                    exit_event.getCause(),
+                )
+            m5.checkpoint(
+                joinpath(
+                    cptdir, f"cpt.{options.bench}.{int(options.fast_forward)}"
+                )
+            )
+            print(f"Fast-forward checkpoint written @ tick {m5.curTick()}")
+            return
+
+        if options.fork_sweep:
+            switch_cpu_list = forkSweep(options, testsys, sweep, sweep_cpus)
+            if switch_cpu_list is None:
+                return
+
         print(f"Switched CPUS @ tick {m5.curTick()}")
 
         m5.switchCpus(testsys, switch_cpu_list)
@@ -869,7 +991,7 @@ def run(options, root, testsys, cpu_class):
         restoreSimpointCheckpoint()
 
     else:
-        if options.fast_forward:
+        if options.fast_forward or options.switch_on_restore:
             m5.stats.reset()
         print("**** REAL SIMULATION ****")
 
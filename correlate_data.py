@@ -1,42 +1,44 @@
+import os
+
 import pandas as pd
 # import seaborn as sns
 import matplotlib.pyplot as plt
-from sklearn.preprocessing import StandardScaler
 
-# Load the stats from "after" simulations into a structured format
-# Replace 'path/to/stats.csv' with the actual path to your data file
-# Assumes a CSV file where each row corresponds to a simulation, and columns are stats and performance metrics
+from stats_correlate import correlate, rank_stability
+from stats_store import StatsStore
+
+# Load the performance metric of the "after" simulations
+# Assumes a CSV file where each row corresponds to a simulation, as written by
+# extract_all_data_v3.py. Only the id and the metric columns are read, the
+# stats themselves are streamed from the stats store.
 stats_file = 'cycle_counts.csv'
-data = pd.read_csv(stats_file)
+stats_dir = 'runs/chipletization/decode_to_rename_v3/stats'
 pd.set_option('display.max_rows', None)
 
 # Example structure of 'data':
-# | stat1 | stat2 | ... | cycle_count_percent_diff |
-# |-------|-------|-----|--------------------------|
-# |  val  |  val  | ... |            val           |
+# | simulation_id | cycle_count_percent_diff |
+# |---------------|--------------------------|
+# |      id       |            val           |
 
 # Set the column for performance degradation (percent difference in cycle counts)
 performance_column = 'percent_diff_cycles'
-
-# print("Missing values per column:")
-# print(data.isna().sum())
-
-# Exclude parameters that do not appear in all simulations
-# Drops columns with any missing values (NaNs)
-filtered_data = data.dropna(axis=1)
-
-# Initialize the scaler for Z-score normalization
-scaler = StandardScaler()
-
-# print(filtered_data.iloc[:,0:5])
-
-columns_to_normalize = filtered_data.columns[3:]  # Exclude the first 3 columns
-
-# Apply Z-score normalization
-filtered_data.loc[:, columns_to_normalize] = scaler.fit_transform(filtered_data[columns_to_normalize])
-
-# Compute correlations with the performance column
-correlations = filtered_data.corr()[performance_column]
+data = pd.read_csv(stats_file, usecols=['simulation_id', performance_column])
+
+# The stats of the "_2" simulation of each row
+store = StatsStore()
+store.ingest(stats_dir)
+runs = [
+    os.path.abspath(os.path.join(stats_dir, f"{simulation_id}_i1", "stats.txt"))
+    for simulation_id in data['simulation_id']
+]
+known = set(store.runs(under=stats_dir))
+data = data[[run in known for run in runs]]
+runs = [run for run in runs if run in known]
+
+# Correlate every stat with the performance column. Stats that do not appear
+# in all simulations are dropped, and z-score normalization is not needed as
+# it does not change correlations.
+correlations = correlate(store, data[performance_column].to_numpy(), runs)
 
 # Sort correlations
 sorted_correlations = correlations.sort_values()
@@ -58,6 +60,19 @@ else:
     print(f"{parameter_name} is not found in the data.")
 
 
+# Correlations within each benchmark, and whether the strongest ones rank the
+# same across the partitions
+benchmarks = data['simulation_id'].str.split('_').str[0].to_numpy()
+per_benchmark = correlate(store, data[performance_column].to_numpy(), runs, groups=benchmarks)
+if parameter_name in per_benchmark.index:
+    print(f"Correlation for {parameter_name} per benchmark:")
+    print(per_benchmark.loc[parameter_name])
+partitions = data['simulation_id'].str.split('_').str[2].to_numpy()
+per_partition = correlate(store, data[performance_column].to_numpy(), runs, groups=partitions)
+stability, agreement = rank_stability(per_partition, top=50)
+print(f"Rank agreement across partitions: {agreement:.3f}")
+print(stability.head(20))
+
 # # Visualize correlations using a heatmap
 # plt.figure(figsize=(10, 8))
 # sns.heatmap(correlations.to_frame(), annot=True, cmap='coolwarm', cbar=True)
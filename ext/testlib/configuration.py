@@ -330,6 +330,7 @@ def define_constants(constants):
     constants.gem5_binary_fixture_name = "gem5"
     constants.xml_filename = "results.xml"
     constants.pickle_filename = "results.pickle"
+    constants.durations_filename = "durations.json"
     constants.pickle_protocol = highest_pickle_protocol
 
     # The root directory which all test names will be based off of.
@@ -38,11 +38,21 @@
 #
 # Authors: Sean Wilson
 
-import multiprocessing.dummy
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
 import traceback
+from queue import Empty
 
 import testlib.helper as helper
 import testlib.log as log
+from testlib.configuration import (
+    config,
+    constants,
+)
 from testlib.fixture import SkipException
 from testlib.state import (
     Result,
@@ -171,13 +181,220 @@ class LibraryRunner(SuiteRunner):
     pass
 
 
+class SplitSuiteRunner(RunnerPattern):
+    """
+    Runs a suite whose tests are handed out one by one by the
+    :class:`LibraryParallelRunner`. The suite fixtures are built before its
+    tests run and torn down once they have all completed.
+    """
+
+    def setup(self):
+        """
+        Builds the suite fixtures. Returns False, after tearing them down, if
+        the tests of the suite are to be avoided.
+        """
+        self.avoided = False
+        try:
+            self.testable.status = Status.Building
+            self.builder.setup(self.testable)
+        except SkipException:
+            self.handle_skip(traceback.format_exc())
+            self.avoided = True
+        except BrokenFixtureException:
+            self.handle_error(traceback.format_exc())
+            self.avoided = True
+        else:
+            self.testable.status = Status.Running
+
+        if self.avoided:
+            self.finish()
+        return not self.avoided
+
+    def finish(self):
+        self.builder.post_test_procedure(self.testable)
+        self.testable.status = Status.TearingDown
+        self.builder.teardown(self.testable)
+
+        if self.avoided:
+            self.testable.status = Status.Avoided
+        else:
+            self.testable.result = compute_aggregate_result(
+                iter(self.testable)
+            )
+            self.testable.status = Status.Complete
+
+
+class DurationHistory:
+    """
+    Wall clock durations, by uid, of the suites and tests run by previous
+    :class:`LibraryParallelRunner` runs. They are kept as JSON in the
+    results directory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.durations = json.load(f)
+        except (OSError, ValueError):
+            self.durations = {}
+
+    def get(self, uid):
+        return self.durations.get(str(uid))
+
+    def record(self, uid, duration):
+        self.durations[str(uid)] = duration
+
+    def save(self):
+        helper.mkdir_p(os.path.dirname(self.path))
+        tmp_path = "%s.%d" % (self.path, os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump(self.durations, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
 class LibraryParallelRunner(RunnerPattern):
+    """
+    Runs the suites of the library in worker processes.
+
+    Suites with fixtures of their own are run as a whole, as their tests
+    share these fixtures. The tests of other suites are run one by one.
+    These work items are queued longest first, according to their duration
+    in previous runs, and every idle worker takes the next one. Items
+    without a previous duration are queued first, in load order.
+
+    Workers are forked once the global fixtures are built, so they share
+    them and only build the fixtures of their own items.
+    """
+
+    threads = 1
+
     def set_threads(self, threads):
         self.threads = threads
 
+    def set_history(self, history):
+        self.history = history
+
+    def _work_items(self):
+        """
+        Splits the library into work items. Returns the items, as
+        (suite, test or None) tuples, and the runners of the split suites.
+        """
+        items = []
+        split_suites = []
+        for suite in self.testable:
+            if (
+                suite.runner is SuiteRunner
+                and len(suite.tests) > 1
+                and all(fixture.is_global() for fixture in suite.fixtures)
+            ):
+                suite_runner = SplitSuiteRunner(suite)
+                split_suites.append(suite_runner)
+                if suite_runner.setup():
+                    items.extend((suite, test) for test in suite)
+            else:
+                items.append((suite, None))
+        return items, split_suites
+
+    def _expected_duration(self, item):
+        suite, test = item
+        duration = self.history.get((suite if test is None else test).uid)
+        return math.inf if duration is None else duration
+
+    def _work(self, queue, outcomes):
+        while True:
+            index = queue.get()
+            if index is None:
+                return
+            suite, test = self.items[index]
+            testable = suite if test is None else test
+
+            start = time.monotonic()
+            testable.runner(testable).run()
+            duration = time.monotonic() - start
+
+            metadata = [testable.metadata]
+            metadata.extend(child.metadata for child in testable)
+            outcomes.put((index, duration, metadata))
+
+    def _complete(self, index, duration, metadata):
+        """
+        Updates the parent copies of the items run by a worker. Their
+        records have already been logged by the worker.
+        """
+        suite, test = self.items[index]
+        testable = suite if test is None else test
+        for loaded, updated in zip(
+            itertools.chain((testable,), testable), metadata
+        ):
+            vars(loaded.metadata).update(vars(updated))
+        self.history.record(testable.uid, duration)
+
+    def _abandon(self, index):
+        suite, test = self.items[index]
+        testable = suite if test is None else test
+        reason = "Worker process exited while running %s" % testable.uid
+        for abandoned_test in testable if test is None else (test,):
+            abandoned_test.time = {"user_time": 0, "system_time": 0}
+        testable.result = Result(Result.Errored, reason)
+        for child in testable:
+            child.result = Result(Result.Errored, reason)
+            child.status = Status.Avoided
+        testable.status = Status.Complete
+
     def test(self):
-        pool = multiprocessing.dummy.Pool(self.threads)
-        pool.map(lambda suite: suite.runner(suite).run(), self.testable)
+        if not hasattr(self, "history"):
+            self.history = DurationHistory(
+                os.path.join(config.result_path, constants.durations_filename)
+            )
+        self.items, split_suites = self._work_items()
+
+        order = sorted(
+            range(len(self.items)),
+            key=lambda index: self._expected_duration(self.items[index]),
+            reverse=True,
+        )
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        outcomes = context.Queue()
+        workers = [
+            context.Process(target=self._work, args=(queue, outcomes))
+            for _ in range(min(self.threads, len(order)))
+        ]
+        for index in order:
+            queue.put(index)
+        for worker in workers:
+            queue.put(None)
+
+        pending = set(order)
+        try:
+            for worker in workers:
+                worker.start()
+            while pending:
+                try:
+                    outcome = outcomes.get(timeout=1)
+                except Empty:
+                    if any(worker.is_alive() for worker in workers):
+                        continue
+                    # Every worker has exited, pick up what they sent last.
+                    try:
+                        outcome = outcomes.get(timeout=1)
+                    except Empty:
+                        break
+                self._complete(*outcome)
+                pending.discard(outcome[0])
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+
+        for index in sorted(pending):
+            self._abandon(index)
+        for suite_runner in split_suites:
+            suite_runner.finish()
+        self.history.save()
+
         self.testable.result = compute_aggregate_result(iter(self.testable))
 
 
@@ -1,27 +1,34 @@
 from collections import defaultdict
+import math
 import os
 import pandas as pd
 
+from stats_store import StatsStore
+
 # Path to the directory containing simulation folders
 stats_dir = 'runs/chipletization/decode_to_rename_v3/stats'
 output_csv = 'cycle_counts.csv'
 
+# Parse only the stats.txt files that are new since the last run
+store = StatsStore()
+store.ingest(stats_dir)
+cycle_counts = dict(zip(
+    store.runs(under=stats_dir),
+    # The cycle count of the first dump, if the stats were dumped more than once
+    store.select(["system.switch_cpus.numCycles"], runs=store.runs(under=stats_dir), dump="first")["system.switch_cpus.numCycles"],
+))
+
 # Function to extract cycle count from stats.txt
 def extract_cycle_count(file_path):
-    with open(file_path, 'r') as f:
-        for line in f:
-            if line.startswith("system.switch_cpus.numCycles"):
-                parts = line.split()
-                if len(parts) >= 2:
-                    try:
-                        return int(parts[1])  # Return cycle count as integer
-                    except ValueError:
-                        return None  # If not a valid number
-    return None  # If the stat is not found
+    cycles = cycle_counts.get(os.path.abspath(file_path))
+    if cycles is None or math.isnan(cycles):
+        return None  # If the stat is not found
+    return int(cycles)  # Return cycle count as integer
 
 # Collect all simulation folders
 simulation_folders = [f for f in os.listdir(stats_dir) if os.path.isdir(os.path.join(stats_dir, f))]
 simulation_data = []
+stats_paths = []
 
 # Step 1: Group by first and second prefix
 grouped_folders = defaultdict(lambda: defaultdict(list))
@@ -44,7 +51,7 @@ for simulation in grouped_folders:
         # Extract cycle counts
         sim_0_cycles = extract_cycle_count(sim_0_path) if os.path.exists(sim_0_path) else None
         sim_2_cycles = extract_cycle_count(sim_2_path) if os.path.exists(sim_2_path) else None
-        
+
         # print(simulation)
         if sim_0_cycles is not None and sim_2_cycles is not None:
             # Calculate percent difference
@@ -57,19 +64,18 @@ for simulation in grouped_folders:
         if os.path.exists(sim_2_stats_path):
             stats = {'simulation_id': f"{simulation}_r_{partition}", 'percent_diff_cycles': percent_diff}
             print(percent_diff)
-            with open(sim_2_stats_path, 'r') as f:
-                for line in f:
-                    if line.strip() and not line.startswith('#'):  # Skip empty lines and comments
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            try:
-                                stats[parts[0]] = float(parts[1])  # Convert value to float
-                            except ValueError:
-                                stats[parts[0]] = parts[1]  # If not float, keep as string
             simulation_data.append(stats)
+            stats_paths.append(os.path.abspath(sim_2_stats_path))
 
 # Convert to DataFrame and save as CSV
-df = pd.DataFrame(simulation_data)
+# All stats of the "_2" simulations are read column by column from the store
+df = pd.concat(
+    [
+        pd.DataFrame(simulation_data),
+        store.to_frame(regex="", runs=stats_paths, strings=True).reset_index(drop=True).dropna(axis=1, how="all"),
+    ],
+    axis=1,
+)
 df = df.sort_values(by="simulation_id")  # Sort rows alphabetically by simulation_id
 df.to_csv(output_csv, index=False)
 
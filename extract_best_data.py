@@ -1,34 +1,33 @@
 import os
 import csv
 import argparse
+import math
 
-# Function to extract parameters from config.ini
-def extract_parameters(stats_file):
-    params = {}
-    with open(stats_file, 'r') as file:
-        lines = file.readlines()
-        for i, line in enumerate(lines):
-            if line.startswith('system.switch_cpus.branchPred.corrected_0::total'):
-                params['branch_correct'] = line.split()[1]
-            elif line.startswith('system.switch_cpus.branchPred.mispredicted_0::total'):
-                params['branch_miss'] = line.split()[1]
-            elif line.startswith('system.switch_cpus.commit.branchMispredicts'):
-                params['branch_miss_2'] = line.split()[1]
-            elif line.startswith('system.cpu.icache.tags.dataAccesses'):
-                params['icache_tags'] = line.split()[1]
-            elif line.startswith('system.cpu.icache.demandAccesses::total'):
-                params['icache_demands'] = line.split()[1]
-            elif line.startswith('system.cpu.icache.ReadReq.accesses::total'):
-                params['icache_reads'] = line.split()[1]
-            elif line.startswith('system.cpu.icache.overallHits::total'):
-                params['icache_hits'] = line.split()[1]
-            elif line.startswith('system.switch_cpus.rename.squashedInsts'):
-                params['rename_squashed'] = line.split()[1]
-            elif line.startswith('system.switch_cpus.decode.squashCycles'):
-                params['decode_squashed'] = line.split()[1]
-            elif line.startswith('system.switch_cpus.iew.predictedTakenIncorrect'):
-                params['pred_taken_wrong'] = line.split()[1]
+from stats_store import StatsStore
+
+# Stats to extract from stats.txt and the CSV column each one goes to
+STATS = {
+    'system.switch_cpus.branchPred.corrected_0::total': 'branch_correct',
+    'system.switch_cpus.branchPred.mispredicted_0::total': 'branch_miss',
+    'system.switch_cpus.commit.branchMispredicts': 'branch_miss_2',
+    'system.cpu.icache.tags.dataAccesses': 'icache_tags',
+    'system.cpu.icache.demandAccesses::total': 'icache_demands',
+    'system.cpu.icache.ReadReq.accesses::total': 'icache_reads',
+    'system.cpu.icache.overallHits::total': 'icache_hits',
+    'system.switch_cpus.rename.squashedInsts': 'rename_squashed',
+    'system.switch_cpus.decode.squashCycles': 'decode_squashed',
+    'system.switch_cpus.iew.predictedTakenIncorrect': 'pred_taken_wrong',
+}
 
+# Function to extract parameters from the stats store
+def extract_parameters(values, i):
+    params = {}
+    for name, column in STATS.items():
+        value = values[name][i]
+        if isinstance(value, str):
+            params[column] = value
+        elif not math.isnan(value):
+            params[column] = int(value) if value.is_integer() else value
     return params
 
 # Function to extract cycle count from stats.txt
@@ -44,6 +43,13 @@ def extract_cycle_count(stats_file):
 def process_simulations(main_folder):
     simulations = []
 
+    # Parse only the stats.txt files that are new since the last run
+    store = StatsStore()
+    store.ingest(main_folder)
+    stats_files = store.runs(under=main_folder)
+    values = store.select(list(STATS), runs=stats_files, strings=True)
+    rows = {path: i for i, path in enumerate(stats_files)}
+
     for simulation_folder in os.listdir(main_folder):
         sim_path = os.path.join(main_folder, simulation_folder)
         if os.path.isdir(sim_path) and sim_path.endswith("1"):
@@ -51,7 +57,7 @@ def process_simulations(main_folder):
             stats_file = os.path.join(sim_path, 'stats.txt')
 
             if os.path.exists(stats_file):
-                params = extract_parameters(stats_file)
+                params = extract_parameters(values, rows[os.path.abspath(stats_file)])
 
                 simulation_data = {
                     'simulation_name': sim_name,
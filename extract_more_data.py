@@ -1,32 +1,32 @@
 import os
 import csv
 import argparse
+import math
 
-# Function to extract parameters from config.ini
-def extract_parameters(stats_file):
-    params = {}
-    with open(stats_file, 'r') as file:
-        lines = file.readlines()
-        for i, line in enumerate(lines):
-            if line.startswith('system.switch_cpus.fetchStats0.branchRate'):
-                params['branchRate'] = line.split()[1]
-            elif line.startswith('system.switch_cpus.statIssuedInstType_0::MemRead'):
-                params['MemRead'] = line.split()[1]
-            elif line.startswith('system.switch_cpus.statIssuedInstType_0::MemWrite'):
-                params['MemWrite'] = line.split()[1]
-            elif line.startswith('system.cpu.dcache.overallMissRate::total'):
-                params['D-Cache Missrate'] = line.split()[1]
-            elif line.startswith('system.cpu.icache.overallMissRate::total'):
-                params['I-Cache Missrate'] = line.split()[1]
-            elif line.startswith('system.l2.overallMissRate::total'):
-                params['L2 Cache Missrate'] = line.split()[1]
-            elif line.startswith('system.switch_cpus.idleCycles'):
-                params['Idles'] = line.split()[1]
-            elif line.startswith('system.mem_ctrl.dram.bwTotal::total'):
-                params['DRAM BW'] = line.split()[1]
-            elif line.startswith('system.mem_ctrl.dram.numReads::total'):
-                params['DRAM Reads'] = line.split()[1]
+from stats_store import StatsStore
+
+# Stats to extract from stats.txt and the CSV column each one goes to
+STATS = {
+    'system.switch_cpus.fetchStats0.branchRate': 'branchRate',
+    'system.switch_cpus.statIssuedInstType_0::MemRead': 'MemRead',
+    'system.switch_cpus.statIssuedInstType_0::MemWrite': 'MemWrite',
+    'system.cpu.dcache.overallMissRate::total': 'D-Cache Missrate',
+    'system.cpu.icache.overallMissRate::total': 'I-Cache Missrate',
+    'system.l2.overallMissRate::total': 'L2 Cache Missrate',
+    'system.switch_cpus.idleCycles': 'Idles',
+    'system.mem_ctrl.dram.bwTotal::total': 'DRAM BW',
+    'system.mem_ctrl.dram.numReads::total': 'DRAM Reads',
+}
 
+# Function to extract parameters from the stats store
+def extract_parameters(values, i):
+    params = {}
+    for name, column in STATS.items():
+        value = values[name][i]
+        if isinstance(value, str):
+            params[column] = value
+        elif not math.isnan(value):
+            params[column] = int(value) if value.is_integer() else value
     return params
 
 # Function to extract cycle count from stats.txt
@@ -42,6 +42,13 @@ def extract_cycle_count(stats_file):
 def process_simulations(main_folder):
     simulations = []
 
+    # Parse only the stats.txt files that are new since the last run
+    store = StatsStore()
+    store.ingest(main_folder)
+    stats_files = store.runs(under=main_folder)
+    values = store.select(list(STATS), runs=stats_files, strings=True)
+    rows = {path: i for i, path in enumerate(stats_files)}
+
     for simulation_folder in os.listdir(main_folder):
         sim_path = os.path.join(main_folder, simulation_folder)
         if os.path.isdir(sim_path) and sim_path.endswith("2"):
@@ -49,7 +56,7 @@ def process_simulations(main_folder):
             stats_file = os.path.join(sim_path, 'stats.txt')
 
             if os.path.exists(stats_file):
-                params = extract_parameters(stats_file)
+                params = extract_parameters(values, rows[os.path.abspath(stats_file)])
 
                 simulation_data = {
                     'simulation_name': sim_name,
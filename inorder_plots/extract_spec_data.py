@@ -1,6 +1,11 @@
 import os
 import csv
 import argparse
+import math
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from stats_store import StatsStore
 
 # Function to extract parameters from config.ini
 def extract_parameters(config_file):
@@ -19,19 +24,27 @@ def extract_parameters(config_file):
                     params['clock'] = lines[i + 2].strip().split('=')[1].strip()
     return params
 
-# Function to extract cycle count from stats.txt
-def extract_cycle_count(stats_file):
-    with open(stats_file, 'r') as file:
-        for line in file:
-            if line.startswith('system.switch_cpus.numCycles'):
-                # Split the line and extract the cycle count before the comment
-                return line.split()[1]
-    return None
+# Function to extract cycle count from the stats store
+def extract_cycle_count(cycle_counts, stats_file):
+    cycles = cycle_counts.get(os.path.abspath(stats_file))
+    if cycles is None or math.isnan(cycles):
+        return None
+    return int(cycles)
 
 # Main function to process all simulations
 def process_simulations(main_folder):
     simulations = []
 
+    # Parse only the stats.txt files that are new since the last run
+    store = StatsStore()
+    store.ingest(main_folder)
+    stats_files = store.runs(under=main_folder)
+    cycle_counts = dict(zip(
+        stats_files,
+        # The cycle count of the first dump, if the stats were dumped more than once
+        store.select(['system.switch_cpus.numCycles'], runs=stats_files, dump='first')['system.switch_cpus.numCycles'],
+    ))
+
     for simulation_folder in os.listdir(main_folder):
         sim_path = os.path.join(main_folder, simulation_folder)
         if os.path.isdir(sim_path):
@@ -41,7 +54,7 @@ def process_simulations(main_folder):
 
             if os.path.exists(config_file) and os.path.exists(stats_file):
                 params = extract_parameters(config_file)
-                cycle_count = extract_cycle_count(stats_file)
+                cycle_count = extract_cycle_count(cycle_counts, stats_file)
 
                 simulation_data = {
                     'simulation_name': sim_name,
@@ -0,0 +1,260 @@
+"""The benchmarks and the sweeps run by `run_all_spec.py`.
+
+A sweep is selected with `run_all_spec.py --sweep <name>` and describes
+everything that used to differ between the copies of the launcher:
+
+    config          gem5 config script, relative to the gem5 root
+    benchmarks      names of the SPEC_CMDS entries to run
+    fast_forward    instructions to fast-forward, one run per value
+    maxinsts        instructions to simulate after the fast-forward
+    permutations    parameters of the config script, one run per dict
+    run_name        name of the stats and trace files of a run, formatted
+                    with the benchmark, the index i of the permutation,
+                    the fast_forward and fast_forward_m, the fast_forward
+                    in millions
+    max_workers     default of --max-workers, None for every CPU
+    checkpoint_params
+                    parameters of the permutations that change the
+                    fast-forwarded state, so a cached fast-forward
+                    checkpoint is only shared by the permutations that
+                    agree on them. Optional, every parameter by default
+"""
+
+from itertools import product
+
+spec_path = "spec_bin/train"
+
+# Define SPEC benchmark commands
+SPEC_CMDS = [
+    # Each dictionary in the list represents a SPEC benchmark command
+    # 'name': Name of the benchmark
+    # 'path': Path to the benchmark binary
+    # 'bin': Benchmark binary name
+    # 'opts': Options for the benchmark command
+    # TODO: Add comments for each benchmark explaining its purpose
+    {
+        "name": "perlbench_r",
+        "path": f"{spec_path}/500.perlbench_r/run/run_base_train_main-m64.0000/",
+        "bin": "perlbench_r_base.main-m64",
+        "opts": "-I./lib splitmail.pl 535 13 25 24 1091 1",
+    },
+    {
+        "name": "gcc_r",
+        "path": f"{spec_path}/502.gcc_r/run/run_base_train_main-m64.0000/",
+        "bin": "cpugcc_r_base.main-m64",
+        "opts": "train01.c -O3 -finline-limit=50000 -o train01.opts-O3_-finline-limit_50000.s",
+    },
+    # TODO: fix the handling of the input file for this benchmark
+    # {
+    #     "name": "bwaves_r",
+    #     "path": f"{spec_path}/503.bwaves_r/run/run_base_train_main-m64.0000/",
+    #     "bin": "bwaves_r_base.main-m64",
+    #     "opts": "< bwaves_1.in",
+    # },
+    {
+        "name": "mcf_r",
+        "path": f"{spec_path}/505.mcf_r/run/run_base_train_main-m64.0000/",
+        "bin": "mcf_r_base.main-m64",
+        "opts": "inp.in",
+    },
+    {
+        "name": "cactuBSSN_r",
+        "path": f"{spec_path}/507.cactuBSSN_r/run/run_base_train_main-m64.0000/",
+        "bin": "cactusBSSN_r_base.main-m64",
+        "opts": "spec_train.par",
+    },
+    {
+        "name": "namd_r",
+        "path": f"{spec_path}/508.namd_r/run/run_base_train_main-m64.0000/",
+        "bin": "namd_r_base.main-m64",
+        "opts": "--input apoa1.input --iterations 7 --output apoa1.train.output",
+    },
+    {
+        "name": "povray_r",
+        "path": f"{spec_path}/511.povray_r/run/run_base_train_main-m64.0000/",
+        "bin": "povray_r_base.main-m64",
+        "opts": "SPEC-benchmark-train.ini",
+    },
+    {
+        "name": "lbm_r",
+        "path": f"{spec_path}/519.lbm_r/run/run_base_train_main-m64.0000/",
+        "bin": "lbm_r_base.main-m64",
+        "opts": "300 reference.dat 0 1",
+    },
+    {
+        "name": "omnetpp_r",
+        "path": f"{spec_path}/520.omnetpp_r/run/run_base_train_main-m64.0000/",
+        "bin": "omnetpp_r_base.main-m64",
+        "opts": "-c General -r 0",
+    },
+    {
+        "name": "wrf_r",
+        "path": f"{spec_path}/521.wrf_r/run/run_base_train_main-m64.0000/",
+        "bin": "wrf_r_base.main-m64",
+        "opts": "namelist.input",
+    },
+    {
+        "name": "xalancbmk_r",
+        "path": f"{spec_path}/523.xalancbmk_r/run/run_base_train_main-m64.0000/",
+        "bin": "cpuxalan_r_base.main-m64",
+        "opts": "allbooks.xml xalanc.xsl",
+    },
+    {
+        "name": "x264_r",
+        "path": f"{spec_path}/525.x264_r/run/run_base_train_main-m64.0000/",
+        "bin": "x264_r_base.main-m64",
+        "opts": "--dumpyuv 50 --frames 142 -o BuckBunny_New.264 BuckBunny.yuv 1280x720",
+    },
+    {
+        "name": "blender_r",
+        "path": f"{spec_path}/526.blender_r/run/run_base_train_main-m64.0000/",
+        "bin": "blender_r_base.main-m64",
+        "opts": "sh5_reduced.blend --render-output sh5_reduced_ --threads 1 -b -F RAWTGA -s 234 -e 234 -a",
+    },
+    {
+        "name": "cam4_r",
+        "path": f"{spec_path}/527.cam4_r/run/run_base_train_main-m64.0000/",
+        "bin": "cam4_r_base.main-m64",
+    },
+    {
+        "name": "deepsjeng_r",
+        "path": f"{spec_path}/531.deepsjeng_r/run/run_base_train_main-m64.0000/",
+        "bin": "deepsjeng_r_base.main-m64",
+        "opts": "train.txt",
+    },
+    {
+        "name": "imagick_r",
+        "path": f"{spec_path}/538.imagick_r/run/run_base_train_main-m64.0000/",
+        "bin": "imagick_r_base.main-m64",
+        "opts": "-limit disk 0 train_input.tga -resize 320x240 -shear 31 -edge 140 -negate -flop -resize 900x900 -edge 10 train_output.tga",
+    },
+    {
+        "name": "leela_r",
+        "path": f"{spec_path}/541.leela_r/run/run_base_train_main-m64.0000/",
+        "bin": "leela_r_base.main-m64",
+        "opts": "train.sgf",
+    },
+    {
+        "name": "nab_r",
+        "path": f"{spec_path}/544.nab_r/run/run_base_train_main-m64.0000/",
+        "bin": "nab_r_base.main-m64",
+        "opts": "gcn4dna 1850041461 300",
+    },
+    {
+        "name": "exchange2_r",
+        "path": f"{spec_path}/548.exchange2_r/run/run_base_train_main-m64.0000/",
+        "bin": "exchange2_r_base.main-m64",
+        "opts": "1",
+    },
+    {
+        "name": "fotonik3d_r",
+        "path": f"{spec_path}/549.fotonik3d_r/run/run_base_train_main-m64.0000/",
+        "bin": "fotonik3d_r_base.main-m64",
+    },
+    # TODO: fix input
+    # {
+    #     "name": "roms_r",
+    #     "path": f"{spec_path}/554.roms_r/run/run_base_train_main-m64.0000/",
+    #     "bin": "roms_r_base.main-m64",
+    #     "opts": "ocean_benchmark1.in.x",
+    # },
+    {
+        "name": "xz_r",
+        "path": f"{spec_path}/557.xz_r/run/run_base_train_main-m64.0000/",
+        "bin": "xz_r_base.main-m64",
+        "opts": "IMG_2560.cr2.xz 40 ec03e53b02deae89b6650f1de4bed76a012366fb3d4bdc791e8633d1a5964e03004523752ab008eff0d9e693689c53056533a05fc4b277f0086544c6c3cbbbf6 40822692 40824404 4",
+    },
+]
+
+
+# Benchmarks that likely fail during the fast-forward of the MinorCPU config
+_minor_broken = {"gcc_r", "wrf_r", "x264_r", "fotonik3d_r"}
+
+
+def permutations(params):
+    """Returns every combination of the values of `params`, which maps a
+    parameter to the list of its values."""
+    return [dict(zip(params, p)) for p in product(*params.values())]
+
+
+SWEEPS = {
+    # Forwarding delays of the MinorCPU pipeline
+    "minor": {
+        "config": "configs/chipletization/se_deriv.py",
+        "benchmarks": [
+            c["name"] for c in SPEC_CMDS if c["name"] not in _minor_broken
+        ],
+        "fast_forward": [10000000],
+        "maxinsts": 250000000,
+        "permutations": permutations(
+            {
+                "fetch2ToDecodeForwardDelay": [1],
+                "decodeToExecuteForwardDelay": [1, 5, 20],
+                "executeBranchDelay": [1],
+                "sys_clock": ["1GHz", "2GHz"],
+                "homogenous_delays": [True],
+            }
+        ),
+        "run_name": "{benchmark}_{i}",
+        "max_workers": None,
+        # The system clock times the memory during the fast-forward, the
+        # MinorCPU delays only matter after the switch
+        "checkpoint_params": ["sys_clock"],
+    },
+    # IEW to commit delay of the O3CPU
+    "o3": {
+        "config": "configs/chipletization/se_deriv_o3.py",
+        "benchmarks": [c["name"] for c in SPEC_CMDS],
+        "fast_forward": [10000000],
+        "maxinsts": 250000000,
+        "permutations": permutations(
+            {
+                "iewToCommitDelay": [1, 2, 4],
+                "sys_clock": ["2GHz"],
+                "forwardComSize": [10],
+                "backComSize": [10],
+            }
+        ),
+        "run_name": "{benchmark}_{i}",
+        "max_workers": 12,
+        "checkpoint_params": ["sys_clock"],
+    },
+    # Front-end delays of the O3CPU at every million instructions of the
+    # fast-forward, from 126M to 250M
+    "o3_fast_forward": {
+        "config": "configs/chipletization/se_deriv_o3.py",
+        "benchmarks": [
+            "lbm_r",
+            "omnetpp_r",
+            "wrf_r",
+            "xalancbmk_r",
+            "x264_r",
+            "blender_r",
+            "cam4_r",
+            "deepsjeng_r",
+            "imagick_r",
+            "leela_r",
+            "nab_r",
+            "exchange2_r",
+            "fotonik3d_r",
+            "xz_r",
+        ],
+        "fast_forward": [p * 1000000 for p in range(126, 251)],
+        "maxinsts": 1000000,
+        "permutations": [
+            {
+                "renameToFetchDelay": delay,
+                "iewToFetchDelay": delay,
+                "decodeToRenameDelay": delay,
+                "iewToDecodeDelay": delay,
+                "sys_clock": "2GHz",
+                "forwardComSize": 10,
+                "backComSize": 10,
+            }
+            for delay in (1, 4)
+        ],
+        "run_name": "{benchmark}_p{fast_forward_m}_i{i}",
+        "max_workers": 8,
+        "checkpoint_params": ["sys_clock"],
+    },
+}
@@ -0,0 +1,131 @@
+# Copyright (c) 2024 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Cache of the files generated from ISA descriptions.
+#
+# Generating the files executes all the Python code of the description,
+# which takes a while for the larger ISAs. The generated files are stored
+# under a key hashing the flattened description, i.e., the description
+# and every file it includes, so they are only generated again when one
+# of these changes. The Python modules used to generate them, i.e., the
+# parser itself and the modules imported by 'let' blocks such as the x86
+# microcode, are recorded with their hashes alongside the files and are
+# checked before the files are reused.
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+CACHE_VERSION = 1
+
+
+def file_hash(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def module_files(root, extra=()):
+    """Return the files of the imported Python modules under root, plus
+    those of the modules named in extra."""
+    root = os.path.abspath(root) + os.sep
+    paths = set()
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        # The PLY tables are generated from the parser, which is hashed
+        if not path or name.split(".")[-1] == "parsetab":
+            continue
+        path = os.path.abspath(path)
+        if path.startswith(root) or name in extra:
+            paths.add(path)
+    return sorted(paths)
+
+
+class OutputCache:
+    # Number of descriptions whose files are kept
+    max_entries = 8
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key(*parts):
+        h = hashlib.sha256(str(CACHE_VERSION).encode())
+        for part in parts:
+            h.update(b"\0")
+            h.update(part.encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".json.gz")
+
+    def get(self, key):
+        """Return the files cached under key, as a dict mapping their
+        names to their contents, or None."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt") as f:
+                entry = json.load(f)
+        except (OSError, EOFError, ValueError):
+            return None
+
+        for module, digest in entry["modules"].items():
+            if file_hash(module) != digest:
+                return None
+
+        # Mark the entry as recently used, so it is pruned last.
+        os.utime(path)
+        return entry["files"]
+
+    def put(self, key, files, modules):
+        """Cache the generated files under key. modules are the files of
+        the Python modules they were generated with."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            "modules": {module: file_hash(module) for module in modules},
+            "files": files,
+        }
+        path = self._path(key)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with gzip.open(tmp_path, "wt", compresslevel=1) as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self.prune()
+
+    def prune(self):
+        """Remove all but the max_entries most recently used entries."""
+        paths = glob.glob(os.path.join(self.cache_dir, "*.json.gz"))
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[self.max_entries :]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
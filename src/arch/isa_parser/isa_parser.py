@@ -37,6 +37,7 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import io
 import os
 import re
 import sys
@@ -47,6 +48,10 @@ from types import *
 
 from grammar import Grammar
 
+from .cache import (
+    OutputCache,
+    module_files,
+)
 from .operand_list import *
 from .operand_types import *
 from .util import *
@@ -511,12 +516,33 @@ class InstObjParams:
 #
 
 
+class OutputFile(io.StringIO):
+    """A generated file, kept in memory until the whole description has
+    been parsed."""
+
+    def __init__(self, outputs, name):
+        super().__init__()
+        self.outputs = outputs
+        self.name = name
+
+    def close(self):
+        if not self.closed:
+            self.outputs[self.name] = self.getvalue()
+        super().close()
+
+
 class ISAParser(Grammar):
-    def __init__(self, output_dir, decoder_name="Decoder"):
+    def __init__(self, output_dir, decoder_name="Decoder", cache_dir=None):
         super().__init__()
         self.lex_kwargs["reflags"] = int(re.MULTILINE)
         self.output_dir = output_dir
 
+        # Contents of the generated files, by name
+        self.outputs = {}
+
+        # Cache of the generated files, if any
+        self.cache = OutputCache(cache_dir) if cache_dir else None
+
         self.filename = None  # for output file watermarking/scaremongering
 
         # variable to hold templates
@@ -1600,14 +1626,27 @@ StaticInstPtr
             return s
 
     def open(self, name, bare=False):
-        """Open the output file for writing and include scary warning."""
-        filename = os.path.join(self.output_dir, name)
-        f = open(filename, "w")
-        if f:
-            if not bare:
-                f.write(ISAParser.scaremonger_template % self)
+        """Open the output file for writing and include scary warning.
+        The file is only written by write_outputs()."""
+        f = OutputFile(self.outputs, name)
+        if not bare:
+            f.write(ISAParser.scaremonger_template % self)
         return f
 
+    def write_outputs(self, outputs):
+        """Write the generated files whose contents changed, leaving the
+        others untouched so they are not considered rebuilt."""
+        for name, contents in outputs.items():
+            filename = os.path.join(self.output_dir, name)
+            try:
+                with open(filename) as f:
+                    if f.read() == contents:
+                        continue
+            except OSError:
+                pass
+            with open(filename, "w") as f:
+                f.write(contents)
+
     def update(self, file, contents):
         """Update the output file only.  Scons should handle the case when
         the new contents are unchanged using its built-in hash feature."""
@@ -1679,11 +1718,30 @@ StaticInstPtr
         # do this up front.
         isa_desc = self.read_and_flatten(isa_desc_file)
 
+        # The generated files only depend on the flattened description and
+        # on the Python code run to generate them, which the cache checks.
+        if self.cache:
+            key = OutputCache.key(self.filename, self.decoder_name, isa_desc)
+            outputs = self.cache.get(key)
+            if outputs is not None:
+                self.write_outputs(outputs)
+                ISAParser.AlreadyGenerated[isa_desc_file] = None
+                return
+
         # Initialize lineno tracker
         self.lex.lineno = LineTracker(isa_desc_file)
 
         # Parse.
         self.parse_string(isa_desc)
+        self.write_outputs(self.outputs)
+
+        if self.cache:
+            arch_dir = os.path.dirname(os.path.dirname(__file__))
+            self.cache.put(
+                key,
+                self.outputs,
+                module_files(arch_dir, extra=(Grammar.__module__,)),
+            )
 
         ISAParser.AlreadyGenerated[isa_desc_file] = None
 
@@ -92,6 +92,13 @@ def main(args=None):
         help="print traceback on error",
     )
     parser.add_option("-q", "--quiet", help="don't print messages")
+    parser.add_option(
+        "-j",
+        "--jobs",
+        type="int",
+        default=None,
+        help="number of processes writing the C++ code, all CPUs by default",
+    )
     opts, files = parser.parse_args(args=args)
 
     if len(files) != 1:
@@ -132,7 +139,7 @@ def main(args=None):
             slicc.writeHTMLFiles(opts.html_path)
 
         output("Writing C++ files...")
-        slicc.writeCodeFiles(opts.code_path, [])
+        slicc.writeCodeFiles(opts.code_path, [], opts.jobs)
 
     output("SLICC is Done.")
 
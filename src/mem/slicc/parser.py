@@ -37,6 +37,8 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import hashlib
+import json
 import os.path
 import re
 import sys
@@ -61,6 +63,7 @@ class SLICC(Grammar):
         self.verbose = verbose
         self.symtab = SymbolTable(self)
         self.base_dir = base_dir
+        self.sources = []
 
         try:
             self.decl_list = self.parse_file(filename, **kwargs)
@@ -79,11 +82,80 @@ class SLICC(Grammar):
         code["protocol"] = self.protocol
         return code
 
+    def parse_file(self, f, **kwargs):
+        # Keep track of every file the protocol is parsed from
+        self.sources.append(f if isinstance(f, str) else f.name)
+        return super().parse_file(f, **kwargs)
+
     def process(self):
         self.decl_list.generate()
 
-    def writeCodeFiles(self, code_path, includes):
-        self.symtab.writeCodeFiles(code_path, includes)
+    # File recording what the code in a directory was generated from, and
+    # the hashes of the generated files
+    manifest_name = "slicc_manifest.json"
+
+    def sourceHash(self, includes):
+        """Hash of everything the generated code depends on: the files the
+        protocol was parsed from, the includes and the SLICC sources"""
+        compiler = [sys.modules[code_formatter.__module__].__file__]
+        slicc_dir = os.path.dirname(os.path.abspath(__file__))
+        for root, dirs, files in os.walk(slicc_dir):
+            dirs.sort()
+            for name in sorted(files):
+                # The PLY tables are generated from this file
+                if name.endswith(".py") and name != "parsetab.py":
+                    compiler.append(os.path.join(root, name))
+
+        h = hashlib.sha256()
+        for include in includes:
+            h.update(include.encode() + b"\0")
+        for filename in self.sources + compiler:
+            h.update(filename.encode() + b"\0")
+            with open(filename, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        return h.hexdigest()
+
+    @staticmethod
+    def _fileHash(path):
+        try:
+            with open(path, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    def upToDate(self, code_path, includes):
+        """Return whether the code in code_path was generated from the same
+        sources, and is unmodified, so it need not be generated again"""
+        try:
+            with open(os.path.join(code_path, self.manifest_name)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if manifest.get("source") != self.sourceHash(includes):
+            return False
+        files = manifest.get("files", {})
+        if set(files) != self.files():
+            return False
+        return all(
+            self._fileHash(os.path.join(code_path, name)) == digest
+            for name, digest in files.items()
+        )
+
+    def writeCodeFiles(self, code_path, includes, jobs=1):
+        self.symtab.writeCodeFiles(code_path, includes, jobs)
+
+        manifest = {
+            "source": self.sourceHash(includes),
+            "files": {
+                name: self._fileHash(os.path.join(code_path, name))
+                for name in sorted(self.files())
+            },
+        }
+        path = os.path.join(code_path, self.manifest_name)
+        with open(f"{path}.tmp{os.getpid()}", "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(f"{path}.tmp{os.getpid()}", path)
 
     def writeHTMLFiles(self, html_path):
         self.symtab.writeHTMLFiles(html_path)
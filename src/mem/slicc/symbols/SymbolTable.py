@@ -25,6 +25,7 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import multiprocessing
 import os
 
 from slicc.generate import html
@@ -43,6 +44,16 @@ def makeDir(path):
         os.makedirs(path, exist_ok=True)
 
 
+# The symbol table whose code is being written by the worker processes,
+# which inherit it when they are forked.
+_writing = None
+
+
+def _writeSymbolCode(index):
+    symtab, path, includes = _writing
+    symtab.sym_vec[index].writeCodeFiles(path, includes)
+
+
 class SymbolTable:
     def __init__(self, slicc):
         self.slicc = slicc
@@ -133,7 +144,9 @@ class SymbolTable:
             if isinstance(symbol, type):
                 yield symbol
 
-    def writeCodeFiles(self, path, includes):
+    def writeCodeFiles(self, path, includes, jobs=1):
+        """Write the code of all the symbols to path. jobs is the number
+        of processes writing it, all the available CPUs if None."""
         makeDir(path)
 
         code = self.codeFormatter()
@@ -147,8 +160,30 @@ class SymbolTable:
 
         code.write(path, "Types.hh")
 
-        for symbol in self.sym_vec:
-            symbol.writeCodeFiles(path, includes)
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        if jobs <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+            for symbol in self.sym_vec:
+                symbol.writeCodeFiles(path, includes)
+            return
+
+        # The code of each symbol only depends on the symbol table, which
+        # is complete once the AST is processed, so the symbols can be
+        # written by processes forked from this one. The state machines
+        # generate most of the code and are handed out first.
+        global _writing
+        indices = sorted(
+            range(len(self.sym_vec)),
+            key=lambda i: not isinstance(self.sym_vec[i], StateMachine),
+        )
+        _writing = (self, path, includes)
+        try:
+            context = multiprocessing.get_context("fork")
+            with context.Pool(min(jobs, len(indices))) as pool:
+                for _ in pool.imap_unordered(_writeSymbolCode, indices):
+                    pass
+        finally:
+            _writing = None
 
     def writeHTMLFiles(self, path):
         makeDir(path)
@@ -0,0 +1,235 @@
+# Copyright (c) 2023 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+A local, indexed copy of the resources of a JSON resources source.
+
+Parsing the whole resources JSON in every gem5 process is slow when many
+simulations are started at once. A ``ResourceCatalog`` stores the resources
+of one source in an SQLite database indexed by resource ID and version,
+alongside the gem5 versions each resource is compatible with, so that a
+lookup only reads the matching resources.
+
+The catalog also records the size, modification time, SHA-256 and HTTP
+validators of the source it was built from, which lets ``JSONClient``
+revalidate it without re-parsing the source.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+)
+
+# Bumped whenever the database schema changes.
+_CATALOG_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE resources (
+    pos INTEGER PRIMARY KEY,
+    id TEXT,
+    resource_version TEXT,
+    json TEXT
+);
+CREATE INDEX resources_id ON resources (id, resource_version);
+CREATE TABLE gem5_versions (pos INTEGER, idx INTEGER, version TEXT);
+CREATE INDEX gem5_versions_version ON gem5_versions (version);
+"""
+
+
+def default_catalog_dir() -> Path:
+    """
+    Returns the directory holding the resource catalogs. This is the
+    ``GEM5_RESOURCE_CATALOG_DIR`` environment variable if set, otherwise
+    ``~/.cache/gem5/catalogs``.
+    """
+    return Path(
+        os.getenv(
+            "GEM5_RESOURCE_CATALOG_DIR",
+            os.path.join(Path.home(), ".cache", "gem5", "catalogs"),
+        )
+    )
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResourceCatalog:
+    def __init__(self, source: str, catalog_dir: Optional[Path] = None):
+        """
+        :param source: The path or URL of the resources JSON.
+        :param catalog_dir: The directory holding the catalogs. By default,
+                            ``default_catalog_dir()``.
+        """
+        if catalog_dir is None:
+            catalog_dir = default_catalog_dir()
+        self.source = source
+        self.db_path = Path(catalog_dir) / (
+            sha256_bytes(source.encode())[:32] + ".sqlite"
+        )
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(str(self.db_path), timeout=30)
+        return self._conn
+
+    def meta(self) -> Dict[str, Any]:
+        """
+        Returns what the catalog was built from, or an empty dictionary if
+        there is no usable catalog for the source.
+        """
+        if not self.db_path.is_file():
+            return {}
+        try:
+            rows = self._connect().execute("SELECT key, value FROM meta")
+            meta = {key: json.loads(value) for key, value in rows}
+        except sqlite3.Error:
+            return {}
+        if (
+            meta.get("catalog_version") != _CATALOG_VERSION
+            or meta.get("source") != self.source
+        ):
+            return {}
+        return meta
+
+    def update_meta(self, **values: Any) -> None:
+        """Records new validators of an unchanged source."""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in values.items()],
+            )
+
+    def build(self, resources: List[Dict[str, Any]], **meta: Any) -> None:
+        """
+        Replaces the catalog with the given resources.
+
+        The new catalog is written to a temporary file and moved into place,
+        so concurrent readers see either the old or the new catalog.
+
+        :param resources: The resources, as parsed from the source.
+        :param meta: The size, mtime, SHA-256, etc. of the source.
+        """
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.db_path.with_name(
+            f"{self.db_path.name}.tmp-{os.getpid()}"
+        )
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+        conn = sqlite3.connect(str(tmp_path))
+        try:
+            conn.executescript(_SCHEMA)
+            conn.executemany(
+                "INSERT INTO resources VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        pos,
+                        resource.get("id"),
+                        resource.get("resource_version"),
+                        json.dumps(resource),
+                    )
+                    for pos, resource in enumerate(resources)
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO gem5_versions VALUES (?, ?, ?)",
+                (
+                    (pos, idx, version)
+                    for pos, resource in enumerate(resources)
+                    for idx, version in enumerate(
+                        resource.get("gem5_versions", [])
+                    )
+                ),
+            )
+            meta.update(
+                {"catalog_version": _CATALOG_VERSION, "source": self.source}
+            )
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in meta.items()],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        self.close()
+        os.replace(tmp_path, self.db_path)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def get_resources(
+        self,
+        resource_id: Optional[str] = None,
+        resource_version: Optional[str] = None,
+        gem5_version: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns the resources matching the given ID, version and gem5
+        version, in the order of the source. This has the semantics of
+        ``AbstractClient.get_resources()``: ``resource_version`` is ignored
+        if ``resource_id`` is not set, and a resource is compatible with
+        ``gem5_version`` once for each of its gem5 versions that is a prefix
+        of it.
+        """
+        query = "SELECT r.json FROM resources r"
+        where = []
+        params = []
+        if gem5_version:
+            prefixes = sorted(
+                {gem5_version[:i] for i in range(len(gem5_version) + 1)}
+            )
+            query += " JOIN gem5_versions v ON v.pos = r.pos"
+            where.append(
+                "v.version IN (" + ", ".join("?" * len(prefixes)) + ")"
+            )
+            params.extend(prefixes)
+        if resource_id:
+            where.append("r.id = ?")
+            params.append(resource_id)
+            if resource_version:
+                where.append("r.resource_version = ?")
+                params.append(resource_version)
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY r.pos"
+        if gem5_version:
+            query += ", v.idx"
+
+        rows = self._connect().execute(query, params)
+        return [json.loads(row) for row, in rows]
@@ -181,11 +181,11 @@ class ClientWrapper:
                 )
             )
             if len(compatible_resources) == 0:
-                resource_to_return = self._sort_resources(resources)[0]
+                resource_to_return = self._latest_resource(resources)
             else:
-                resource_to_return = self._sort_resources(
+                resource_to_return = self._latest_resource(
                     compatible_resources
-                )[0]
+                )
 
         if gem5_version:
             self._check_resource_version_compatibility(
@@ -264,6 +264,23 @@ class ClientWrapper:
                     compatible_resources.append(resource)
         return compatible_resources
 
+    def _sort_tuple(self, resource: Dict) -> Tuple:
+        """This is used for sorting resources by ID and version. First
+        the ID is sorted, then the version. In cases where the version
+        contains periods, it's assumed this is to separate a
+        ``major.minor.hotfix`` style versioning system. In which case, the
+        value separated in the most-significant position is sorted before
+        those less significant. If the value is a digit it is cast as an
+        int, otherwise, it is cast as a string, to lower-case.
+        """
+        to_return = (resource["id"].lower(),)
+        for val in resource["resource_version"].split("."):
+            if val.isdigit():
+                to_return += (int(val),)
+            else:
+                to_return += (str(val).lower(),)
+        return to_return
+
     def _sort_resources(self, resources: List) -> List:
         """
         Sorts the resources by ID.
@@ -274,29 +291,16 @@ class ClientWrapper:
 
         :return: A list of sorted resources.
         """
+        return sorted(resources, key=self._sort_tuple, reverse=True)
 
-        def sort_tuple(resource: Dict) -> Tuple:
-            """This is used for sorting resources by ID and version. First
-            the ID is sorted, then the version. In cases where the version
-            contains periods, it's assumed this is to separate a
-            ``major.minor.hotfix`` style versioning system. In which case, the
-            value separated in the most-significant position is sorted before
-            those less significant. If the value is a digit it is cast as an
-            int, otherwise, it is cast as a string, to lower-case.
-            """
-            to_return = (resource["id"].lower(),)
-            for val in resource["resource_version"].split("."):
-                if val.isdigit():
-                    to_return += (int(val),)
-                else:
-                    to_return += (str(val).lower(),)
-            return to_return
+    def _latest_resource(self, resources: List) -> Dict:
+        """
+        Returns the first resource of ``_sort_resources(resources)``, in a
+        single pass over the resources instead of sorting them.
 
-        return sorted(
-            resources,
-            key=lambda resource: sort_tuple(resource),
-            reverse=True,
-        )
+        :param resources: A non-empty list of resources.
+        """
+        return max(resources, key=self._sort_tuple)
 
     def _check_resource_version_compatibility(
         self, resource: dict, gem5_version: Optional[str] = core.gem5Version
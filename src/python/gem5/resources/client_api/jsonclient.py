@@ -25,6 +25,8 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import json
+import os
+import sqlite3
 from pathlib import Path
 from typing import (
     Any,
@@ -36,38 +38,132 @@ from typing import (
     Union,
 )
 from urllib import request
-from urllib.error import URLError
+from urllib.error import (
+    HTTPError,
+    URLError,
+)
 
 from m5.util import warn
 
 from .abstract_client import AbstractClient
+from .catalog import (
+    ResourceCatalog,
+    sha256_bytes,
+)
 
 
 class JSONClient(AbstractClient):
-    def __init__(self, path: str):
+    def __init__(self, path: str, catalog_dir: Optional[str] = None):
         """
         Initializes a JSON client.
 
+        The resources are kept in a local ``ResourceCatalog``, which is only
+        rebuilt when the source changes: for a local file, when its size or
+        modification time changed and its content hash differs; for a URL,
+        when the server does not answer that it is unmodified. If a URL
+        cannot be reached, the last catalog built from it is used.
+
         :param path: The path to the Resource, either URL or local.
+        :param catalog_dir: The directory holding the resource catalogs. By
+                            default, ``GEM5_RESOURCE_CATALOG_DIR`` or
+                            ``~/.cache/gem5/catalogs``.
         """
         self.path = path
-        self.resources = []
+        self._resources = None
+        self._catalog = None
 
         if Path(self.path).is_file():
-            self.resources = json.load(open(self.path))
+            self._open_file(catalog_dir)
         elif not self._url_validator(self.path):
             raise Exception(
                 f"Resources location '{self.path}' is not a valid path or URL."
             )
         else:
-            req = request.Request(self.path)
-            try:
-                response = request.urlopen(req)
-            except URLError as e:
+            self._open_url(catalog_dir)
+
+    def _use_catalog(
+        self,
+        catalog: ResourceCatalog,
+        data: Optional[bytes],
+        meta: Dict[str, Any],
+    ) -> None:
+        """
+        Uses the catalog after making sure it holds the source ``data``.
+        ``data`` is ``None`` if the source is known to be unchanged.
+        """
+        try:
+            if data is not None:
+                digest = sha256_bytes(data)
+                if catalog.meta().get("sha256") == digest:
+                    catalog.update_meta(**meta)
+                else:
+                    self._resources = json.loads(data.decode("utf-8"))
+                    catalog.build(self._resources, sha256=digest, **meta)
+            self._catalog = catalog
+        except (OSError, sqlite3.Error) as e:
+            # The catalog is only a cache, carry on with the parsed source.
+            warn(f"Unable to cache Resources location '{self.path}': {e}")
+            catalog.close()
+            if self._resources is None:
+                self._resources = json.loads(data.decode("utf-8"))
+
+    def _open_file(self, catalog_dir: Optional[str]) -> None:
+        catalog = ResourceCatalog(
+            str(Path(self.path).resolve()),
+            Path(catalog_dir) if catalog_dir else None,
+        )
+        st = os.stat(self.path)
+        meta = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        known = catalog.meta()
+        if all(known.get(key) == value for key, value in meta.items()):
+            self._use_catalog(catalog, None, meta)
+        else:
+            with open(self.path, "rb") as f:
+                self._use_catalog(catalog, f.read(), meta)
+
+    def _open_url(self, catalog_dir: Optional[str]) -> None:
+        catalog = ResourceCatalog(
+            self.path, Path(catalog_dir) if catalog_dir else None
+        )
+        known = catalog.meta()
+        req = request.Request(self.path)
+        if known.get("etag"):
+            req.add_header("If-None-Match", known["etag"])
+        if known.get("last_modified"):
+            req.add_header("If-Modified-Since", known["last_modified"])
+
+        try:
+            response = request.urlopen(req)
+        except HTTPError as e:
+            if e.code == 304 and known:
+                self._use_catalog(catalog, None, {})
+                return
+            raise Exception(
+                f"Unable to open Resources location '{self.path}': {e}"
+            )
+        except URLError as e:
+            if not known:
                 raise Exception(
                     f"Unable to open Resources location '{self.path}': {e}"
                 )
-            self.resources = json.loads(response.read().decode("utf-8"))
+            warn(
+                f"Unable to open Resources location '{self.path}': {e}. "
+                f"Using the resources cached in '{catalog.db_path}'."
+            )
+            self._use_catalog(catalog, None, {})
+            return
+
+        meta = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        self._use_catalog(catalog, response.read(), meta)
+
+    @property
+    def resources(self) -> List[Dict[str, Any]]:
+        if self._resources is None:
+            self._resources = self._catalog.get_resources()
+        return self._resources
 
     def get_resources_json(self) -> List[Dict[str, Any]]:
         """Returns a JSON representation of the resources."""
@@ -79,6 +175,13 @@ class JSONClient(AbstractClient):
         resource_version: Optional[str] = None,
         gem5_version: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
+        if self._catalog is not None:
+            return self._catalog.get_resources(
+                resource_id=resource_id,
+                resource_version=resource_version,
+                gem5_version=gem5_version,
+            )
+
         filter = self.resources  # Unfiltered.
         if resource_id:
             filter = [  # Filter by resource_id.
@@ -51,6 +51,7 @@ from ..utils.progress_bar import (
 from .client import get_resource_json_obj
 from .client import list_resources as client_list_resources
 from .md5_utils import (
+    cached_md5,
     md5_dir,
     md5_file,
 )
@@ -258,24 +259,32 @@ def get_resource(
                        at ``to_path``.
     """
 
+    resource_json = get_resource_json_obj(
+        resource_name,
+        resource_version=resource_version,
+        clients=clients,
+        gem5_version=gem5_version,
+    )
+
+    # If the resource is present and unchanged since its md5 was last
+    # verified there is nothing to do, and no need to wait for the lock.
+    if (
+        os.path.exists(to_path)
+        and cached_md5(Path(to_path)) == resource_json["md5sum"]
+    ):
+        return
+
     # We apply a lock for a specific resource. This is to avoid circumstances
     # where multiple instances of gem5 are running and trying to obtain the
     # same resources at once. The timeout here is somewhat arbitarily put at 15
     # minutes.Most resources should be downloaded and decompressed in this
     # timeframe, even on the most constrained of systems.
     with FileLock(f"{to_path}.lock", timeout=900):
-        resource_json = get_resource_json_obj(
-            resource_name,
-            resource_version=resource_version,
-            clients=clients,
-            gem5_version=gem5_version,
-        )
-
         if os.path.exists(to_path):
             if os.path.isfile(to_path):
-                md5 = md5_file(Path(to_path))
+                md5 = md5_file(Path(to_path), use_cache=True)
             else:
-                md5 = md5_dir(Path(to_path))
+                md5 = md5_dir(Path(to_path), use_cache=True)
 
             if md5 == resource_json["md5sum"]:
                 # In this case, the file has already been download, no need to
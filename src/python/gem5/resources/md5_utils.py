@@ -26,8 +26,29 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Type
+from typing import (
+    List,
+    Optional,
+    Type,
+)
+
+# Size of the reads used to feed the hash. Large reads keep the per-call
+# overhead negligible on multi-GB disk images.
+_READ_SIZE = 1024 * 1024
+
+# Files of at least this size show a progress bar while they are hashed.
+_PROGRESS_BAR_SIZE = 1024 * 1024 * 100
+
+# The number of files in a directory whose contents are prefetched while an
+# earlier file is being hashed.
+_PREFETCH_DEPTH = 8
+
+# Suffix of the sidecar file caching the md5 of a resource.
+_CACHE_SUFFIX = ".md5cache"
 
 
 def _md5_update_from_file(
@@ -35,65 +56,193 @@ def _md5_update_from_file(
 ) -> Type[hashlib.md5]:
     assert filename.is_file()
 
-    if filename.stat().st_size < 1024 * 1024 * 100:
-        from ..utils.progress_bar import FakeTQDM
-
-        # if the file is less than 100MB, no need to show a progress bar.
-        tqdm = FakeTQDM()
-    else:
+    size = filename.stat().st_size
+    progress = None
+    # if the file is less than 100MB, no need to show a progress bar.
+    if size >= _PROGRESS_BAR_SIZE:
         from ..utils.progress_bar import tqdm
 
-    with tqdm.wrapattr(
-        open(str(filename), "rb"),
-        "read",
-        miniters=1,
-        desc=f"Computing md5sum on {filename}",
-        total=filename.stat().st_size,
-    ) as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash.update(chunk)
+        # This is None if tqdm is not installed.
+        progress = tqdm(
+            miniters=1, desc=f"Computing md5sum on {filename}", total=size
+        )
+
+    # tqdm can only wrap read() and write(), so the bar is updated by hand to
+    # keep reading into the same buffer.
+    buffer = bytearray(_READ_SIZE)
+    view = memoryview(buffer)
+    try:
+        with open(str(filename), "rb", buffering=0) as f:
+            for n in iter(lambda: f.readinto(buffer), 0):
+                hash.update(view[:n])
+                if progress is not None:
+                    progress.update(n)
+    finally:
+        if progress is not None:
+            progress.close()
     return hash
 
 
+def _prefetch(filename: Path) -> None:
+    """
+    Asks the kernel to start reading a file into the page cache so that it is
+    already in memory when it is hashed.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(str(filename), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _walk_dir(directory: Path) -> List[Path]:
+    """
+    Returns every entry below a directory in the order in which ``md5_dir``
+    hashes them.
+    """
+    entries = []
+    for path in sorted(directory.iterdir(), key=lambda p: str(p).lower()):
+        entries.append(path)
+        if path.is_dir():
+            entries.extend(_walk_dir(path))
+    return entries
+
+
 def _md5_update_from_dir(
     directory: Path, hash: Type[hashlib.md5]
 ) -> Type[hashlib.md5]:
     assert directory.is_dir()
-    for path in sorted(directory.iterdir(), key=lambda p: str(p).lower()):
-        hash.update(path.name.encode())
-        if path.is_file():
-            hash = _md5_update_from_file(path, hash)
-        elif path.is_dir():
-            hash = _md5_update_from_dir(path, hash)
+    entries = _walk_dir(directory)
+    files = [path for path in entries if path.is_file()]
+
+    # The digest depends on the order in which the files are fed to the hash,
+    # so the hashing itself stays sequential. The reads of the upcoming files
+    # are issued in parallel so the hash does not wait on the disk.
+    with ThreadPoolExecutor(max_workers=_PREFETCH_DEPTH) as executor:
+        prefetched = iter(files)
+        for path in files[:_PREFETCH_DEPTH]:
+            executor.submit(_prefetch, next(prefetched))
+        for path in entries:
+            hash.update(path.name.encode())
+            if path.is_file():
+                upcoming = next(prefetched, None)
+                if upcoming is not None:
+                    executor.submit(_prefetch, upcoming)
+                hash = _md5_update_from_file(path, hash)
     return hash
 
 
-def md5(path: Path) -> str:
+def _fingerprint(path: Path) -> List:
+    """
+    Returns the (inode, size, mtime) of a file, or of every entry below a
+    directory. If the fingerprint is unchanged the md5 is assumed to be too.
+    """
+    if path.is_file():
+        st = path.stat()
+        return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+    fingerprint = []
+    for entry in _walk_dir(path):
+        st = entry.stat()
+        fingerprint.append(
+            [
+                str(entry.relative_to(path)),
+                st.st_ino,
+                st.st_size if entry.is_file() else 0,
+                st.st_mtime_ns,
+            ]
+        )
+    return fingerprint
+
+
+def _cache_path(path: Path) -> Path:
+    return path.with_name(path.name + _CACHE_SUFFIX)
+
+
+def cached_md5(path: Path) -> Optional[str]:
+    """
+    Returns the md5 of a file or directory recorded in its sidecar cache, if
+    the path has not changed since. Returns ``None`` otherwise.
+
+    :param path: The path to get the cached md5 of.
+    """
+    try:
+        with open(_cache_path(path)) as f:
+            cache = json.load(f)
+        if cache["fingerprint"] == _fingerprint(path):
+            return cache["md5"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _store_md5(path: Path, fingerprint: List, md5: str) -> None:
+    cache = _cache_path(path)
+    tmp = cache.with_name(f"{cache.name}.{os.getpid()}")
+    try:
+        with open(tmp, "w") as f:
+            json.dump({"fingerprint": fingerprint, "md5": md5}, f)
+        os.replace(tmp, cache)
+    except OSError:
+        # The cache is only an optimization, e.g., the resource directory may
+        # be read-only.
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _with_cache(path: Path, compute, use_cache: bool) -> str:
+    if not use_cache:
+        return compute(path)
+
+    md5 = cached_md5(path)
+    if md5 is None:
+        fingerprint = _fingerprint(path)
+        md5 = compute(path)
+        _store_md5(path, fingerprint, md5)
+    return md5
+
+
+def md5(path: Path, use_cache: bool = False) -> str:
     """
     Gets the md5 value of a file or directory. ``md5_file`` is used if the path
     is a file and ``md5_dir`` is used if the path is a directory. An exception
     is returned if the path is not a valid file or directory.
 
     :param path: The path to get the md5 of.
+    :param use_cache: See ``md5_file``.
     """
     if path.is_file():
-        return md5_file(Path(path))
+        return md5_file(Path(path), use_cache=use_cache)
     elif path.is_dir():
-        return md5_dir(Path(path))
+        return md5_dir(Path(path), use_cache=use_cache)
     else:
         raise Exception(f"Path '{path}' is not a valid file or directory.")
 
 
-def md5_file(filename: Path) -> str:
+def md5_file(filename: Path, use_cache: bool = False) -> str:
     """
     Gives the md5 hash of a file.
 
     :filename: The file in which the md5 is to be calculated.
+    :use_cache: If ``True``, the md5 is stored in a ``<filename>.md5cache``
+                sidecar file, keyed by the file's inode, size and modification
+                time, and reused as long as those are unchanged.
     """
-    return str(_md5_update_from_file(filename, hashlib.md5()).hexdigest())
+    return _with_cache(
+        filename,
+        lambda f: str(_md5_update_from_file(f, hashlib.md5()).hexdigest()),
+        use_cache,
+    )
 
 
-def md5_dir(directory: Path) -> str:
+def md5_dir(directory: Path, use_cache: bool = False) -> str:
     """
     Gives the md5 value of a directory.
 
@@ -103,5 +252,14 @@ def md5_dir(directory: Path) -> str:
 
         The path of files are also hashed so the md5 of the directory changes
         if empty files are included or filenames are changed.
+
+    :use_cache: If ``True``, the md5 is stored in a ``<directory>.md5cache``
+                sidecar file and reused as long as the inode, size and
+                modification time of every entry in the directory are
+                unchanged.
     """
-    return str(_md5_update_from_dir(directory, hashlib.md5()).hexdigest())
+    return _with_cache(
+        directory,
+        lambda d: str(_md5_update_from_dir(d, hashlib.md5()).hexdigest()),
+        use_cache,
+    )
@@ -0,0 +1,179 @@
+# Copyright (c) 2024 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+The results of a sampled simulation, as run by ``Simulator.run_sampled()``.
+
+Each sample measures the cycles taken by a short window of instructions on
+the detailed processor. The CPI of the whole run is estimated as the total
+cycles over the total instructions of the samples, i.e., the mean CPI of the
+samples weighted by their instructions, with a confidence interval from the
+variance of that ratio estimator as in SMARTS (Wunderlich et al., ISCA 2003).
+"""
+
+import math
+from statistics import NormalDist
+from typing import (
+    List,
+    Optional,
+    Tuple,
+)
+
+
+class Sample:
+    """The measurement of one sample."""
+
+    def __init__(
+        self, index: int, tick: int, instructions: int, cycles: float
+    ) -> None:
+        """
+        :param index: The sequence number of the sample.
+        :param tick: The tick at which the measurement ended.
+        :param instructions: The number of instructions measured.
+        :param cycles: The number of cycles these instructions took.
+        """
+        self.index = index
+        self.tick = tick
+        self.instructions = instructions
+        self.cycles = cycles
+
+    def get_cpi(self) -> float:
+        return self.cycles / self.instructions
+
+    def to_json(self) -> dict:
+        return {
+            "index": self.index,
+            "tick": self.tick,
+            "instructions": self.instructions,
+            "cycles": self.cycles,
+        }
+
+    @classmethod
+    def from_json(cls, json: dict) -> "Sample":
+        return cls(
+            index=json["index"],
+            tick=json["tick"],
+            instructions=json["instructions"],
+            cycles=json["cycles"],
+        )
+
+
+class SampledCPI:
+    """The CPI estimated from a set of samples."""
+
+    def __init__(self, samples: List[Sample], confidence: float = 0.95):
+        """
+        :param samples: The samples. Samples without instructions are
+                        ignored.
+        :param confidence: The confidence level of the confidence interval.
+        """
+        if not 0 < confidence < 1:
+            raise ValueError("The confidence level must be in (0, 1).")
+
+        self.samples = sorted(
+            (sample for sample in samples if sample.instructions > 0),
+            key=lambda sample: sample.index,
+        )
+        self.confidence = confidence
+
+    def get_num_samples(self) -> int:
+        return len(self.samples)
+
+    def get_cpi(self) -> Optional[float]:
+        """
+        Returns the estimated CPI, or ``None`` if there are no samples.
+        """
+        if not self.samples:
+            return None
+        return sum(sample.cycles for sample in self.samples) / sum(
+            sample.instructions for sample in self.samples
+        )
+
+    def get_standard_error(self) -> Optional[float]:
+        """
+        Returns the standard error of the estimated CPI, or ``None`` if there
+        are less than two samples.
+        """
+        n = len(self.samples)
+        if n < 2:
+            return None
+        cpi = self.get_cpi()
+        mean_insts = sum(sample.instructions for sample in self.samples) / n
+        residuals = sum(
+            (sample.cycles - cpi * sample.instructions) ** 2
+            for sample in self.samples
+        )
+        return math.sqrt(residuals / (n - 1) / n) / mean_insts
+
+    def _z(self) -> float:
+        return NormalDist().inv_cdf(0.5 + self.confidence / 2)
+
+    def get_confidence_interval(self) -> Optional[Tuple[float, float]]:
+        """
+        Returns the confidence interval of the estimated CPI at the
+        confidence level of this estimate, or ``None`` if there are less
+        than two samples.
+        """
+        error = self.get_standard_error()
+        if error is None:
+            return None
+        cpi = self.get_cpi()
+        return (cpi - self._z() * error, cpi + self._z() * error)
+
+    def get_required_samples(self, relative_error: float = 0.03) -> int:
+        """
+        Returns the number of samples needed for the confidence interval to
+        be within ``relative_error`` of the estimated CPI, given the
+        variability of the samples so far.
+        """
+        error = self.get_standard_error()
+        if error is None:
+            raise ValueError("At least two samples are needed.")
+        n = len(self.samples)
+        variation = error * math.sqrt(n) / self.get_cpi()
+        return math.ceil((self._z() * variation / relative_error) ** 2)
+
+    def to_json(self) -> dict:
+        interval = self.get_confidence_interval()
+        return {
+            "cpi": self.get_cpi(),
+            "confidence": self.confidence,
+            "confidence_interval": list(interval) if interval else None,
+            "samples": [sample.to_json() for sample in self.samples],
+        }
+
+    def __str__(self) -> str:
+        if not self.samples:
+            return "No samples"
+        interval = self.get_confidence_interval()
+        if interval is None:
+            return f"CPI {self.get_cpi():.4f} (1 sample)"
+        half_width = (interval[1] - interval[0]) / 2
+        return (
+            f"CPI {self.get_cpi():.4f} +/- {half_width:.4f} "
+            f"({self.confidence:.0%} confidence, "
+            f"{len(self.samples)} samples)"
+        )
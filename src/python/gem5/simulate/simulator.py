@@ -24,8 +24,10 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import json
 import os
 import sys
+import traceback
 from pathlib import Path
 from typing import (
     Callable,
@@ -42,6 +44,7 @@ import m5.ticks
 from m5.ext.pystats.simstat import SimStat
 from m5.objects import Root
 from m5.stats import addStatVisitor
+from m5.stats.gem5stats import StatHandles
 from m5.util import warn
 
 from ..components.boards.abstract_board import AbstractBoard
@@ -55,6 +58,10 @@ from .exit_event_generators import (
     switch_generator,
     warn_default_decorator,
 )
+from .sampling import (
+    Sample,
+    SampledCPI,
+)
 
 
 class Simulator:
@@ -415,6 +422,37 @@ class Simulator:
 
         return m5.stats.gem5stats.get_simstat(self._root)
 
+    def stat_handles(self, paths: List[str]) -> StatHandles:
+        """
+        Resolves stats from their paths into handles whose current values
+        can be read cheaply and repeatedly, e.g., to poll a few stats from
+        an exit event generator. Unlike ``get_stats()``, reading the handles
+        only prepares and translates the selected stats.
+
+        .. code-block::
+
+            handles = simulator.stat_handles(
+                ["board.processor.cores.core.numCycles"]
+            )
+            cycles = handles.get()["board.processor.cores.core.numCycles"]
+
+        :param paths: The paths of the stats, as in ``stats.txt``. An
+                      element of a vector stat is selected with
+                      ``::<subname>``, ``::<index>`` or ``::total``.
+
+        :raises Exception: An exception is raised if this function is called
+                           before ``run()``. The board must be initialized
+                           before obtaining statistics.
+        :raises KeyError: If a path does not name a stat.
+        """
+
+        if not self._instantiated:
+            raise Exception(
+                "Cannot obtain simulation statistics prior to initialization."
+            )
+
+        return StatHandles(self._root, paths)
+
     def add_text_stats_output(self, path: str) -> None:
         """
         This function is used to set an output location for text stats. If
@@ -590,49 +628,272 @@ class Simulator:
                 self.get_last_exit_event_cause()
             )
 
-            # Check to see the run is corresponding to the expected execution
-            # order (assuming this check is demanded by the user).
-            if self._expected_execution_order:
-                expected_enum = self._expected_execution_order[
-                    self._exit_event_count
-                ]
-                if exit_enum.value != expected_enum.value:
-                    raise Exception(
-                        f"Expected a '{expected_enum.value}' exit event but a "
-                        f"'{exit_enum.value}' exit event was encountered."
-                    )
+            # If the generator returned True we will return from the Simulator
+            # run loop. In the case of a function: if it returned True.
+            if self._handle_exit_event(exit_enum):
+                return
+
+    # The cause of the exit events at the sample points of a sampled run.
+    _sample_cause = "sample point reached"
+
+    def run_sampled(
+        self,
+        interval: int,
+        measure: int,
+        functional_warmup: int = 0,
+        detailed_warmup: int = 0,
+        max_samples: Optional[int] = None,
+        max_processes: Optional[int] = None,
+        confidence: float = 0.95,
+        max_ticks: int = m5.MaxTick,
+    ) -> SampledCPI:
+        """
+        Runs a sampled simulation and returns the CPI estimated from the
+        samples.
+
+        The simulation fast-forwards on the starting cores of the processor,
+        which must be a ``SwitchableProcessor`` with a ``switch()`` function
+        such as ``SimpleSwitchableProcessor`` (typically starting with atomic
+        cores and switching to detailed ones). Every ``interval``
+        instructions, a child process is forked at the sample point while
+        this process keeps fast-forwarding. The child executes
+        ``functional_warmup`` instructions on the starting cores, switches
+        the processor, executes ``detailed_warmup`` instructions, then
+        resets the stats, measures ``measure`` instructions and dumps the
+        stats. Each sample's output is in the ``sampleN`` subdirectory of
+        the output directory, and the estimate is also written to
+        ``sampled_cpi.json`` in the output directory.
+
+        Exit events other than the sample points are handled as in ``run()``
+        and the sampling ends once one of them exits the simulation loop. In
+        a sample, any such exit event ends the sample without a measurement.
+
+        Instructions are counted on the first thread of the first core.
+
+        :param interval: The number of instructions between sample points.
+        :param measure: The number of instructions measured by each sample.
+        :param functional_warmup: The number of instructions executed on
+                                  the starting cores to warm up the caches
+                                  before switching to the detailed cores.
+        :param detailed_warmup: The number of instructions executed on the
+                                detailed cores before measuring.
+        :param max_samples: The maximum number of samples. By default, the
+                            sampling continues until the simulation ends.
+        :param max_processes: The maximum number of samples simulated at
+                              once. By default, the number of host CPUs.
+        :param confidence: The confidence level of the confidence interval
+                           of the estimated CPI.
+        :param max_ticks: The maximum number of ticks to execute per
+                          simulation run, as in ``run()``, both while
+                          fast-forwarding and in each step of a sample. A
+                          ``MAX_TICK`` exit event in a sample ends it without
+                          a measurement.
+        """
 
-            # Record the current tick and exit event enum.
-            self._tick_stopwatch.append((exit_enum, self.get_current_tick()))
-
-            try:
-                # If the user has specified their own generator for this exit
-                # event, use it.
-                exit_on_completion = next(self._on_exit_event[exit_enum])
-            except StopIteration:
-                # If the user's generator has ended, throw a warning and use
-                # the default generator for this exit event.
-                warn(
-                    "User-specified generator/function list for the exit "
-                    f"event'{exit_enum.value}' has ended. Using the default "
-                    "generator."
+        if interval <= 0 or measure <= 0:
+            raise ValueError(
+                "The sampling interval and the number of instructions "
+                "measured must be positive."
+            )
+        processor = self._board.get_processor()
+        if not isinstance(processor, SwitchableProcessor) or not hasattr(
+            processor, "switch"
+        ):
+            raise Exception(
+                "Sampled simulation requires a SwitchableProcessor with a "
+                "`switch()` function, such as a SimpleSwitchableProcessor."
+            )
+        if max_processes is None:
+            max_processes = os.cpu_count() or 1
+
+        # The simulator cannot be forked with listeners enabled, and they
+        # can only be disabled before instantiation.
+        if not self._instantiated:
+            m5.disableAllListeners()
+        elif not m5.listenersDisabled():
+            raise Exception(
+                "Sampled simulation requires the listeners to be disabled "
+                "before the board is instantiated."
+            )
+        self._instantiate()
+
+        outdir = m5.options.outdir
+        running = {}
+        completed = []
+
+        def wait_for_sample():
+            pid, status = os.wait()
+            if pid not in running:
+                return
+            index = running.pop(pid)
+            if status != 0:
+                warn(f"Sample {index} failed with status {status}.")
+                return
+            path = os.path.join(outdir, f"sample{index}", "sample.json")
+            # There is no measurement if the workload ended before it.
+            if os.path.exists(path):
+                with open(path) as f:
+                    completed.append(Sample.from_json(json.load(f)))
+
+        index = 0
+        while max_samples is None or index < max_samples:
+            core = processor.get_cores()[0].get_simobject()
+            core.scheduleInstStop(0, interval, self._sample_cause)
+
+            exit_simulation = False
+            while True:
+                self._last_exit_event = m5.simulate(max_ticks)
+                cause = self.get_last_exit_event_cause()
+                if cause == self._sample_cause:
+                    break
+                if self._handle_exit_event(
+                    ExitEvent.translate_exit_status(cause)
+                ):
+                    exit_simulation = True
+                    break
+            if exit_simulation:
+                break
+
+            while len(running) >= max_processes:
+                wait_for_sample()
+
+            # Don't let the child inherit buffered output
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = m5.fork(os.path.join("%(parent)s", f"sample{index}"))
+            if pid == 0:
+                self._run_sample(
+                    index,
+                    functional_warmup,
+                    detailed_warmup,
+                    measure,
+                    max_ticks,
                 )
-                exit_on_completion = next(
-                    self._default_on_exit_dict[exit_enum]
+            running[pid] = index
+            index += 1
+
+        while running:
+            wait_for_sample()
+
+        result = SampledCPI(completed, confidence=confidence)
+        with open(os.path.join(outdir, "sampled_cpi.json"), "w") as f:
+            json.dump(result.to_json(), f, indent=4)
+        return result
+
+    def _simulate_instructions(
+        self, instructions: int, max_ticks: int
+    ) -> bool:
+        """
+        Simulates the given number of instructions and returns whether they
+        were all executed, i.e., whether the workload did not end and
+        ``max_ticks`` did not pass first.
+        """
+        core = self._board.get_processor().get_cores()[0].get_simobject()
+        core.scheduleInstStop(0, instructions, self._sample_cause)
+        self._last_exit_event = m5.simulate(max_ticks)
+        return self.get_last_exit_event_cause() == self._sample_cause
+
+    def _run_sample(
+        self,
+        index: int,
+        functional_warmup: int,
+        detailed_warmup: int,
+        measure: int,
+        max_ticks: int,
+    ) -> None:
+        """
+        Simulates a sample in a forked child and exits the child, recording
+        the measurement in ``sample.json`` in its output directory.
+        """
+        status = 0
+        try:
+            processor = self._board.get_processor()
+            if functional_warmup and not self._simulate_instructions(
+                functional_warmup, max_ticks
+            ):
+                return
+            processor.switch()
+            if detailed_warmup and not self._simulate_instructions(
+                detailed_warmup, max_ticks
+            ):
+                return
+
+            cores = [core.get_simobject() for core in processor.get_cores()]
+
+            def totals():
+                return (
+                    sum(core.totalInsts() for core in cores),
+                    sum(core.resolveStat("numCycles").value for core in cores),
                 )
-            except KeyError:
-                # If the user has not specified their own generator for this
-                # exit event, use the default.
-                exit_on_completion = next(
-                    self._default_on_exit_dict[exit_enum]
+
+            m5.stats.reset()
+            start_insts, start_cycles = totals()
+            if not self._simulate_instructions(measure, max_ticks):
+                return
+            m5.stats.dump()
+            end_insts, end_cycles = totals()
+
+            sample = Sample(
+                index=index,
+                tick=m5.curTick(),
+                instructions=end_insts - start_insts,
+                cycles=end_cycles - start_cycles,
+            )
+            with open(
+                os.path.join(m5.options.outdir, "sample.json"), "w"
+            ) as f:
+                json.dump(sample.to_json(), f)
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+        finally:
+            # The child must not return into the parent's simulation loop.
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(status)
+
+    def _handle_exit_event(self, exit_enum: ExitEvent) -> bool:
+        """
+        Runs the generator for an exit event and returns whether the
+        simulation loop is to exit.
+        """
+
+        # Check to see the run is corresponding to the expected execution
+        # order (assuming this check is demanded by the user).
+        if self._expected_execution_order:
+            expected_enum = self._expected_execution_order[
+                self._exit_event_count
+            ]
+            if exit_enum.value != expected_enum.value:
+                raise Exception(
+                    f"Expected a '{expected_enum.value}' exit event but a "
+                    f"'{exit_enum.value}' exit event was encountered."
                 )
 
-            self._exit_event_count += 1
+        # Record the current tick and exit event enum.
+        self._tick_stopwatch.append((exit_enum, self.get_current_tick()))
 
-            # If the generator returned True we will return from the Simulator
-            # run loop. In the case of a function: if it returned True.
-            if exit_on_completion:
-                return
+        try:
+            # If the user has specified their own generator for this exit
+            # event, use it.
+            exit_on_completion = next(self._on_exit_event[exit_enum])
+        except StopIteration:
+            # If the user's generator has ended, throw a warning and use
+            # the default generator for this exit event.
+            warn(
+                "User-specified generator/function list for the exit "
+                f"event'{exit_enum.value}' has ended. Using the default "
+                "generator."
+            )
+            exit_on_completion = next(self._default_on_exit_dict[exit_enum])
+        except KeyError:
+            # If the user has not specified their own generator for this
+            # exit event, use the default.
+            exit_on_completion = next(self._default_on_exit_dict[exit_enum])
+
+        self._exit_event_count += 1
+
+        return bool(exit_on_completion)
 
     def save_checkpoint(self, checkpoint_dir: Path) -> None:
         """
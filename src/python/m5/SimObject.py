@@ -40,6 +40,7 @@
 
 import inspect
 import sys
+from contextlib import contextmanager
 from functools import wraps
 from types import (
     FunctionType,
@@ -118,6 +119,12 @@ allClasses = {}
 # dict to look up SimObjects based on path
 instanceDict = {}
 
+# Index of the children and params that find_any() and find_all() have to
+# look at for a given ptype, as {obj: {(kind, ptype): candidates}}. It is
+# only kept while typeIndex() is active, i.e. while m5.instantiate()
+# resolves proxies, and is None otherwise.
+_type_index = None
+
 # Did any of the SimObjects lack a header file?
 noCxxHeader = False
 
@@ -737,6 +744,7 @@ class SimObject(metaclass=MetaSimObject):
         # initialize required attributes
         self._parent = None
         self._name = None
+        self._path = None  # path() cached by freeze_path()
         self._ccObject = None  # pointer to C++ object
         self._ccParams = None
         self._instantiated = False  # really "cloned"
@@ -934,11 +942,13 @@ class SimObject(metaclass=MetaSimObject):
     def clear_parent(self, old_parent):
         assert self._parent is old_parent
         self._parent = None
+        self._path = None
 
     # Also implemented by SimObjectVector
     def set_parent(self, parent, name):
         self._parent = parent
         self._name = name
+        self._path = None
 
     # Return parent object of this SimObject, not implemented by
     # SimObjectVector because the elements in a SimObjectVector may not share
@@ -960,6 +970,7 @@ class SimObject(metaclass=MetaSimObject):
         child = self._children[name]
         child.clear_parent(self)
         del self._children[name]
+        self._invalidate_type_index()
 
     # Add a new child to this object.
     def add_child(self, name, child):
@@ -980,6 +991,7 @@ class SimObject(metaclass=MetaSimObject):
         if not isNullPointer(child):
             child.set_parent(self, name)
             self._children[name] = child
+            self._invalidate_type_index()
 
     # Take SimObject-valued parameters that haven't been explicitly
     # assigned as children and make them children of the object that
@@ -998,6 +1010,8 @@ class SimObject(metaclass=MetaSimObject):
                 self.add_child(key, val)
 
     def path(self):
+        if self._path is not None:
+            return self._path
         if not self._parent:
             return f"<orphan {self.__class__}>"
         elif isinstance(self._parent, MetaSimObject):
@@ -1008,6 +1022,13 @@ class SimObject(metaclass=MetaSimObject):
             return self._name
         return ppath + "." + self._name
 
+    # Cache the result of path(). Only valid once the hierarchy can no longer
+    # change, and parents must be frozen before their children so that each
+    # path is built from the cached path of the parent.
+    def freeze_path(self):
+        self._path = None
+        self._path = self.path()
+
     def path_list(self):
         if self._parent:
             return self._parent.path_list() + [self._name]
@@ -1024,17 +1045,83 @@ class SimObject(metaclass=MetaSimObject):
     def ini_str(self):
         return self.path()
 
+    # Drop the type index of this object and of its ancestors, whose
+    # find_all() candidates include the children of this object.
+    def _invalidate_type_index(self):
+        if _type_index is None:
+            return
+        obj = self
+        while obj is not None:
+            _type_index.pop(obj, None)
+            obj = obj._parent
+
+    def _indexed(self, kind, ptype, build):
+        if _type_index is None:
+            return build(ptype)
+        index = _type_index.setdefault(self, {})
+        key = (kind, ptype)
+        if key not in index:
+            index[key] = build(ptype)
+        return index[key]
+
+    # The params of this object that may hold an object of type ptype
+    def _param_candidates(self, ptype):
+        return [
+            pname
+            for pname, pdesc in self._params.items()
+            if issubclass(pdesc.ptype, ptype)
+        ]
+
+    # The children and params that find_any() has to look at
+    def _any_candidates(self, ptype):
+        children = [
+            child
+            for child in self._children.values()
+            if isinstance(child, ptype)
+        ]
+        return children, self._param_candidates(ptype)
+
+    # The objects of type ptype in the sub-tree, and the (object, param)
+    # pairs of the sub-tree that may hold one, that find_all() collects
+    def _all_candidates(self, ptype):
+        objs = []
+        params = []
+        for child in self._children.values():
+            # a child could be a list, so ensure we visit each item
+            if isinstance(child, list):
+                children = child
+            else:
+                children = [child]
+
+            for child in children:
+                if (
+                    isinstance(child, ptype)
+                    and not isproxy(child)
+                    and not isNullPointer(child)
+                ):
+                    objs.append(child)
+                if isSimObject(child):
+                    # also add the candidates of the child itself
+                    child_objs, child_params = child._indexed(
+                        "all", ptype, child._all_candidates
+                    )
+                    objs += child_objs
+                    params += child_params
+        params += [(self, pname) for pname in self._param_candidates(ptype)]
+        return objs, params
+
     def find_any(self, ptype):
         if isinstance(self, ptype):
             return self, True
 
+        children, pnames = self._indexed("any", ptype, self._any_candidates)
         found_obj = None
-        for child in self._children.values():
+        for child in children:
             visited = False
             if hasattr(child, "_visited"):
                 visited = getattr(child, "_visited")
 
-            if isinstance(child, ptype) and not visited:
+            if not visited:
                 if found_obj != None and child != found_obj:
                     raise AttributeError(
                         "parent.any matched more than one: %s %s"
@@ -1042,44 +1129,25 @@ class SimObject(metaclass=MetaSimObject):
                     )
                 found_obj = child
         # search param space
-        for pname, pdesc in self._params.items():
-            if issubclass(pdesc.ptype, ptype):
-                match_obj = self._values[pname]
-                if found_obj != None and found_obj != match_obj:
-                    raise AttributeError(
-                        "parent.any matched more than one: %s and %s"
-                        % (found_obj.path, match_obj.path)
-                    )
-                found_obj = match_obj
+        for pname in pnames:
+            match_obj = self._values[pname]
+            if found_obj != None and found_obj != match_obj:
+                raise AttributeError(
+                    "parent.any matched more than one: %s and %s"
+                    % (found_obj.path, match_obj.path)
+                )
+            found_obj = match_obj
         return found_obj, found_obj != None
 
     def find_all(self, ptype):
-        all = {}
-        # search children
-        for child in self._children.values():
-            # a child could be a list, so ensure we visit each item
-            if isinstance(child, list):
-                children = child
-            else:
-                children = [child]
-
-            for child in children:
-                if (
-                    isinstance(child, ptype)
-                    and not isproxy(child)
-                    and not isNullPointer(child)
-                ):
-                    all[child] = True
-                if isSimObject(child):
-                    # also add results from the child itself
-                    child_all, done = child.find_all(ptype)
-                    all.update(dict(zip(child_all, [done] * len(child_all))))
-        # search param space
-        for pname, pdesc in self._params.items():
-            if issubclass(pdesc.ptype, ptype):
-                match_obj = self._values[pname]
-                if not isproxy(match_obj) and not isNullPointer(match_obj):
-                    all[match_obj] = True
+        objs, params = self._indexed("all", ptype, self._all_candidates)
+        # search children of the whole sub-tree
+        all = dict.fromkeys(objs, True)
+        # search param space of the whole sub-tree
+        for obj, pname in params:
+            match_obj = obj._values[pname]
+            if not isproxy(match_obj) and not isNullPointer(match_obj):
+                all[match_obj] = True
         # Also make sure to sort the keys based on the objects' path to
         # ensure that the order is the same on all hosts
         return sorted(all.keys(), key=lambda o: o.path()), True
@@ -1389,6 +1457,21 @@ baseClasses = allClasses.copy()
 baseInstances = instanceDict.copy()
 
 
+# Index the candidates of find_any() and find_all() while the block runs.
+# The index is kept up to date as children are added and removed, but not as
+# classes gain new params, so it should only be active once the hierarchy is
+# complete.
+@contextmanager
+def typeIndex():
+    global _type_index
+
+    _type_index = {}
+    try:
+        yield
+    finally:
+        _type_index = None
+
+
 def clear():
     global allClasses, instanceDict, noCxxHeader
 
@@ -25,17 +25,62 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import re
+import weakref
 from typing import (
     Callable,
+    Dict,
+    Iterator,
     List,
     Optional,
     Pattern,
+    Tuple,
     Union,
 )
 
 from .serializable_stat import SerializableStat
 
 
+class _StatIndex:
+    """
+    The flattened index of the stats under an ``AbstractStat``: every stat
+    with its dotted path, in the order they are found by ``children()``,
+    plus the positions of the stats of each name and the results of the
+    ``find()`` calls made so far.
+    """
+
+    def __init__(self, root: "AbstractStat"):
+        self.version = _tree_version
+        self.stats = []
+        self.paths = {}
+        self.positions = {}
+        for position, (path, name, stat) in enumerate(root._walk()):
+            self.stats.append(stat)
+            self.paths.setdefault(path, stat)
+            self.positions.setdefault(name, []).append(position)
+        self.found = {}
+
+    def find(self, pattern: Pattern) -> List["AbstractStat"]:
+        key = (pattern.pattern, pattern.flags)
+        if key not in self.found:
+            # Names repeat a lot, e.g., one per core, so match each once.
+            positions = []
+            for name, name_positions in self.positions.items():
+                if pattern.match(name):
+                    positions.extend(name_positions)
+            positions.sort()
+            self.found[key] = [self.stats[p] for p in positions]
+        return list(self.found[key])
+
+
+# The indexes are kept out of the stats, whose attributes are their
+# children and are all serialized.
+_indexes = weakref.WeakKeyDictionary()
+
+# Changed whenever a stat is added to, replaced in or removed from any
+# stat. A stat does not know its parents, so this outdates every index.
+_tree_version = 0
+
+
 class AbstractStat(SerializableStat):
     """
     An abstract class which all PyStats inherit from.
@@ -43,6 +88,65 @@ class AbstractStat(SerializableStat):
     All PyStats are JsonSerializable.
     """
 
+    def __setattr__(self, name: str, value) -> None:
+        if isinstance(value, AbstractStat) or isinstance(
+            self.__dict__.get(name), AbstractStat
+        ):
+            global _tree_version
+            _tree_version += 1
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name: str) -> None:
+        if isinstance(self.__dict__.get(name), AbstractStat):
+            global _tree_version
+            _tree_version += 1
+        super().__delattr__(name)
+
+    def _walk(
+        self, prefix: str = ""
+    ) -> Iterator[Tuple[str, str, "AbstractStat"]]:
+        """Yields the (path, name, stat) of all the stats under this one,
+        depth first, each before its own children."""
+        for attr, obj in self.__dict__.items():
+            if isinstance(obj, AbstractStat):
+                path = prefix + attr
+                yield path, attr, obj
+                yield from obj._walk(path + ".")
+
+    def _index(self) -> _StatIndex:
+        index = _indexes.get(self)
+        if index is None or index.version != _tree_version:
+            index = _StatIndex(self)
+            _indexes[self] = index
+        return index
+
+    def invalidate_index(self) -> None:
+        """
+        Drops the index used by ``find()``, ``get()`` and ``select()``.
+        The index is rebuilt whenever a stat is set or deleted as an
+        attribute of any stat, so this is only needed after changing the
+        ``__dict__`` of a stat directly.
+        """
+        _indexes.pop(self, None)
+
+    def iter_children(
+        self,
+        predicate: Optional[Callable[[str], bool]] = None,
+        recursive: bool = False,
+    ) -> Iterator["AbstractStat"]:
+        """Iterate through all of the children, optionally with a predicate.
+        This is the generator version of ``children()``."""
+        if not recursive:
+            for attr, obj in self.__dict__.items():
+                if isinstance(obj, AbstractStat):
+                    if not predicate or predicate(attr):
+                        yield obj
+            return
+
+        for _, name, obj in self._walk():
+            if not predicate or predicate(name):
+                yield obj
+
     def children(
         self,
         predicate: Optional[Callable[[str], bool]] = None,
@@ -62,18 +166,7 @@ class AbstractStat(SerializableStat):
                           all children are returned.
         """
 
-        to_return = []
-        for attr in self.__dict__:
-            obj = getattr(self, attr)
-            if isinstance(obj, AbstractStat):
-                if (predicate and predicate(attr)) or not predicate:
-                    to_return.append(obj)
-                if recursive:
-                    to_return = to_return + obj.children(
-                        predicate=predicate, recursive=True
-                    )
-
-        return to_return
+        return list(self.iter_children(predicate, recursive))
 
     def find(self, regex: Union[str, Pattern]) -> List["AbstractStat"]:
         """Find all stats that match the name, recursively through all the
@@ -89,6 +182,12 @@ class AbstractStat(SerializableStat):
 
             The above will not match ``cpu_other``.
 
+        .. note::
+
+            The stats are indexed the first time they are searched, and the
+            results of each regex are cached until a stat is added, replaced
+            or removed. See ``invalidate_index()``.
+
         :param regex: The regular expression used to search. Can be a
                 precompiled regex or a string in regex format.
         """
@@ -96,6 +195,32 @@ class AbstractStat(SerializableStat):
             pattern = re.compile(regex)
         else:
             pattern = regex
-        return self.children(
-            lambda _name: re.match(pattern, _name), recursive=True
-        )
+        return self._index().find(pattern)
+
+    def get(self, path: str) -> Optional["AbstractStat"]:
+        """Returns the stat at a dotted path relative to this stat, e.g.,
+        ``board.processor.cores.core.numCycles``, or ``None``. The elements
+        of a Vector can also be selected with ``::``, as in ``stats.txt``.
+        """
+        return self._index().paths.get(path.replace("::", "."))
+
+    def select(self, paths: List[str]):
+        """Returns the values of the stats at the given dotted paths (see
+        ``get()``) as a NumPy float64 array, for bulk analysis. Stats which
+        do not exist or do not have a numeric value are NaN.
+
+        .. code-block::
+
+            >>> simstat.select(['board.processor.cores.core.numCycles'])
+            array([123456.])
+        """
+        import numpy as np
+
+        values = np.full(len(paths), np.nan)
+        index_paths = self._index().paths
+        for i, path in enumerate(paths):
+            stat = index_paths.get(path.replace("::", "."))
+            value = getattr(stat, "value", None)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values[i] = value
+        return values
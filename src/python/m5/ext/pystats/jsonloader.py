@@ -24,10 +24,22 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import codecs
 import json
-from json.decoder import JSONDecodeError
+import re
+from json.decoder import (
+    JSONDecodeError,
+    scanstring,
+)
 from typing import (
     IO,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
     Union,
 )
 
@@ -113,3 +125,323 @@ def load(json_file: IO) -> SimStat:
 
     simstat_object = json.load(json_file, cls=JsonLoader)
     return simstat_object
+
+
+_STATISTIC_TYPES = {
+    "Scalar": Scalar,
+    "Distribution": Distribution,
+    "Accumulator": Accumulator,
+}
+
+_WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+# Everything up to the next bracket which is not in a string.
+_BRACKET_RE = re.compile(
+    r'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*([{}\[\]])'
+)
+# gem5 writes the value of a statistic first, which tells a statistic from a
+# group before any of it is parsed.
+_STATISTIC_START_RE = re.compile(r'\{\s*"value"\s*:')
+
+
+class _StreamParser:
+    """
+    An incremental parser of a stream of stats JSON documents. The stream is
+    read a chunk at a time and only the parts of it under the selected paths
+    are decoded, the rest being skipped over by bracket matching. Each
+    document is either a SimStat object, i.e., one dump, or an array of them.
+    """
+
+    chunk_size = 1 << 20
+
+    def __init__(self, json_file: IO, paths: Optional[Iterable[str]]):
+        self._file = json_file
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+        if paths is None:
+            self._paths = None
+            self._prefixes = set()
+        else:
+            self._paths = {path.replace("::", ".") for path in paths}
+            self._prefixes = {
+                path[:i]
+                for path in self._paths
+                for i, c in enumerate(path)
+                if c == "."
+            }
+        self.dumps = 0
+
+    def _fill(self, size: int = 0) -> bool:
+        """Reads more of the file. Returns ``False`` at the end of it."""
+        if self._eof:
+            return False
+        data = self._file.read(max(size, self.chunk_size))
+        if isinstance(data, bytes):
+            data = self._utf8.decode(data, not data)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos :] + data
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Skips whitespace and returns the next character, or ``""``."""
+        while True:
+            self._pos = _WHITESPACE_RE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise JSONDecodeError(f"Expecting '{char}'", self._buf, self._pos)
+        self._pos += 1
+
+    def _value(self) -> Any:
+        """Decodes the next value."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except JSONDecodeError:
+                # Growing the read with the buffer bounds the retries of a
+                # large value.
+                if not self._fill(len(self._buf)):
+                    raise
+                continue
+            # A number may continue in the next chunk.
+            if end < len(self._buf) or not self._fill():
+                self._pos = end
+                return value
+
+    def _key(self) -> str:
+        self._expect('"')
+        while True:
+            try:
+                key, self._pos = scanstring(self._buf, self._pos)
+                return key
+            except JSONDecodeError:
+                if not self._fill(len(self._buf)):
+                    raise
+
+    def _skip(self) -> None:
+        """Skips over the next value without decoding it."""
+        if self._peek() not in "{[":
+            self._value()
+            return
+
+        depth = 0
+        while True:
+            match = _BRACKET_RE.match(self._buf, self._pos)
+            if match is None:
+                if not self._fill(len(self._buf)):
+                    raise JSONDecodeError(
+                        "Unterminated value", self._buf, self._pos
+                    )
+                continue
+            self._pos = match.end()
+            depth += 1 if match.group(1) in "{[" else -1
+            if depth == 0:
+                return
+
+    def _is_statistic_start(self) -> bool:
+        while True:
+            if _STATISTIC_START_RE.match(self._buf, self._pos):
+                return True
+            if len(self._buf) - self._pos >= 64 or not self._fill():
+                return False
+
+    def _object(self, path: str, selected: bool) -> Iterator[Tuple[str, Any]]:
+        """
+        Parses the object at ``path``, yielding the path and the JSON object
+        of each selected statistic in it, and the path and value of each
+        selected field of a dump.
+        """
+        if selected and self._is_statistic_start():
+            fields = self._value()
+            if fields.get("type") in _STATISTIC_TYPES:
+                yield path, fields
+            return
+
+        fields = {}
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._key()
+            self._expect(":")
+            child = f"{path}.{key}" if path else key
+            child_selected = selected or (
+                self._paths is None or child in self._paths
+            )
+
+            if self._peek() == "{" and (
+                child_selected or child in self._prefixes
+            ):
+                nested = None
+                for item in self._object(child, child_selected):
+                    if item[0] == child:
+                        nested = item
+                    else:
+                        yield item
+                if nested is not None and (
+                    not path or nested[1].get("type") in _STATISTIC_TYPES
+                ):
+                    yield nested
+            elif child_selected and not path:
+                # A field of the dump itself, e.g., its simulated end time.
+                yield key, self._value()
+            elif child_selected:
+                fields[key] = self._value()
+            else:
+                self._skip()
+
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                break
+            if separator != ",":
+                raise JSONDecodeError(
+                    "Expecting ',' delimiter", self._buf, self._pos - 1
+                )
+
+        if selected and (
+            fields.get("type") in _STATISTIC_TYPES or "type" not in fields
+        ):
+            # A statistic, or a plain object such as a time conversion.
+            yield path, fields
+
+    def _dump(self) -> Iterator[Tuple[int, str, Any]]:
+        dump = self.dumps
+        for path, value in self._object("", False):
+            yield dump, path, value
+        self.dumps += 1
+
+    def __iter__(self) -> Iterator[Tuple[int, str, Any]]:
+        while True:
+            char = self._peek()
+            if char == "":
+                return
+            if char == "{":
+                yield from self._dump()
+            elif char == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                    continue
+                while True:
+                    yield from self._dump()
+                    separator = self._peek()
+                    self._pos += 1
+                    if separator == "]":
+                        break
+                    if separator != ",":
+                        raise JSONDecodeError(
+                            "Expecting ',' delimiter",
+                            self._buf,
+                            self._pos - 1,
+                        )
+            else:
+                raise JSONDecodeError(
+                    "Expecting a SimStat object", self._buf, self._pos
+                )
+
+
+def iter_stats(
+    json_file: IO, paths: Optional[Iterable[str]] = None
+) -> Iterator[Tuple[int, str, Any]]:
+    """
+    Parses a stats JSON file incrementally, yielding each selected statistic
+    as soon as it has been read. Only the selected statistics are decoded,
+    so memory use does not depend on the size of the file.
+
+    The file may hold a single dump, several dumps written one after the
+    other, or a JSON array of dumps.
+
+    Usage
+    -----
+
+    .. code-block::
+
+            from m5.ext.pystats.jsonloader import iter_stats
+
+            with open(path) as f:
+                for dump, path, stat in iter_stats(
+                    f, ["board.processor.cores0.core.numCycles"]
+                ):
+                    print(dump, path, stat.value)
+
+    :param json_file: The file to parse, opened in text or binary mode.
+    :param paths: The dotted paths of the statistics to select. A path
+                  naming a group selects every statistic under it, and a
+                  path naming a field of the dump, e.g.,
+                  ``simulated_end_time``, selects that field. ``::`` may
+                  be used in place of ``.``, as in ``AbstractStat.get``.
+                  By default, everything is selected.
+
+    :returns: The index of the dump, the path of the statistic and the
+              ``Statistic`` (or value of the dump field) of every selected
+              statistic, in the order of the file.
+    """
+
+    for dump, path, value in _StreamParser(json_file, paths):
+        if isinstance(value, dict) and value.get("type") in _STATISTIC_TYPES:
+            fields = dict(value)
+            # Accumulators are serialized with their private count.
+            if "_count" in fields:
+                fields["count"] = fields.pop("_count")
+            value = _STATISTIC_TYPES[fields.pop("type")](**fields)
+        yield dump, path, value
+
+
+def load_columns(
+    json_file: IO, paths: Optional[Iterable[str]] = None
+) -> Dict[str, List[Any]]:
+    """
+    Reads the selected statistics of every dump of a stats JSON file in one
+    pass, as a column of values per statistic.
+
+    Usage
+    -----
+
+    .. code-block::
+
+            import pandas as pd
+            from m5.ext.pystats.jsonloader import load_columns
+
+            with open(path) as f:
+                columns = load_columns(
+                    f, ["board.processor", "simulated_end_time"]
+                )
+            df = pd.DataFrame(columns)
+
+    :param json_file: The file to parse, opened in text or binary mode.
+    :param paths: The statistics to select, as in ``iter_stats``.
+
+    :returns: A dictionary mapping the dotted path of each selected statistic
+              to a list holding its value in each dump, in order. The value
+              of a scalar is a number, and that of a distribution or an
+              accumulator is the list of its bins. A statistic missing from a
+              dump has the value ``None`` in that dump.
+    """
+
+    parser = _StreamParser(json_file, paths)
+    columns = {}
+    for dump, path, value in parser:
+        if isinstance(value, dict) and value.get("type") in _STATISTIC_TYPES:
+            value = value.get("value")
+        column = columns.get(path)
+        if column is None:
+            column = columns[path] = []
+        column.extend([None] * (dump - len(column)))
+        column.append(value)
+
+    for column in columns.values():
+        column.extend([None] * (parser.dumps - len(column)))
+    return columns
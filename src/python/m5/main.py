@@ -261,6 +261,13 @@ def parse_options():
         help="Create DOT & pdf outputs of the DVFS configuration"
         + " [Default: %default]",
     )
+    option(
+        "--instantiate-times",
+        metavar="FILE",
+        default=None,
+        help="Dump the time spent in each phase of m5.instantiate() and"
+        + " startup as JSON [Default: %default]",
+    )
 
     # Debugging options
     group("Debugging Options")
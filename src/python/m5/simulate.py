@@ -38,8 +38,11 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import atexit
+import json
 import os
 import sys
+import time
+from contextlib import contextmanager
 
 from m5.util.dot_writer import (
     do_dot,
@@ -74,11 +77,44 @@ _drain_manager = _m5.drain.DrainManager.instance()
 
 _instantiated = False  # Has m5.instantiate() been called?
 
+# The SimObject hierarchy in root.descendants() order. It is frozen once
+# instantiate() has adopted orphans and resolved proxies, as the hierarchy
+# cannot change after that, and reused by every later pass over it.
+_frozen_descendants = None
+
+# Wall-clock seconds spent in each phase of instantiate() and startup.
+_instantiate_times = {}
+
+
+@contextmanager
+def _timed_phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _instantiate_times[name] = time.perf_counter() - start
+
+
+def _descendants(root):
+    """Returns the descendants of root, using the frozen hierarchy when root
+    is the instantiated Root."""
+    if _frozen_descendants is not None and root is objects.Root.getInstance():
+        return _frozen_descendants
+    return root.descendants()
+
+
+def getInstantiateTimes():
+    """Returns a dict of the wall-clock seconds spent in each phase of
+    m5.instantiate() and of the simulation startup, in the order the phases
+    ran."""
+    return dict(_instantiate_times)
+
 
 # The final call to instantiate the SimObject graph and initialize the
 # system.
 def instantiate(ckpt_dir=None):
     global _instantiated
+    global _frozen_descendants
     from m5 import options
 
     if _instantiated:
@@ -96,61 +132,76 @@ def instantiate(ckpt_dir=None):
 
     # Make sure SimObject-valued params are in the configuration
     # hierarchy so we catch them with future descendants() walks
-    for obj in root.descendants():
-        obj.adoptOrphanParams()
-
-    # Unproxy in sorted order for determinism
-    for obj in root.descendants():
-        obj.unproxyParams()
-
-    if options.dump_config:
-        ini_file = open(os.path.join(options.outdir, options.dump_config), "w")
-        # Print ini sections in sorted order for easier diffing
-        for obj in sorted(root.descendants(), key=lambda o: o.path()):
-            obj.print_ini(ini_file)
-        ini_file.close()
+    with _timed_phase("adoptOrphanParams"):
+        for obj in root.descendants():
+            obj.adoptOrphanParams()
 
-    if options.json_config:
-        try:
-            import json
+    # Unproxy in sorted order for determinism. Parent.any, Self.any and
+    # Parent.all proxies are resolved through a type index of the hierarchy
+    # rather than by scanning every ancestor for each of them.
+    with _timed_phase("unproxyParams"), SimObject.typeIndex():
+        for obj in root.descendants():
+            obj.unproxyParams()
+
+    # The hierarchy is final from here on. Walk it once, in the same
+    # sorted order, and cache every object's path.
+    with _timed_phase("freezeHierarchy"):
+        _frozen_descendants = list(root.descendants())
+        for obj in _frozen_descendants:
+            obj.freeze_path()
+
+    with _timed_phase("dumpConfig"):
+        if options.dump_config:
+            ini_file = open(
+                os.path.join(options.outdir, options.dump_config), "w"
+            )
+            # Print ini sections in sorted order for easier diffing
+            for obj in sorted(_frozen_descendants, key=lambda o: o.path()):
+                obj.print_ini(ini_file)
+            ini_file.close()
 
+        if options.json_config:
             json_file = open(
                 os.path.join(options.outdir, options.json_config), "w"
             )
             d = root.get_config_as_dict()
             json.dump(d, json_file, indent=4)
             json_file.close()
-        except ImportError:
-            pass
 
-    if options.dot_config:
-        do_dot(root, options.outdir, options.dot_config)
-        do_ruby_dot(root, options.outdir, options.dot_config)
+        if options.dot_config:
+            do_dot(root, options.outdir, options.dot_config)
+            do_ruby_dot(root, options.outdir, options.dot_config)
 
     # Initialize the global statistics
     stats.initSimStats()
 
     # Create the C++ sim objects and connect ports
-    for obj in root.descendants():
-        obj.createCCObject()
-    for obj in root.descendants():
-        obj.connectPorts()
+    with _timed_phase("createCCObject"):
+        for obj in _frozen_descendants:
+            obj.createCCObject()
+    with _timed_phase("connectPorts"):
+        for obj in _frozen_descendants:
+            obj.connectPorts()
 
     # Do a second pass to finish initializing the sim objects
-    for obj in root.descendants():
-        obj.init()
+    with _timed_phase("init"):
+        for obj in _frozen_descendants:
+            obj.init()
 
     # Do a third pass to initialize statistics
-    stats._bindStatHierarchy(root)
-    root.regStats()
+    with _timed_phase("regStats"):
+        stats._bindStatHierarchy(root)
+        root.regStats()
 
     # Do a fourth pass to initialize probe points
-    for obj in root.descendants():
-        obj.regProbePoints()
+    with _timed_phase("regProbePoints"):
+        for obj in _frozen_descendants:
+            obj.regProbePoints()
 
     # Do a fifth pass to connect probe listeners
-    for obj in root.descendants():
-        obj.regProbeListeners()
+    with _timed_phase("regProbeListeners"):
+        for obj in _frozen_descendants:
+            obj.regProbeListeners()
 
     # We want to generate the DVFS diagram for the system. This can only be
     # done once all of the CPP objects have been created and initialised so
@@ -163,13 +214,15 @@ def instantiate(ckpt_dir=None):
 
     # Restore checkpoint (if any)
     if ckpt_dir:
-        _drain_manager.preCheckpointRestore()
-        ckpt = _m5.core.getCheckpoint(ckpt_dir)
-        for obj in root.descendants():
-            obj.loadState(ckpt)
+        with _timed_phase("loadState"):
+            _drain_manager.preCheckpointRestore()
+            ckpt = _m5.core.getCheckpoint(ckpt_dir)
+            for obj in _frozen_descendants:
+                obj.loadState(ckpt)
     else:
-        for obj in root.descendants():
-            obj.initState()
+        with _timed_phase("initState"):
+            for obj in _frozen_descendants:
+                obj.initState()
 
     # Check to see if any of the stat events are in the past after resuming from
     # a checkpoint, If so, this call will shift them to be at a valid time.
@@ -178,6 +231,16 @@ def instantiate(ckpt_dir=None):
     gather_citations(root)
 
 
+def _dump_instantiate_times():
+    from m5 import options
+
+    if options.instantiate_times:
+        with open(
+            os.path.join(options.outdir, options.instantiate_times), "w"
+        ) as f:
+            json.dump(_instantiate_times, f, indent=4)
+
+
 need_startup = True
 
 
@@ -190,9 +253,11 @@ def simulate(*args, **kwargs):
 
     if need_startup:
         root = objects.Root.getInstance()
-        for obj in root.descendants():
-            obj.startup()
+        with _timed_phase("startup"):
+            for obj in _descendants(root):
+                obj.startup()
         need_startup = False
+        _dump_instantiate_times()
 
         # Python exit handlers happen in reverse order.
         # We want to dump stats last.
@@ -312,12 +377,12 @@ def drain():
 
 
 def memWriteback(root):
-    for obj in root.descendants():
+    for obj in _descendants(root):
         obj.memWriteback()
 
 
 def memInvalidate(root):
-    for obj in root.descendants():
+    for obj in _descendants(root):
         obj.memInvalidate()
 
 
@@ -430,7 +495,7 @@ def switchCpus(system, cpuList, verbose=True):
 
 
 def notifyFork(root):
-    for obj in root.descendants():
+    for obj in _descendants(root):
         obj.notifyFork()
 
 
@@ -51,7 +51,10 @@ import _m5.stats
 from _m5.stats import periodicStatDump
 from _m5.stats import schedStatEvent as schedEvent
 
-from .gem5stats import JsonOutputVistor
+from .gem5stats import (
+    JsonLinesOutputVisitor,
+    JsonOutputVistor,
+)
 
 outputList = []
 
@@ -202,6 +205,28 @@ def _jsonFactory(fn):
     return JsonOutputVistor(fn)
 
 
+@_url_factory(["jsonl"])
+def _jsonlFactory(fn, deltas=False, filter=None):
+    """Append stats to a JSON Lines file, one compact record per dump.
+
+    Every stats dump appends a single line holding the current tick and a
+    flat map from stat path to value, so periodic dumps form a time series
+    instead of overwriting each other.
+
+    Parameters:
+      * deltas (bool): Record the change since the previous dump rather
+                       than the value (default: False)
+      * filter (str): Only record stats whose path matches this regular
+                      expression (default: all stats)
+
+    Example:
+      jsonl://stats.jsonl?deltas=True&filter='numCycles|committedInsts'
+
+    """
+
+    return JsonLinesOutputVisitor(fn, deltas=deltas, filter=filter)
+
+
 def addStatVisitor(url):
     """Add a stat visitor specified using a URL string
 
@@ -418,7 +443,7 @@ def dump(roots=None):
         prepare()
 
     for output in outputList:
-        if isinstance(output, JsonOutputVistor):
+        if isinstance(output, (JsonOutputVistor, JsonLinesOutputVisitor)):
             if not all_roots:
                 output.dump(Root.getInstance())
             else:
@@ -444,6 +469,11 @@ def reset():
 
     _m5.stats.processResetQueue()
 
+    # the deltas of the JSON Lines visitors start over with the stats
+    for output in outputList:
+        if isinstance(output, JsonLinesOutputVisitor):
+            output.reset()
+
 
 flags = attrdict(
     {
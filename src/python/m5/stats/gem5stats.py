@@ -29,10 +29,17 @@ This serves as the bridge between the gem5 statistics exposed via PyBind11 and
 the Python Stats model.
 """
 
+import json
+import re
 from datetime import datetime
 from typing import (
     IO,
+    Any,
+    Dict,
+    Iterator,
     List,
+    Optional,
+    Tuple,
     Union,
 )
 
@@ -83,6 +90,132 @@ class JsonOutputVistor:
             simstat.dump(fp=fp, **self.json_args)
 
 
+class JsonLinesOutputVisitor:
+    """
+    A stats visitor which appends one compact JSON record per stats dump to a
+    JSON Lines file. Unlike ``JsonOutputVistor`` the file is never rewritten,
+    so periodic dumps build up a time series, and the stats are read straight
+    from the gem5 stat groups without building a ``SimStat`` tree.
+
+    Each line has the form
+    ``{"dump": <n>, "tick": <tick>, "stats": {"<path>": <value>, ...}}``.
+    Vector elements are named ``<path>::<subname>`` and distributions are
+    reduced to their ``::samples``, ``::sum`` and ``::squares``. Formulas are
+    not included.
+    """
+
+    file: str
+    deltas: bool
+    filter: Optional["re.Pattern"]
+
+    def __init__(
+        self, file: str, deltas: bool = False, filter: Optional[str] = None
+    ):
+        """
+        :param file: The output file location to which the records are
+                     appended. Any existing file is truncated.
+
+        :param deltas: If ``True``, each record holds the change of every stat
+                       since the previous dump, or since the last stats
+                       reset, rather than its value.
+
+        :param filter: If set, only stats whose path matches this regular
+                       expression (``re.search``) are recorded.
+        """
+
+        self.file = file
+        self.deltas = deltas
+        self.filter = re.compile(filter) if filter else None
+        self._selected = {}
+        self._previous = {}
+        self._dump_count = 0
+
+        with open(self.file, "w"):
+            pass
+
+    def reset(self) -> None:
+        """
+        Forgets the values of the previous dump. ``m5.stats.reset()`` calls
+        this so that the deltas of the next dump count from the reset rather
+        than from values that no longer exist.
+        """
+
+        self._previous.clear()
+
+    def _is_selected(self, name: str) -> bool:
+        if self.filter is None:
+            return True
+        if name not in self._selected:
+            self._selected[name] = bool(self.filter.search(name))
+        return self._selected[name]
+
+    def _flatten(
+        self, group: _m5.stats.Group, prefix: str
+    ) -> Iterator[Tuple[str, float]]:
+        for stat in group.getStats():
+            name = prefix + stat.name
+            if isinstance(stat, _m5.stats.ScalarInfo):
+                yield name, stat.value
+            elif isinstance(stat, _m5.stats.DistInfo):
+                samples = sum(stat.values) + stat.underflow + stat.overflow
+                yield f"{name}::samples", samples
+                yield f"{name}::sum", stat.sum
+                yield f"{name}::squares", stat.squares
+            elif isinstance(stat, _m5.stats.FormulaInfo):
+                pass
+            elif isinstance(stat, _m5.stats.VectorInfo):
+                values = stat.value
+                for index in range(stat.size):
+                    subname = str(stat.subnames[index]) or str(index)
+                    yield f"{name}::{subname}", values[index]
+
+        for key, child in group.getStatGroups().items():
+            yield from self._flatten(child, f"{prefix}{key}.")
+
+    def dump(self, roots: Union[List[SimObject], Root]) -> None:
+        """
+        Appends the stats of a simulation root (or list of roots) to the
+        output file as a single JSON line.
+
+        .. warning::
+
+            This dump assumes the statistics have already been prepared
+            for the target root.
+
+        :param roots: The Root, or List of roots, whose stats are to be
+                      dumped.
+        """
+
+        if isinstance(roots, SimObject):
+            roots = [roots]
+
+        stats = {}
+        for r in roots:
+            if isinstance(r, Root):
+                items = self._flatten(r, "")
+            else:
+                items = self._flatten(r, f"{r.get_name()}.")
+            for name, value in items:
+                if not self._is_selected(name):
+                    continue
+                if self.deltas:
+                    stats[name] = value - self._previous.get(name, 0)
+                    self._previous[name] = value
+                else:
+                    stats[name] = value
+
+        record = {
+            "dump": self._dump_count,
+            "tick": Root.getInstance().resolveStat("finalTick").value,
+            "stats": stats,
+        }
+        self._dump_count += 1
+
+        with open(self.file, "a") as fp:
+            fp.write(json.dumps(record, separators=(",", ":")))
+            fp.write("\n")
+
+
 def get_stats_group(group: _m5.stats.Group) -> Group:
     """
     Translates a gem5 Group object into a Python stats Group object. A Python
@@ -281,3 +414,99 @@ def get_simstat(
         simulated_end_time=simulated_end_time,
         **stats_map,
     )
+
+
+class StatHandles:
+    """
+    A set of stats resolved once from their paths, so that their current
+    values can be read repeatedly without translating the whole stats
+    hierarchy into a ``SimStat``. Only the stats of the handles are
+    prepared before each read.
+
+    A path is the name of a stat as in ``stats.txt``, e.g.,
+    ``board.processor.cores.core.numCycles``. An element of a vector can
+    be selected with ``::<subname>``, ``::<index>`` or ``::total``.
+
+    The value of a scalar or of a vector element is a float, that of a
+    vector a list of floats and that of a distribution a ``Distribution``.
+    Formulas with a single value, such as IPC, are read as floats.
+    """
+
+    def __init__(self, root: _m5.stats.Group, paths: List[str]):
+        """
+        :param root: The group the paths are relative to, typically the
+                     simulation's Root.
+        :param paths: The paths of the stats.
+
+        :raises KeyError: If a path does not name a stat.
+        """
+        self._paths = list(paths)
+        self._stats = []
+        groups = {}
+        for path in self._paths:
+            name, _, element = path.partition("::")
+            try:
+                info = root.resolveStat(name)
+            except KeyError:
+                raise KeyError(f"Unknown stat '{path}'") from None
+            if element and not isinstance(info, _m5.stats.VectorInfo):
+                raise KeyError(f"'{name}' is not a vector in '{path}'")
+            if element and element != "total":
+                subnames = [str(subname) for subname in info.subnames]
+                if element in subnames:
+                    element = subnames.index(element)
+                elif element.isdigit() and int(element) < info.size:
+                    element = int(element)
+                else:
+                    raise KeyError(f"Unknown element in '{path}'")
+            self._stats.append((info, element))
+
+            # The group owning the stat may update it before it is dumped.
+            group = root
+            for group_name in name.split(".")[:-1]:
+                group = group.getStatGroups()[group_name]
+            groups[id(group)] = group
+        self._groups = list(groups.values())
+
+    def get_paths(self) -> List[str]:
+        return list(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def _prepare(self) -> None:
+        _m5.stats.processDumpQueue()
+        for group in self._groups:
+            group.preDumpStats()
+        for info, _ in self._stats:
+            info.prepare()
+
+    def values(self) -> List:
+        """Returns the current values of the stats, in the order of their
+        paths."""
+        self._prepare()
+        return [
+            _get_handle_value(info, element) for info, element in self._stats
+        ]
+
+    def get(self) -> Dict[str, Any]:
+        """Returns the current values of the stats keyed by their paths."""
+        return dict(zip(self._paths, self.values()))
+
+
+def _get_handle_value(info: _m5.stats.Info, element: Union[int, str]) -> Any:
+    """
+    Returns the value of a stat of a ``StatHandles``. ``element`` is the
+    index of the selected vector element, "total", or "" for the whole stat.
+    """
+    if isinstance(info, _m5.stats.ScalarInfo):
+        return info.value
+    elif isinstance(info, _m5.stats.DistInfo):
+        return __get_distribution(info)
+    elif element == "total":
+        return info.total
+    elif element != "":
+        return info.value[element]
+    elif isinstance(info, _m5.stats.FormulaInfo) and info.size == 1:
+        return info.value[0]
+    return list(info.value)
@@ -0,0 +1,150 @@
+"""Correlation of every stat of a set of runs against one target metric.
+
+`DataFrame.corr()` computes the full stat x stat correlation matrix, which is
+quadratic in the number of stats, to then read a single column of it. This
+module only computes the one column that is needed: the Pearson correlation
+of each stat with the target, in one vectorized pass over the stats.
+
+Stats are read from a `StatsStore` a chunk of columns at a time and converted
+to float32, so the whole runs x stats matrix never has to be in memory. The
+same pass can compute the correlations within groups of runs, e.g. per
+benchmark or per partition, and `rank_stability()` then tells whether the
+strongest correlations hold across those groups.
+
+Example:
+
+    store = StatsStore()
+    runs = store.runs(under="runs/chipletization/decode_to_rename_v3/stats")
+    r = correlate(store, target, runs)
+    r[r.abs() > 0.7]
+"""
+
+import numpy as np
+
+DEFAULT_CHUNK = 256
+
+
+def pearson(target, columns):
+    """Returns the Pearson correlation of each column with the target.
+
+    :param target: float64 array of n values.
+    :param columns: n x k float32 array, one stat per column.
+    :returns: float64 array of k correlations. Columns that are constant
+        or contain NaN get NaN, like in `DataFrame.corr()`.
+    """
+    yc = target - target.mean()
+    ynorm = np.sqrt(yc @ yc)
+    if ynorm == 0:
+        return np.full(columns.shape[1], np.nan)
+    yc = (yc / ynorm).astype(np.float32)
+
+    xc = columns - columns.mean(axis=0, dtype=np.float64).astype(np.float32)
+    xnorm = np.sqrt(np.einsum("ij,ij->j", xc, xc, dtype=np.float64))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = (yc @ xc).astype(np.float64) / xnorm
+    r[xnorm == 0] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def iter_columns(store, names, runs, chunk=DEFAULT_CHUNK):
+    """Yields (names, n x k float32 array) chunks of the stats of `runs`."""
+    for start in range(0, len(names), chunk):
+        chunk_names = names[start : start + chunk]
+        selected = store.select(chunk_names, runs=runs)
+        columns = np.empty((len(runs), len(chunk_names)), dtype=np.float32)
+        for i, name in enumerate(chunk_names):
+            columns[:, i] = selected[name]
+        yield chunk_names, columns
+
+
+def correlate(
+    store,
+    target,
+    runs,
+    names=None,
+    regex="",
+    groups=None,
+    chunk=DEFAULT_CHUNK,
+):
+    """Correlates the stats of some runs with a target metric.
+
+    Runs whose target is NaN are ignored. Stats missing from any of the
+    remaining runs (of a group) get no correlation, as the old script
+    dropped every column with missing values.
+
+    :param store: The `StatsStore` holding the runs.
+    :param target: One value of the target metric per run.
+    :param runs: stats.txt paths of the runs, as returned by `store.runs()`.
+    :param names: Stat names to correlate. Defaults to those matching
+        `regex`, i.e. every stat.
+    :param regex: Regex of the stat names to correlate if `names` is None.
+    :param groups: Optional group label of each run. The correlations are
+        then computed within each group instead of across all runs.
+    :param chunk: Number of stats read and correlated at once.
+    :returns: A pandas Series of correlations indexed by stat name, or with
+        `groups` a DataFrame with one column per group. Sorted by name.
+    """
+    import pandas as pd
+
+    target = np.asarray(target, dtype=np.float64)
+    keep = ~np.isnan(target)
+    runs = [run for run, k in zip(runs, keep) if k]
+    target = target[keep]
+    if names is None:
+        names = store.names(regex)
+
+    if groups is None:
+        masks = {None: slice(None)}
+    else:
+        groups = np.asarray(groups)[keep]
+        masks = {g: groups == g for g in sorted(set(groups.tolist()))}
+
+    result = {g: np.full(len(names), np.nan) for g in masks}
+    offset = 0
+    for chunk_names, columns in iter_columns(store, names, runs, chunk):
+        for g, mask in masks.items():
+            group_columns = columns[mask]
+            r = pearson(target[mask], group_columns)
+            r[np.isnan(group_columns).any(axis=0)] = np.nan
+            result[g][offset : offset + len(chunk_names)] = r
+        offset += len(chunk_names)
+
+    if groups is None:
+        return pd.Series(result[None], index=names).dropna()
+    return pd.DataFrame(result, index=names).dropna(how="all")
+
+
+def rank_stability(correlations, top=None):
+    """Checks whether the stats correlate the same way in each group.
+
+    :param correlations: DataFrame of correlations, one column per group
+        (e.g. per partition), as returned by `correlate(..., groups=...)`.
+    :param top: Only rank the `top` stats with the strongest mean absolute
+        correlation.
+    :returns: (per stat DataFrame, agreement). The DataFrame holds the mean
+        and standard deviation of the correlation and of the rank (1 is the
+        strongest absolute correlation) of each stat across groups, sorted
+        by mean rank. `agreement` is the mean Spearman correlation between
+        the rankings of every pair of groups, 1 meaning identical rankings.
+    """
+    import pandas as pd
+
+    correlations = correlations.dropna()
+    if top is not None:
+        strongest = correlations.abs().mean(axis=1).nlargest(top).index
+        correlations = correlations.loc[strongest]
+    ranks = correlations.abs().rank(ascending=False)
+
+    spearman = ranks.corr().to_numpy()
+    pairs = spearman[np.triu_indices_from(spearman, k=1)]
+    agreement = float(np.nanmean(pairs)) if len(pairs) else float("nan")
+
+    summary = pd.DataFrame(
+        {
+            "mean_corr": correlations.mean(axis=1),
+            "std_corr": correlations.std(axis=1),
+            "mean_rank": ranks.mean(axis=1),
+            "std_rank": ranks.std(axis=1),
+        }
+    ).sort_values("mean_rank")
+    return summary, agreement
@@ -0,0 +1,442 @@
+"""Incremental columnar store for the stats.txt files of gem5 runs.
+
+The extract scripts used to walk `runs/*/stats/*/stats.txt` and re-parse every
+line of every file on each invocation. This module parses each stats.txt once
+and keeps the values in a directory of NumPy arrays, so later queries only
+read the columns they ask for and later ingests only parse new or modified
+runs.
+
+Layout of the store directory:
+
+    <store>/index.json       every ingested stats.txt with its (size, mtime)
+                             and the segment/row holding its values
+    <store>/seg_NNNNN.npy    float64 matrix of one ingest, runs x stats, in
+                             column-major order so a stat is contiguous
+    <store>/seg_NNNNN.json   the stat names (columns) and runs (rows) of it,
+                             the values that are not numbers, and the first
+                             values of the runs that dumped their stats more
+                             than once
+    <store>/lock             locked while a process writes to the store
+
+Missing stats are stored as NaN. Values that are not numbers are NaN in the
+matrix and kept as strings on the side, `select(strings=True)` returns them
+like the old scrapers did. When a stats.txt holds several dumps, `select()`
+returns the last value of each stat, like most of the old scrapers, or the
+first one with `dump="first"`, like the old `extract_cycle_count()`.
+
+Runs whose stats.txt was deleted are dropped from the store by the next
+ingest of their directory, or by `prune()`.
+
+Example:
+
+    python stats_store.py ingest runs/chipletization/decode_to_rename_v3/stats
+    python stats_store.py query --regex "switch_cpus\\.numCycles$" -o out.csv
+"""
+
+import argparse
+import contextlib
+import csv
+import fcntl
+import glob
+import json
+import math
+import os
+import re
+
+import numpy as np
+
+DEFAULT_STORE = "runs/stats_store"
+
+
+def _same(a, b):
+    """Returns whether two stat values are equal, NaN being equal to NaN."""
+    if isinstance(a, float) and isinstance(b, float):
+        return a == b or (math.isnan(a) and math.isnan(b))
+    return a == b
+
+
+def parse_stats_txt(path):
+    """Returns ({stat name: last value}, {stat name: first value}) for the
+    stats of a stats.txt.
+
+    Values are floats, or strings if they are not numbers. The first values
+    only hold the stats whose first value differs from the last one, which
+    only happens when the stats were dumped more than once.
+    """
+    last = {}
+    first = {}
+    with open(path, "rb") as f:
+        for line in f:
+            if line[:1] in (b"#", b"-", b"\n", b""):
+                continue
+            parts = line.split(None, 2)
+            if len(parts) < 2:
+                continue
+            name = parts[0].decode()
+            try:
+                value = float(parts[1])
+            except ValueError:
+                value = parts[1].decode()
+            if name in last and name not in first:
+                first[name] = last[name]
+            last[name] = value
+    first = {
+        name: value
+        for name, value in first.items()
+        if not _same(value, last[name])
+    }
+    return last, first
+
+
+class StatsStore:
+    """A columnar store of the stats of many gem5 runs.
+
+    :param root: Directory of the store. It is created on first ingest.
+    """
+
+    def __init__(self, root=DEFAULT_STORE):
+        self.root = os.path.abspath(root)
+        self._segments = {}
+        self._load_index()
+
+    def _load_index(self):
+        index_path = os.path.join(self.root, "index.json")
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self._index = json.load(f)
+        else:
+            self._index = {"next_segment": 0, "runs": {}}
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Locks the store against the other processes writing to it, and
+        reloads the index they may have changed. Segments are never
+        rewritten, so the cached ones stay valid."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._load_index()
+            yield
+
+    def _write_json(self, name, obj):
+        path = os.path.join(self.root, name)
+        with open(path + ".tmp", "w") as f:
+            json.dump(obj, f)
+        os.replace(path + ".tmp", path)
+
+    def _segment(self, seg):
+        """Returns (names, name -> column, memmapped values, strings, first)
+        of a segment. strings maps a name to {row: non-numeric value}, and
+        first to {row: first value} where it differs from the last one."""
+        if seg not in self._segments:
+            with open(os.path.join(self.root, f"seg_{seg:05d}.json")) as f:
+                meta = json.load(f)
+            names = meta["names"]
+            strings, first = (
+                {
+                    name: {int(row): value for row, value in rows.items()}
+                    for name, rows in meta.get(key, {}).items()
+                }
+                for key in ("strings", "first")
+            )
+            values = np.load(
+                os.path.join(self.root, f"seg_{seg:05d}.npy"), mmap_mode="r"
+            )
+            columns = {name: i for i, name in enumerate(names)}
+            self._segments[seg] = (names, columns, values, strings, first)
+        return self._segments[seg]
+
+    def _write_segment(self, runs):
+        """Writes a new segment holding `runs`, a list of (path, last
+        values, first values) as returned by `parse_stats_txt()`."""
+        seg = self._index["next_segment"]
+        names = sorted(set().union(*(stats.keys() for _, stats, _ in runs)))
+        columns = {name: i for i, name in enumerate(names)}
+        values = np.full((len(runs), len(names)), np.nan, order="F")
+        strings = {}
+        first = {}
+        for row, (_, stats, first_stats) in enumerate(runs):
+            for name, value in stats.items():
+                if isinstance(value, str):
+                    strings.setdefault(name, {})[row] = value
+                else:
+                    values[row, columns[name]] = value
+            for name, value in first_stats.items():
+                first.setdefault(name, {})[row] = value
+
+        os.makedirs(self.root, exist_ok=True)
+        np.save(os.path.join(self.root, f"seg_{seg:05d}.npy"), values)
+        self._write_json(
+            f"seg_{seg:05d}.json",
+            {
+                "names": names,
+                "runs": [path for path, _, _ in runs],
+                "strings": strings,
+                "first": first,
+            },
+        )
+        self._index["next_segment"] = seg + 1
+        return seg
+
+    def _live_segments(self):
+        return {run["segment"] for run in self._index["runs"].values()}
+
+    def _drop_dead_segments(self, before):
+        live = self._live_segments()
+        for seg in set(before) - live:
+            self._segments.pop(seg, None)
+            for ext in ("npy", "json"):
+                path = os.path.join(self.root, f"seg_{seg:05d}.{ext}")
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def prune(self, under=None):
+        """Drops the runs whose stats.txt no longer exists, optionally only
+        those below the directory `under`.
+
+        :returns: The number of runs dropped.
+        """
+        with self._locked():
+            return self._prune(under)
+
+    def _prune(self, under):
+        before = self._live_segments()
+        missing = [p for p in self.runs(under) if not os.path.exists(p)]
+        for path in missing:
+            del self._index["runs"][path]
+        if missing:
+            self._write_json("index.json", self._index)
+            self._drop_dead_segments(before)
+        return len(missing)
+
+    def ingest(self, stats_dir, pattern="*/stats.txt"):
+        """Parses the stats.txt files under `stats_dir` not yet in the store.
+
+        Files are matched by their path and re-parsed only when their size or
+        modification time changed since the last ingest. Runs below
+        `stats_dir` whose stats.txt was deleted are dropped. The store is
+        locked for the whole ingest, so concurrent ingests are serialized.
+
+        :returns: The number of stats.txt files parsed.
+        """
+        with self._locked():
+            return self._ingest(stats_dir, pattern)
+
+    def _ingest(self, stats_dir, pattern):
+        self._prune(stats_dir)
+        before = self._live_segments()
+        runs = []
+        for path in sorted(glob.glob(os.path.join(stats_dir, pattern))):
+            path = os.path.abspath(path)
+            st = os.stat(path)
+            known = self._index["runs"].get(path)
+            if (
+                known
+                and known["mtime_ns"] == st.st_mtime_ns
+                and known["size"] == st.st_size
+            ):
+                continue
+            runs.append((path, st, *parse_stats_txt(path)))
+
+        if not runs:
+            return 0
+
+        seg = self._write_segment(
+            [(path, stats, first) for path, _, stats, first in runs]
+        )
+        for row, (path, st, _, _) in enumerate(runs):
+            self._index["runs"][path] = {
+                "mtime_ns": st.st_mtime_ns,
+                "size": st.st_size,
+                "segment": seg,
+                "row": row,
+            }
+        self._write_json("index.json", self._index)
+        self._drop_dead_segments(before)
+        return len(runs)
+
+    def compact(self):
+        """Rewrites all the live rows into a single segment."""
+        with self._locked():
+            self._compact()
+
+    def _compact(self):
+        before = self._live_segments()
+        if len(before) <= 1:
+            return
+        paths = self.runs()
+        names = self.names()
+        last = self.select(names, runs=paths, strings=True)
+        first = self.select(names, runs=paths, strings=True, dump="first")
+        runs = []
+        for i, path in enumerate(paths):
+            stats = {
+                name: last[name][i]
+                for name in names
+                if isinstance(last[name][i], str)
+                or not np.isnan(last[name][i])
+            }
+            first_stats = {
+                name: first[name][i]
+                for name in stats
+                if not _same(first[name][i], stats[name])
+            }
+            runs.append((path, stats, first_stats))
+        seg = self._write_segment(runs)
+        for row, path in enumerate(paths):
+            self._index["runs"][path].update({"segment": seg, "row": row})
+        self._write_json("index.json", self._index)
+        self._drop_dead_segments(before)
+
+    def runs(self, under=None):
+        """Returns the stats.txt paths in the store, optionally only those
+        below the directory `under`."""
+        paths = sorted(self._index["runs"])
+        if under is not None:
+            prefix = os.path.join(os.path.abspath(under), "")
+            paths = [p for p in paths if p.startswith(prefix)]
+        return paths
+
+    def names(self, regex=None):
+        """Returns the stat names in the store matching `regex`, if given."""
+        names = set()
+        for seg in self._live_segments():
+            names.update(self._segment(seg)[0])
+        if regex is not None:
+            expr = re.compile(regex)
+            names = {name for name in names if expr.search(name)}
+        return sorted(names)
+
+    def select(
+        self, names=None, regex=None, runs=None, strings=False, dump="last"
+    ):
+        """Reads some stats of some runs.
+
+        :param names: Stat names to read.
+        :param regex: Also read every stat whose name matches this regex.
+        :param runs: stats.txt paths to read, as returned by `runs()`.
+            Defaults to every run in the store.
+        :param strings: Return the values that are not numbers as strings
+            rather than NaN. The arrays of the stats that have some are then
+            object arrays.
+        :param dump: "last" or "first", which value of a stat to return
+            when the stats were dumped more than once.
+        :returns: {stat name: float64 array with one value per run, in the
+            order of `runs`}. Missing values are NaN.
+        """
+        if dump not in ("first", "last"):
+            raise ValueError(f"dump must be 'first' or 'last', not {dump!r}")
+        names = list(names or [])
+        if regex is not None:
+            names += [n for n in self.names(regex) if n not in names]
+        if runs is None:
+            runs = self.runs()
+
+        result = {name: np.full(len(runs), np.nan) for name in names}
+        by_segment = {}
+        for i, path in enumerate(runs):
+            run = self._index["runs"][os.path.abspath(path)]
+            by_segment.setdefault(run["segment"], ([], []))
+            by_segment[run["segment"]][0].append(i)
+            by_segment[run["segment"]][1].append(run["row"])
+
+        def put(name, pos, value):
+            if isinstance(value, str):
+                if not strings:
+                    value = np.nan
+                elif result[name].dtype != object:
+                    result[name] = result[name].astype(object)
+            result[name][pos] = value
+
+        for seg, (positions, rows) in by_segment.items():
+            _, columns, values, seg_strings, seg_first = self._segment(seg)
+            for name in names:
+                col = columns.get(name)
+                if col is not None:
+                    result[name][positions] = values[:, col][rows]
+                texts = seg_strings.get(name) if strings else None
+                firsts = seg_first.get(name) if dump == "first" else None
+                if not texts and not firsts:
+                    continue
+                for pos, row in zip(positions, rows):
+                    if texts and row in texts:
+                        put(name, pos, texts[row])
+                    if firsts and row in firsts:
+                        put(name, pos, firsts[row])
+        return result
+
+    def to_frame(
+        self, names=None, regex=None, runs=None, strings=False, dump="last"
+    ):
+        """Like `select()`, as a pandas DataFrame indexed by run directory."""
+        import pandas as pd
+
+        if runs is None:
+            runs = self.runs()
+        return pd.DataFrame(
+            self.select(names, regex, runs, strings, dump),
+            index=[os.path.basename(os.path.dirname(p)) for p in runs],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--store", default=DEFAULT_STORE, help="Directory of the stats store"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser("ingest", help="Ingest new stats.txt")
+    ingest.add_argument("stats_dirs", nargs="+", help="runs/<...>/stats")
+    ingest.add_argument(
+        "--compact",
+        action="store_true",
+        help="Merge all segments into one after ingesting",
+    )
+
+    query = subparsers.add_parser("query", help="Export stats to CSV")
+    query.add_argument("--stat", nargs="*", default=[], help="Stat names")
+    query.add_argument("--regex", help="Regex of stat names")
+    query.add_argument("--under", help="Only runs below this directory")
+    query.add_argument("-o", "--output", required=True, help="CSV file")
+    query.add_argument(
+        "--strings",
+        action="store_true",
+        help="Export the values that are not numbers instead of nan",
+    )
+    query.add_argument(
+        "--dump",
+        choices=["last", "first"],
+        default="last",
+        help="Value to export for stats dumped more than once",
+    )
+
+    args = parser.parse_args()
+    store = StatsStore(args.store)
+
+    if args.command == "ingest":
+        for stats_dir in args.stats_dirs:
+            count = store.ingest(stats_dir)
+            print(f"Ingested {count} new stats files from {stats_dir}")
+        if args.compact:
+            store.compact()
+    else:
+        runs = store.runs(args.under)
+        selected = store.select(
+            args.stat, args.regex, runs, args.strings, args.dump
+        )
+        with open(args.output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["simulation_id"] + list(selected))
+            for i, path in enumerate(runs):
+                writer.writerow(
+                    [os.path.basename(os.path.dirname(path))]
+                    + [values[i] for values in selected.values()]
+                )
+        print(
+            f"Wrote {len(runs)} runs x {len(selected)} stats to {args.output}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,606 @@
+"""Memory-aware, resumable scheduler for the gem5 sweeps of the SPEC launchers.
+
+The launchers used to hand every permutation to a thread pool of
+`os.cpu_count()` workers. That ignored memory, forgot everything on Ctrl-C and
+re-ran finished permutations on every invocation. This module runs the same
+shell commands with:
+
+* a job database (SQLite) that records the state of every
+  (benchmark, params) job, so a rerun skips the jobs that already completed
+  and resumes the ones that were interrupted,
+* admission control that only starts a job when the expected peak RSS of the
+  benchmark fits in the free RAM of the host, after accounting for what the
+  running jobs are still expected to grow by,
+* longest-expected-first ordering, so the long benchmarks do not end up
+  running alone at the end of a sweep,
+* retries of failed jobs,
+* prerequisites shared by several jobs, e.g. the fast-forward checkpoint
+  they restore, made when the first of those jobs is about to be admitted
+  and released once the last one has finished.
+
+The expected peak RSS and run time of a benchmark come from the `hostMemory`
+and `hostSeconds` stats of its earlier runs, recorded in the database as jobs
+finish. `JobDB.seed()` imports them from the stats directories of older
+sessions.
+
+Layout of the job database:
+
+    jobs      one row per (benchmark, params) with its state, command,
+              output directory, attempts and measurements
+    history   (benchmark, hostSeconds, hostMemory) of every finished run,
+              keyed by the stats.txt it came from
+"""
+
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import signal
+import sqlite3
+import subprocess
+import threading
+import time
+
+from stats_store import parse_stats_txt
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    benchmark TEXT NOT NULL,
+    params TEXT NOT NULL,
+    cmd TEXT NOT NULL,
+    outdir TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    returncode INTEGER,
+    started REAL,
+    finished REAL,
+    seconds REAL,
+    peak_rss INTEGER
+);
+CREATE TABLE IF NOT EXISTS history (
+    source TEXT PRIMARY KEY,
+    benchmark TEXT NOT NULL,
+    seconds REAL,
+    peak_rss INTEGER
+);
+"""
+
+
+def job_id(benchmark, params):
+    """Returns the database key of a (benchmark, params) job."""
+    blob = json.dumps([benchmark, params], sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()[:32]
+
+
+def mem_available():
+    """Returns the MemAvailable of the host in bytes."""
+    with open("/proc/meminfo") as f:
+        for line in f:
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("MemAvailable missing from /proc/meminfo")
+
+
+def session_rss():
+    """Returns {session id: total RSS in bytes} of every process."""
+    rss = {}
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, the fields after it don't
+        fields = stat[stat.rfind(")") + 2 :].split()
+        sid = int(fields[3])
+        rss[sid] = rss.get(sid, 0) + int(fields[21]) * _PAGE_SIZE
+    return rss
+
+
+def run_measurements(stats_txt):
+    """Returns (hostSeconds, hostMemory) of a stats.txt, None if missing."""
+    if not os.path.isfile(stats_txt):
+        return None, None
+    stats, _ = parse_stats_txt(stats_txt)
+    seconds = stats.get("hostSeconds")
+    rss = stats.get("hostMemory")
+    return seconds, int(rss) if rss is not None else None
+
+
+class Prerequisite:
+    """Something a group of jobs needs before any of them can run.
+
+    It is made in a worker slot of its own when the scheduler is about to
+    admit the first job needing it. Jobs needing a prerequisite that is
+    being made wait for it, while the jobs behind them in the queue go
+    ahead.
+
+    :param make: Callable making the prerequisite, run in a thread. It is
+        passed a callable that it calls with the pid of the session leader
+        of any process it starts, so the memory of that process counts
+        against the headroom. It returns True on success.
+    :param release: Optional callable called once every job needing the
+        prerequisite has finished.
+    """
+
+    def __init__(self, make, release=None):
+        self.make = make
+        self.release = release
+        self.state = None
+        self.users = 0
+        self.attempts = 0
+        self.pid = None
+
+
+class Job:
+    """A gem5 run of a sweep.
+
+    :param cmd: Shell command of the run.
+    :param benchmark: Benchmark name. Jobs of the same benchmark are
+        expected to use as much memory and time as each other.
+    :param params: JSON-serializable dict of everything that makes this run
+        different from the other runs of the benchmark.
+    :param outdir: gem5 output directory, where stats.txt is read from.
+    :param hold: Optional callable returning a context manager that is held
+        for as long as the job runs. If it yields None, e.g. when a cached
+        checkpoint the job restores is missing, the job fails without
+        running, or its prerequisite is made again if it has one.
+    :param prerequisite: Optional `Prerequisite` made before the job runs.
+    """
+
+    def __init__(
+        self,
+        cmd,
+        benchmark,
+        params,
+        outdir=None,
+        hold=None,
+        prerequisite=None,
+    ):
+        self.cmd = cmd
+        self.benchmark = benchmark
+        self.params = params
+        self.outdir = outdir
+        self.hold = hold
+        self.prerequisite = prerequisite
+        self.id = job_id(benchmark, params)
+
+
+class JobDB:
+    """The SQLite database of the jobs of a sweep and of past measurements.
+
+    :param path: Path to the database file. It is created if needed.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        # Jobs that were running when the last scheduler died are resumed
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ? WHERE state = ?", (PENDING, RUNNING)
+            )
+
+    def add(self, job, rerun=False):
+        """Registers a job. Returns False if the job is already done and
+        `rerun` is not set, True if it has to run."""
+        row = self.conn.execute(
+            "SELECT state FROM jobs WHERE id = ?", (job.id,)
+        ).fetchone()
+        if row is not None and row[0] == DONE and not rerun:
+            return False
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs (id, benchmark, params, cmd, outdir, state)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET cmd = excluded.cmd,"
+                " outdir = excluded.outdir, state = excluded.state,"
+                " attempts = 0, returncode = NULL",
+                (
+                    job.id,
+                    job.benchmark,
+                    json.dumps(job.params, sort_keys=True),
+                    job.cmd,
+                    job.outdir,
+                    PENDING,
+                ),
+            )
+        return True
+
+    def started(self, job):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1,"
+                " started = ? WHERE id = ?",
+                (RUNNING, time.time(), job.id),
+            )
+
+    def finished(self, job, state, returncode, seconds, peak_rss):
+        """Records the end of a job and, if it completed, its measurements.
+
+        The hostSeconds and hostMemory stats of the run are preferred over
+        the wall-clock time and the sampled RSS of the process.
+        """
+        if state == DONE and job.outdir:
+            stats_txt = os.path.join(job.outdir, "stats.txt")
+            host_seconds, host_rss = run_measurements(stats_txt)
+            seconds = host_seconds or seconds
+            peak_rss = host_rss or peak_rss
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, returncode = ?, finished = ?,"
+                " seconds = ?, peak_rss = ? WHERE id = ?",
+                (state, returncode, time.time(), seconds, peak_rss, job.id),
+            )
+            if state == DONE:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?)",
+                    (f"job:{job.id}", job.benchmark, seconds, peak_rss),
+                )
+
+    def requeue(self, job):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ? WHERE id = ?", (PENDING, job.id)
+            )
+
+    def seed(self, stats_dirs, benchmarks):
+        """Imports the measurements of older runs into the history.
+
+        :param stats_dirs: Directories holding `<run>/stats.txt`.
+        :param benchmarks: Known benchmark names. A run belongs to the
+            longest name its directory starts with, followed by `_`.
+        :returns: The number of runs imported.
+        """
+        by_length = sorted(benchmarks, key=len, reverse=True)
+        known = {
+            source
+            for (source,) in self.conn.execute("SELECT source FROM history")
+        }
+        rows = []
+        for stats_dir in stats_dirs:
+            for stats_txt in glob.glob(os.path.join(stats_dir, "*/stats.txt")):
+                stats_txt = os.path.abspath(stats_txt)
+                if stats_txt in known:
+                    continue
+                run = os.path.basename(os.path.dirname(stats_txt))
+                benchmark = next(
+                    (b for b in by_length if run.startswith(b + "_")), None
+                )
+                if benchmark is None:
+                    continue
+                seconds, peak_rss = run_measurements(stats_txt)
+                if seconds is None and peak_rss is None:
+                    continue
+                rows.append((stats_txt, benchmark, seconds, peak_rss))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def estimates(self):
+        """Returns {benchmark: (mean seconds, max peak RSS)} from the
+        history. Either value is None when it was never measured."""
+        return {
+            benchmark: (seconds, peak_rss)
+            for benchmark, seconds, peak_rss in self.conn.execute(
+                "SELECT benchmark, AVG(seconds), MAX(peak_rss)"
+                " FROM history GROUP BY benchmark"
+            )
+        }
+
+    def counts(self):
+        """Returns {state: number of jobs}."""
+        return dict(
+            self.conn.execute(
+                "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+            )
+        )
+
+
+class _Running:
+    def __init__(self, job, proc, stack, rss_estimate):
+        self.job = job
+        self.proc = proc
+        self.pid = proc.pid
+        self.stack = stack
+        self.rss_estimate = rss_estimate
+        self.start = time.time()
+        self.peak_rss = 0
+
+
+class _Making:
+    def __init__(self, prerequisite, rss_estimate):
+        self.prerequisite = prerequisite
+        self.rss_estimate = rss_estimate
+        self.peak_rss = 0
+        self.ok = False
+        self.thread = threading.Thread(target=self._make, daemon=True)
+
+    @property
+    def pid(self):
+        return self.prerequisite.pid
+
+    def _make(self):
+        self.ok = self.prerequisite.make(self._started)
+
+    def _started(self, pid):
+        self.prerequisite.pid = pid
+
+
+class SweepScheduler:
+    """Runs jobs in parallel within the CPU and memory limits of the host.
+
+    :param db: The `JobDB` recording the jobs.
+    :param max_workers: Maximum number of jobs running at once.
+    :param mem_reserve: Bytes of RAM to always leave free.
+    :param default_rss: Expected peak RSS of a benchmark never measured.
+    :param max_attempts: Number of times a failing job is run before it is
+        marked as failed.
+    :param poll: Seconds between two scheduling rounds.
+    """
+
+    def __init__(
+        self,
+        db,
+        max_workers=None,
+        mem_reserve=2 << 30,
+        default_rss=4 << 30,
+        max_attempts=2,
+        poll=1.0,
+    ):
+        self.db = db
+        self.max_workers = max_workers or os.cpu_count()
+        self.mem_reserve = mem_reserve
+        self.default_rss = default_rss
+        self.max_attempts = max_attempts
+        self.poll = poll
+        self._jobs = []
+        self._status = {}
+
+    def add(self, job, rerun=False):
+        """Queues a job. Returns False if it already completed earlier."""
+        if not self.db.add(job, rerun):
+            self._status[job.id] = ("Skipped ⏭", 0)
+            self._jobs.append(job)
+            return False
+        self._status[job.id] = ("Waiting 🕑", 0)
+        self._jobs.append(job)
+        if job.prerequisite is not None:
+            job.prerequisite.users += 1
+        return True
+
+    def _order(self, jobs, estimates):
+        """Sorts jobs longest expected first. Benchmarks that were never
+        measured go first, as nothing says they are short."""
+
+        def expected(job):
+            seconds = estimates.get(job.benchmark, (None, None))[0]
+            return float("inf") if seconds is None else seconds
+
+        return sorted(jobs, key=expected, reverse=True)
+
+    def _rss_estimate(self, job, estimates):
+        rss = estimates.get(job.benchmark, (None, None))[1]
+        return rss if rss is not None else self.default_rss
+
+    def _headroom(self, running):
+        """Free RAM minus what the running jobs and the prerequisites being
+        made are still expected to use."""
+        rss = session_rss()
+        outstanding = 0
+        for r in running:
+            current = rss.get(r.pid, 0)
+            r.peak_rss = max(r.peak_rss, current)
+            outstanding += max(0, r.rss_estimate - current)
+        return mem_available() - self.mem_reserve - outstanding
+
+    def _launch(self, job, rss_estimate):
+        stack = contextlib.ExitStack()
+        if job.hold is not None and stack.enter_context(job.hold()) is None:
+            stack.close()
+            return None
+        self.db.started(job)
+        # A session per job so its whole process tree can be measured and
+        # killed
+        proc = subprocess.Popen(job.cmd, shell=True, start_new_session=True)
+        return _Running(job, proc, stack, rss_estimate)
+
+    def _make(self, prerequisite, rss_estimate):
+        prerequisite.state = RUNNING
+        prerequisite.attempts += 1
+        prerequisite.pid = None
+        m = _Making(prerequisite, rss_estimate)
+        m.thread.start()
+        return m
+
+    def _made(self, m):
+        prerequisite = m.prerequisite
+        if m.ok:
+            prerequisite.state = DONE
+        elif prerequisite.attempts < self.max_attempts:
+            prerequisite.state = None
+        else:
+            prerequisite.state = FAILED
+
+    def _release(self, job):
+        """Releases the prerequisite of a job that will not run again."""
+        prerequisite = job.prerequisite
+        if prerequisite is None:
+            return
+        prerequisite.users -= 1
+        if prerequisite.users == 0 and prerequisite.release is not None:
+            prerequisite.release()
+
+    def _fail(self, job):
+        """Fails a job that could not be launched."""
+        self.db.finished(job, FAILED, None, None, None)
+        self._status[job.id] = ("Failed ❌", 0)
+        self._release(job)
+
+    def _finish(self, r, returncode, queue):
+        r.stack.close()
+        elapsed = time.time() - r.start
+        job = r.job
+        if returncode == 0:
+            self.db.finished(job, DONE, returncode, elapsed, r.peak_rss)
+            self._status[job.id] = ("Done ✅", elapsed)
+            self._release(job)
+            return
+        attempts = self.db.conn.execute(
+            "SELECT attempts FROM jobs WHERE id = ?", (job.id,)
+        ).fetchone()[0]
+        if attempts < self.max_attempts:
+            self.db.requeue(job)
+            self._status[job.id] = (f"Retry {attempts} 🔁", elapsed)
+            queue.append(job)
+        else:
+            self.db.finished(job, FAILED, returncode, elapsed, r.peak_rss)
+            self._status[job.id] = ("Failed ❌", elapsed)
+            self._release(job)
+
+    def _print_status(self, running, first):
+        if not first:
+            # Move the cursor up to update the statuses in place
+            print(f"\033[{len(self._jobs)}A", end="")
+        now = time.time()
+        elapsed = {r.job.id: now - r.start for r in running}
+        for i, job in enumerate(self._jobs):
+            status, seconds = self._status[job.id]
+            if job.id in elapsed:
+                status, seconds = "Running ⏳", elapsed[job.id]
+            elif (
+                status.startswith("Wait")
+                and job.prerequisite is not None
+                and job.prerequisite.state == RUNNING
+            ):
+                status = "Preparing 🛠"
+            print(
+                f"{job.benchmark:<15} {i+1:<3} | {'Status':<10} {status:<10} | {'Elapsed Time':<15} {seconds:0.0f}s | "
+            )
+
+    def run(self, status=True):
+        """Runs the queued jobs until all are done or have failed.
+
+        On Ctrl-C the running jobs and the prerequisites being made are
+        killed. The jobs are left pending in the database, so the next run
+        of the sweep resumes them.
+
+        :returns: True if every job completed.
+        """
+        estimates = self.db.estimates()
+        queue = self._order(
+            [
+                j
+                for j in self._jobs
+                if self._status[j.id][0].startswith("Wait")
+            ],
+            estimates,
+        )
+        running = []
+        making = []
+        if status:
+            print("\n" * len(self._jobs))
+            self._print_status(running, first=True)
+        try:
+            while queue or running or making:
+                for r in list(running):
+                    returncode = r.proc.poll()
+                    if returncode is not None:
+                        running.remove(r)
+                        self._finish(r, returncode, queue)
+                for m in list(making):
+                    if not m.thread.is_alive():
+                        making.remove(m)
+                        self._made(m)
+
+                headroom = self._headroom(running + making)
+                i = 0
+                while (
+                    i < len(queue)
+                    and len(running) + len(making) < self.max_workers
+                ):
+                    job = queue[i]
+                    prerequisite = job.prerequisite
+                    state = (
+                        DONE if prerequisite is None else prerequisite.state
+                    )
+                    if state == RUNNING:
+                        # Let the jobs behind go ahead while it is being made
+                        i += 1
+                        continue
+                    if state == FAILED:
+                        queue.pop(i)
+                        self._fail(job)
+                        continue
+                    rss_estimate = self._rss_estimate(job, estimates)
+                    # Always keep one job running so a benchmark larger than
+                    # the whole host still gets its chance
+                    if (running or making) and rss_estimate > headroom:
+                        break
+                    headroom -= rss_estimate
+                    if state is None:
+                        making.append(self._make(prerequisite, rss_estimate))
+                        continue
+                    queue.pop(i)
+                    r = self._launch(job, rss_estimate)
+                    if r is None:
+                        if prerequisite is None:
+                            self._fail(job)
+                            continue
+                        # The prerequisite is gone since it was made, e.g.
+                        # evicted by another launcher
+                        prerequisite.state = (
+                            None
+                            if prerequisite.attempts < self.max_attempts
+                            else FAILED
+                        )
+                        headroom += rss_estimate
+                        queue.insert(i, job)
+                        continue
+                    running.append(r)
+
+                if status:
+                    self._print_status(running, first=False)
+                if queue or running or making:
+                    time.sleep(self.poll)
+        except KeyboardInterrupt:
+            print(
+                "\n❌ Keyboard interrupt received, stopping the running jobs."
+                " They will be resumed by the next run of the sweep."
+            )
+            for r in running + making:
+                if r.pid is not None:
+                    with contextlib.suppress(ProcessLookupError):
+                        os.killpg(r.pid, signal.SIGTERM)
+            for r in running:
+                r.proc.wait()
+                r.stack.close()
+                self.db.requeue(r.job)
+            for m in making:
+                # The process may have started after the kill above
+                while m.thread.is_alive():
+                    if m.pid is not None:
+                        with contextlib.suppress(ProcessLookupError):
+                            os.killpg(m.pid, signal.SIGTERM)
+                    m.thread.join(self.poll)
+            raise
+
+        return all(
+            self._status[j.id][0].startswith(("Done", "Skipped"))
+            for j in self._jobs
+        )
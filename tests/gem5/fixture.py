@@ -37,12 +37,12 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import gzip
+import multiprocessing
 import os
 import shutil
 import socket
 import sys
 import tempfile
-import threading
 import urllib.error
 import urllib.request
 from typing import (
@@ -110,6 +110,10 @@ class UniqueFixture(Fixture):
     once. Devired classses should override the _init and _setup
     functions.
 
+    The setup is only executed once across the worker processes of a
+    parallel run as well, as these are forked from the process which
+    created the fixture.
+
     :param target: The absolute path of the target in the filesystem.
 
     """
@@ -121,7 +125,8 @@ class UniqueFixture(Fixture):
             obj = cls.fixtures[target]
         else:
             obj = super().__new__(cls)
-            obj.lock = threading.Lock()
+            obj.lock = multiprocessing.Lock()
+            obj.setup_done = multiprocessing.RawValue("b", False)
             obj.target = target
             cls.fixtures[target] = obj
         return obj
@@ -136,9 +141,9 @@ class UniqueFixture(Fixture):
 
     def setup(self, testitem):
         with self.lock:
-            if hasattr(self, "_setup_done"):
+            if self.setup_done.value:
                 return
-            self._setup_done = True
+            self.setup_done.value = True
             self._setup(testitem)
 
 
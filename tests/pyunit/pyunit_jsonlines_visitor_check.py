@@ -0,0 +1,108 @@
+# Copyright (c) 2024 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import m5.stats
+from m5.stats.gem5stats import JsonLinesOutputVisitor
+
+
+class JsonLinesOutputVisitorTestSuite(unittest.TestCase):
+    """Tests the records written by the jsonl:// stat visitor."""
+
+    def setUp(self):
+        fd, self.file = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        self.tick = 0
+
+        root = mock.Mock()
+        root.resolveStat.side_effect = lambda name: mock.Mock(value=self.tick)
+        patcher = mock.patch(
+            "m5.stats.gem5stats.Root.getInstance", return_value=root
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        os.remove(self.file)
+
+    def _dump(self, visitor, values):
+        self.tick += 1000
+        with mock.patch.object(
+            visitor, "_flatten", return_value=iter(values.items())
+        ):
+            visitor.dump([mock.Mock()])
+
+    def _records(self):
+        with open(self.file) as f:
+            return [json.loads(line) for line in f]
+
+    def test_values(self):
+        visitor = JsonLinesOutputVisitor(self.file, filter=r"cpu\.")
+        self._dump(visitor, {"system.cpu.numCycles": 10, "system.mem": 1})
+        self._dump(visitor, {"system.cpu.numCycles": 25, "system.mem": 2})
+
+        self.assertEqual(
+            [
+                {
+                    "dump": 0,
+                    "tick": 1000,
+                    "stats": {"system.cpu.numCycles": 10},
+                },
+                {
+                    "dump": 1,
+                    "tick": 2000,
+                    "stats": {"system.cpu.numCycles": 25},
+                },
+            ],
+            self._records(),
+        )
+
+    def test_deltas(self):
+        visitor = JsonLinesOutputVisitor(self.file, deltas=True)
+        self._dump(visitor, {"cycles": 10})
+        self._dump(visitor, {"cycles": 25})
+        self.assertEqual(
+            [{"cycles": 10}, {"cycles": 15}],
+            [record["stats"] for record in self._records()],
+        )
+
+    def test_deltas_after_reset(self):
+        visitor = JsonLinesOutputVisitor(self.file, deltas=True)
+        self._dump(visitor, {"cycles": 100})
+        with mock.patch.object(m5.stats, "outputList", [visitor]):
+            m5.stats.reset()
+        # The stats count from zero again after the reset
+        self._dump(visitor, {"cycles": 30})
+        self._dump(visitor, {"cycles": 50})
+        self.assertEqual(
+            [{"cycles": 100}, {"cycles": 30}, {"cycles": 20}],
+            [record["stats"] for record in self._records()],
+        )
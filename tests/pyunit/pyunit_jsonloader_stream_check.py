@@ -0,0 +1,145 @@
+# Copyright (c) 2024 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import io
+import unittest
+
+from m5.ext.pystats import jsonloader
+from m5.ext.pystats.group import (
+    Group,
+    Vector,
+)
+from m5.ext.pystats.simstat import SimStat
+from m5.ext.pystats.statistic import (
+    Accumulator,
+    Distribution,
+    Scalar,
+)
+
+
+def make_dump(dump: int) -> str:
+    cores = {
+        f"cpu{i}": Group(
+            numCycles=Scalar(100 * dump + i, description='a "quoted" {}'),
+            latency=Distribution([1, 2, 3], 0, 3, 3, 1, sum=8),
+            mem=Vector({"reads": Scalar(dump), "writes": Scalar(2.5)}),
+        )
+        for i in range(3 if dump != 1 else 2)
+    }
+    return SimStat(
+        simulated_begin_time=0,
+        simulated_end_time=1000 * (dump + 1),
+        system=Group(
+            power=Accumulator([1.5, 0.5], count=2, min=0, max=2),
+            **cores,
+        ),
+    ).dumps()
+
+
+class JsonLoaderStreamTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.dumps = [make_dump(dump) for dump in range(3)]
+
+    def tearDown(self):
+        jsonloader._StreamParser.chunk_size = 1 << 20
+
+    def test_iter_stats(self):
+        stats = list(
+            jsonloader.iter_stats(
+                io.StringIO(self.dumps[0]),
+                ["system.cpu1", "system.power", "simulated_end_time"],
+            )
+        )
+        self.assertEqual(
+            [
+                "simulated_end_time",
+                "system.power",
+                "system.cpu1.numCycles",
+                "system.cpu1.latency",
+                "system.cpu1.mem.reads",
+                "system.cpu1.mem.writes",
+            ],
+            [path for _, path, _ in stats],
+        )
+        self.assertTrue(all(dump == 0 for dump, _, _ in stats))
+        self.assertEqual(1000, stats[0][2])
+
+        power = stats[1][2]
+        self.assertIsInstance(power, Accumulator)
+        self.assertEqual(2, power.count())
+
+        cycles = stats[2][2]
+        self.assertIsInstance(cycles, Scalar)
+        self.assertEqual(1, cycles.value)
+        self.assertEqual('a "quoted" {}', cycles.description)
+        self.assertIsInstance(stats[3][2], Distribution)
+
+    def test_iter_stats_all(self):
+        paths = [
+            path
+            for _, path, _ in jsonloader.iter_stats(io.StringIO(self.dumps[0]))
+        ]
+        self.assertIn("simulated_begin_time", paths)
+        self.assertIn("system.cpu2.mem.writes", paths)
+        self.assertEqual(4 + 1 + 3 * 4, len(paths))
+
+    def test_load_columns(self):
+        columns = jsonloader.load_columns(
+            io.StringIO("\n".join(self.dumps)),
+            ["system.cpu2", "system.cpu0.mem::reads", "simulated_end_time"],
+        )
+        self.assertEqual(
+            {
+                "simulated_end_time": [1000, 2000, 3000],
+                "system.cpu0.mem.reads": [0, 1, 2],
+                "system.cpu2.numCycles": [2, None, 202],
+                "system.cpu2.latency": [[1, 2, 3], None, [1, 2, 3]],
+                "system.cpu2.mem.reads": [0, None, 2],
+                "system.cpu2.mem.writes": [2.5, None, 2.5],
+            },
+            columns,
+        )
+
+    def test_load_columns_array(self):
+        columns = jsonloader.load_columns(
+            io.BytesIO(("[" + ",".join(self.dumps) + "]").encode()),
+            ["system.cpu1.numCycles", "system.missing"],
+        )
+        self.assertEqual({"system.cpu1.numCycles": [1, 101, 201]}, columns)
+
+    def test_small_chunks(self):
+        text = "\n".join(self.dumps)
+        expected = jsonloader.load_columns(io.StringIO(text))
+        for chunk_size in (1, 2, 7):
+            jsonloader._StreamParser.chunk_size = chunk_size
+            self.assertEqual(
+                expected, jsonloader.load_columns(io.StringIO(text))
+            )
+
+    def test_invalid(self):
+        for text in ('{"system": {"a": [1, 2}}', '{"a" 1}', "[{}", "1"):
+            with self.assertRaises(ValueError):
+                list(jsonloader.iter_stats(io.StringIO(text)))
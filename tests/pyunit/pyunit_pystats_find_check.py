@@ -0,0 +1,159 @@
+# Copyright (c) 2024 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import re
+import unittest
+
+from m5.ext.pystats.group import (
+    Group,
+    Vector,
+)
+from m5.ext.pystats.simstat import SimStat
+from m5.ext.pystats.statistic import Scalar
+
+
+def make_simstat() -> SimStat:
+    cores = {
+        f"cpu{i}": Group(
+            numCycles=Scalar(100 * (i + 1)),
+            committedInsts=Scalar(50 * (i + 1)),
+            fetch=Group(numCycles=Scalar(i)),
+        )
+        for i in range(3)
+    }
+    return SimStat(
+        system=Group(
+            cpu_other=Group(numCycles=Scalar(7)),
+            mem=Vector({"reads": Scalar(3), "writes": Scalar(4)}),
+            **cores,
+        )
+    )
+
+
+class PyStatsFindTestSuite(unittest.TestCase):
+    def test_children(self):
+        system = make_simstat().system
+        self.assertEqual(
+            [system.cpu_other, system.mem, system.cpu0, system.cpu1],
+            system.children()[:4],
+        )
+        self.assertEqual(
+            [system.cpu0, system.cpu1, system.cpu2],
+            system.children(
+                lambda name: name.startswith("cpu") and "_" not in name
+            ),
+        )
+
+    def test_recursive_children_order(self):
+        simstat = make_simstat()
+        cpu0 = simstat.system.cpu0
+        self.assertEqual(
+            [
+                cpu0.numCycles,
+                cpu0.committedInsts,
+                cpu0.fetch,
+                cpu0.fetch.numCycles,
+            ],
+            cpu0.children(recursive=True),
+        )
+
+    def test_find(self):
+        simstat = make_simstat()
+        system = simstat.system
+        self.assertEqual(
+            [system.cpu0, system.cpu1, system.cpu2], system.find("cpu[0-9]")
+        )
+        self.assertEqual(
+            [
+                system.cpu_other.numCycles,
+                system.cpu0.numCycles,
+                system.cpu0.fetch.numCycles,
+                system.cpu1.numCycles,
+                system.cpu1.fetch.numCycles,
+                system.cpu2.numCycles,
+                system.cpu2.fetch.numCycles,
+            ],
+            simstat.find(re.compile("numCycles")),
+        )
+        # Cached results are not shared with the caller.
+        simstat.find("numCycles").clear()
+        self.assertEqual(7, len(simstat.find("numCycles")))
+
+    def test_tree_changes(self):
+        simstat = make_simstat()
+        self.assertEqual([], simstat.find("numInsts"))
+        self.assertEqual(1, len(simstat.find("cpu_other")))
+
+        # Adding, replacing and removing stats deep in the tree update the
+        # results of the root
+        simstat.system.cpu0.numInsts = Scalar(1)
+        self.assertEqual(
+            [simstat.system.cpu0.numInsts], simstat.find("numInsts")
+        )
+        simstat.system.cpu0.numInsts = Scalar(2)
+        self.assertEqual(2, simstat.get("system.cpu0.numInsts").value)
+        del simstat.system.cpu_other
+        self.assertEqual([], simstat.find("cpu_other"))
+        self.assertIsNone(simstat.get("system.cpu_other.numCycles"))
+
+    def test_invalidate_index(self):
+        simstat = make_simstat()
+        self.assertEqual([], simstat.find("numInsts"))
+        simstat.system.cpu0.__dict__["numInsts"] = Scalar(1)
+        simstat.invalidate_index()
+        self.assertEqual(
+            [simstat.system.cpu0.numInsts], simstat.find("numInsts")
+        )
+
+    def test_get(self):
+        simstat = make_simstat()
+        self.assertIs(
+            simstat.system.cpu1.fetch.numCycles,
+            simstat.get("system.cpu1.fetch.numCycles"),
+        )
+        self.assertIs(
+            simstat.system.mem.reads, simstat.get("system.mem::reads")
+        )
+        self.assertIsNone(simstat.get("system.cpu9.numCycles"))
+
+    def test_select(self):
+        simstat = make_simstat()
+        values = simstat.select(
+            [
+                "system.cpu2.numCycles",
+                "system.mem::writes",
+                "system.cpu0",
+                "system.missing",
+            ]
+        )
+        self.assertEqual([300.0, 4.0], values[:2].tolist())
+        self.assertTrue(all(v != v for v in values[2:]))
+
+    def test_index_not_serialized(self):
+        simstat = make_simstat()
+        before = simstat.to_json()
+        simstat.find("numCycles")
+        self.assertEqual(before, simstat.to_json())
@@ -0,0 +1,196 @@
+# Copyright (c) 2024 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import contextlib
+import unittest
+
+from m5.params import (
+    NULL,
+    Param,
+)
+from m5.proxy import (
+    Parent,
+    isproxy,
+)
+from m5.SimObject import (
+    SimObject,
+    typeIndex,
+)
+
+
+class PyunitTypeIndexNode(SimObject):
+    type = "PyunitTypeIndexNode"
+    cxx_header = "sim/sub_system.hh"
+    cxx_class = "gem5::SubSystem"
+
+
+class PyunitTypeIndexLeaf(SimObject):
+    type = "PyunitTypeIndexLeaf"
+    cxx_header = "sim/sub_system.hh"
+    cxx_class = "gem5::SubSystem"
+
+
+class PyunitTypeIndexUser(SimObject):
+    type = "PyunitTypeIndexUser"
+    cxx_header = "sim/sub_system.hh"
+    cxx_class = "gem5::SubSystem"
+
+    leaf = Param.PyunitTypeIndexLeaf(Parent.any, "Leaf used by this object")
+
+
+Node = PyunitTypeIndexNode
+Leaf = PyunitTypeIndexLeaf
+User = PyunitTypeIndexUser
+
+
+def make_tree() -> Node:
+    root = Node()
+    root.leaf = Leaf()
+    root.sub = Node()
+    root.sub.user = User()
+    root.sub.other = Node()
+    root.sub.other.user = User(leaf=NULL)
+    return root
+
+
+class SimObjectTypeIndexTestSuite(unittest.TestCase):
+    def assertSameIndexed(self, lookup):
+        # The lookup gives the same result with and without the index, and
+        # when the index is already built
+        expected = lookup()
+        with typeIndex():
+            self.assertEqual(expected, lookup())
+            self.assertEqual(expected, lookup())
+        return expected
+
+    def test_find_any(self):
+        root = make_tree()
+        self.assertEqual(
+            (root.leaf, True),
+            self.assertSameIndexed(lambda: root.find_any(Leaf)),
+        )
+        self.assertEqual(
+            (root.sub, True),
+            self.assertSameIndexed(lambda: root.sub.find_any(Node)),
+        )
+        self.assertEqual(
+            (None, False),
+            self.assertSameIndexed(lambda: root.sub.find_any(Leaf)),
+        )
+        # A param holding a proxy or NULL is returned as is
+        self.assertTrue(isproxy(root.sub.user.find_any(Leaf)[0]))
+        self.assertEqual(
+            (NULL, True),
+            self.assertSameIndexed(lambda: root.sub.other.user.find_any(Leaf)),
+        )
+
+    def test_find_all(self):
+        root = make_tree()
+        self.assertEqual(
+            ([root.leaf], True),
+            self.assertSameIndexed(lambda: root.find_all(Leaf)),
+        )
+        self.assertEqual(
+            ([root.sub.other.user, root.sub.user], True),
+            self.assertSameIndexed(lambda: root.find_all(User)),
+        )
+        self.assertEqual(
+            ([], True),
+            self.assertSameIndexed(lambda: root.sub.find_all(Leaf)),
+        )
+
+        # Params of the sub-tree are searched too
+        root.sub.other.user.leaf = Leaf()
+        self.assertEqual(
+            ([root.leaf, root.sub.other.user.leaf], True),
+            self.assertSameIndexed(lambda: root.find_all(Leaf)),
+        )
+
+    def test_matched_more_than_one(self):
+        root = make_tree()
+        root.other_leaf = Leaf()
+        with self.assertRaisesRegex(AttributeError, "matched more than one"):
+            root.find_any(Leaf)
+        with typeIndex():
+            with self.assertRaisesRegex(
+                AttributeError, "matched more than one"
+            ):
+                root.find_any(Leaf)
+
+        # A child and a param holding different objects
+        user = root.sub.other.user
+        user.child_leaf = Leaf()
+        user.leaf = Leaf()
+        with self.assertRaisesRegex(AttributeError, "matched more than one"):
+            user.find_any(Leaf)
+        with typeIndex():
+            with self.assertRaisesRegex(
+                AttributeError, "matched more than one"
+            ):
+                user.find_any(Leaf)
+
+    def test_invalidation(self):
+        root = make_tree()
+        other = root.sub.other
+        with typeIndex():
+            self.assertEqual((None, False), other.find_any(Leaf))
+            self.assertEqual([root.leaf], root.find_all(Leaf)[0])
+
+            # Adding a child drops the index of the object and its ancestors
+            other.extra = Leaf()
+            self.assertEqual((other.extra, True), other.find_any(Leaf))
+            self.assertEqual([root.leaf, other.extra], root.find_all(Leaf)[0])
+
+            other.clear_child("extra")
+            self.assertEqual((None, False), other.find_any(Leaf))
+            self.assertEqual([root.leaf], root.find_all(Leaf)[0])
+
+    def test_unproxy(self):
+        for indexed in (False, True):
+            root = make_tree()
+            root.eventq_index = 0
+            root.sub.other.leaf = Leaf()
+            root.sub.other.near_user = User()
+            with typeIndex() if indexed else contextlib.nullcontext():
+                for obj in root.descendants():
+                    obj.unproxyParams()
+            # Parent.any resolves to the match of the closest ancestor
+            self.assertIs(root.leaf, root.sub.user.leaf)
+            self.assertIs(root.sub.other.leaf, root.sub.other.near_user.leaf)
+            self.assertIs(NULL, root.sub.other.user.leaf)
+
+    def test_freeze_path(self):
+        root = make_tree()
+        user = root.sub.user
+        path = user.path()
+        root.sub.freeze_path()
+        user.freeze_path()
+        self.assertEqual(path, user.path())
+
+        # Moving the object drops its cached path
+        root.sub.clear_child("user")
+        root.user = user
+        self.assertEqual(root.path() + ".user", user.path())
@@ -0,0 +1,134 @@
+# Copyright (c) 2024 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+from unittest import mock
+
+from m5.stats.gem5stats import StatHandles
+
+import _m5.stats
+
+
+class FakeInfo:
+    def __init__(self, value):
+        self.value = value
+
+    def prepare(self):
+        pass
+
+
+class FakeScalar(FakeInfo):
+    pass
+
+
+class FakeVector(FakeInfo):
+    def __init__(self, value, subnames):
+        super().__init__(value)
+        self.subnames = subnames
+        self.size = len(value)
+        self.total = sum(value)
+
+
+class FakeGroup:
+    def __init__(self, stats, groups):
+        self.stats = stats
+        self.groups = groups
+        self.pre_dumps = 0
+
+    def getStatGroups(self):
+        return self.groups
+
+    def preDumpStats(self):
+        self.pre_dumps += 1
+
+    def resolveStat(self, name):
+        group = self
+        *group_names, stat_name = name.split(".")
+        for group_name in group_names:
+            group = group.groups[group_name]
+        return group.stats[stat_name]
+
+
+class StatHandlesTestSuite(unittest.TestCase):
+    """Tests the path resolution of m5.stats.gem5stats.StatHandles."""
+
+    def setUp(self):
+        self.cpu = FakeGroup(
+            {
+                "numCycles": FakeScalar(100.0),
+                "ops": FakeVector([3.0, 4.0], ["Read", "Write"]),
+            },
+            {},
+        )
+        self.root = FakeGroup({}, {"system": FakeGroup({}, {"cpu": self.cpu})})
+
+        for patcher in (
+            mock.patch.object(
+                _m5.stats, "ScalarInfo", FakeScalar, create=True
+            ),
+            mock.patch.object(
+                _m5.stats, "VectorInfo", FakeVector, create=True
+            ),
+            mock.patch.object(_m5.stats, "processDumpQueue", create=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_paths(self):
+        paths = [
+            "system.cpu.numCycles",
+            "system.cpu.ops",
+            "system.cpu.ops::Write",
+            "system.cpu.ops::0",
+            "system.cpu.ops::total",
+        ]
+        handles = StatHandles(self.root, paths)
+
+        self.assertEqual(paths, handles.get_paths())
+        self.assertEqual(5, len(handles))
+        self.assertEqual(
+            dict(zip(paths, [100.0, [3.0, 4.0], 4.0, 3.0, 7.0])),
+            handles.get(),
+        )
+        # The group owning the stats is prepared once per read
+        self.assertEqual(1, self.cpu.pre_dumps)
+
+    def test_current_values(self):
+        handles = StatHandles(self.root, ["system.cpu.numCycles"])
+        self.cpu.stats["numCycles"].value = 250.0
+        self.assertEqual([250.0], handles.values())
+
+    def test_invalid_paths(self):
+        for path in (
+            "system.cpu.missing",
+            "system.gpu.numCycles",
+            "system.cpu.numCycles::0",
+            "system.cpu.ops::Fetch",
+            "system.cpu.ops::2",
+        ):
+            with self.subTest(path=path):
+                with self.assertRaises(KeyError):
+                    StatHandles(self.root, [path])
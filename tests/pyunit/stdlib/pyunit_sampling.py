@@ -0,0 +1,109 @@
+# Copyright (c) 2024 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import math
+import unittest
+
+from gem5.simulate.sampling import (
+    Sample,
+    SampledCPI,
+)
+
+
+class SampledCPITestSuite(unittest.TestCase):
+    """Tests the simulate.sampling.SampledCPI class."""
+
+    def test_weighted_cpi(self) -> None:
+        estimate = SampledCPI(
+            [
+                Sample(index=0, tick=10, instructions=1000, cycles=1000),
+                Sample(index=1, tick=20, instructions=3000, cycles=9000),
+            ]
+        )
+
+        self.assertEqual(2, estimate.get_num_samples())
+        self.assertAlmostEqual(10000 / 4000, estimate.get_cpi())
+
+    def test_confidence_interval(self) -> None:
+        samples = [
+            Sample(index=i, tick=i, instructions=1000, cycles=cycles)
+            for i, cycles in enumerate([1000, 1200, 1400, 1600])
+        ]
+        estimate = SampledCPI(samples, confidence=0.95)
+
+        # With equal instructions, this is the standard error of the mean.
+        cpis = [1.0, 1.2, 1.4, 1.6]
+        mean = sum(cpis) / len(cpis)
+        stddev = math.sqrt(
+            sum((cpi - mean) ** 2 for cpi in cpis) / (len(cpis) - 1)
+        )
+        error = stddev / math.sqrt(len(cpis))
+        self.assertAlmostEqual(error, estimate.get_standard_error())
+
+        low, high = estimate.get_confidence_interval()
+        self.assertAlmostEqual(mean - 1.959964 * error, low, places=5)
+        self.assertAlmostEqual(mean + 1.959964 * error, high, places=5)
+
+    def test_required_samples(self) -> None:
+        samples = [
+            Sample(index=i, tick=i, instructions=1000, cycles=cycles)
+            for i, cycles in enumerate([1000, 1200, 1400, 1600])
+        ]
+        estimate = SampledCPI(samples)
+
+        self.assertGreater(estimate.get_required_samples(0.01), 4)
+        self.assertLess(
+            estimate.get_required_samples(0.5),
+            estimate.get_required_samples(0.01),
+        )
+
+    def test_no_samples(self) -> None:
+        estimate = SampledCPI(
+            [Sample(index=0, tick=0, instructions=0, cycles=0)]
+        )
+
+        self.assertEqual(0, estimate.get_num_samples())
+        self.assertIsNone(estimate.get_cpi())
+        self.assertIsNone(estimate.get_confidence_interval())
+        self.assertEqual("No samples", str(estimate))
+
+    def test_single_sample(self) -> None:
+        estimate = SampledCPI(
+            [Sample(index=0, tick=0, instructions=100, cycles=150)]
+        )
+
+        self.assertAlmostEqual(1.5, estimate.get_cpi())
+        self.assertIsNone(estimate.get_confidence_interval())
+        with self.assertRaises(ValueError):
+            estimate.get_required_samples()
+
+    def test_json_round_trip(self) -> None:
+        sample = Sample(index=3, tick=42, instructions=100, cycles=250.0)
+
+        loaded = Sample.from_json(sample.to_json())
+
+        self.assertEqual(sample.to_json(), loaded.to_json())
+        self.assertAlmostEqual(2.5, loaded.get_cpi())
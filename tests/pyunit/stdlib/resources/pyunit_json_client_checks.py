@@ -26,6 +26,7 @@
 
 import json
 import os
+import shutil
 import tempfile
 import unittest
 from typing import Dict
@@ -133,14 +134,17 @@ class JSONClientTestSuite(unittest.TestCase):
                 ],
             },
         ]
+        cls.file_contents = file_contents
         file = tempfile.NamedTemporaryFile(mode="w", delete=False)
         file.write(json.dumps(file_contents))
         file.close()
         cls.file_path = file.name
+        cls.catalog_dir = tempfile.mkdtemp()
 
     @classmethod
     def tearDownClass(cls) -> None:
         os.remove(cls.file_path)
+        shutil.rmtree(cls.catalog_dir)
 
     def verify_json(self, json: Dict) -> None:
         """
@@ -162,10 +166,61 @@ class JSONClientTestSuite(unittest.TestCase):
     def test_get_resources_json_at_path(self) -> None:
         # Tests JSONClient.get_resources_json()
 
-        client = JSONClient(path=self.file_path)
+        client = JSONClient(path=self.file_path, catalog_dir=self.catalog_dir)
         json = client.get_resources_json()
         self.verify_json(json=json)
 
+    def test_get_resources_from_catalog(self) -> None:
+        # Tests that JSONClient.get_resources() reads the resources from the
+        # catalog and filters them like the unindexed JSON.
+
+        JSONClient(path=self.file_path, catalog_dir=self.catalog_dir)
+        client = JSONClient(path=self.file_path, catalog_dir=self.catalog_dir)
+        self.assertIsNone(client._resources)
+
+        resources = client.get_resources(resource_id="test-version")
+        self.assertEqual(self.file_contents[2:4], resources)
+
+        resources = client.get_resources(
+            resource_id="test-version", resource_version="0.2.0"
+        )
+        self.assertEqual([self.file_contents[3]], resources)
+
+        resources = client.get_resources(
+            resource_id="this-is-a-test-resource", gem5_version="23.1.0.0"
+        )
+        self.assertEqual([self.file_contents[1]], resources)
+
+        resources = client.get_resources(gem5_version="23.0.1")
+        self.assertEqual([self.file_contents[i] for i in (0, 2, 3)], resources)
+
+        self.assertEqual(
+            self.file_contents,
+            client.get_resources(resource_version="1.0.0"),
+        )
+
+    def test_catalog_rebuilt_on_change(self) -> None:
+        # Tests that the catalog is rebuilt when the resources JSON changes.
+
+        catalog_dir = tempfile.mkdtemp()
+        file = tempfile.NamedTemporaryFile(mode="w", delete=False)
+        file.write(json.dumps(self.file_contents))
+        file.close()
+        try:
+            client = JSONClient(path=file.name, catalog_dir=catalog_dir)
+            self.assertEqual(4, len(client.get_resources()))
+
+            with open(file.name, "w") as f:
+                f.write(json.dumps(self.file_contents[:1]))
+            st = os.stat(file.name)
+            os.utime(file.name, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+
+            client = JSONClient(path=file.name, catalog_dir=catalog_dir)
+            self.assertEqual(self.file_contents[:1], client.get_resources())
+        finally:
+            os.remove(file.name)
+            shutil.rmtree(catalog_dir)
+
     def test_get_resources_json_invalid_url(self) -> None:
         # Tests the JSONClient.get_resources_json() function in case where an
         # invalid url is passed as the URL/PATH of the resources JSON file.
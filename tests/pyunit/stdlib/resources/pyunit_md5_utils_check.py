@@ -24,17 +24,28 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import contextlib
+import hashlib
+import io
 import os
 import shutil
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
+from gem5.resources import md5_utils
 from gem5.resources.md5_utils import (
+    cached_md5,
     md5_dir,
     md5_file,
 )
 
+try:
+    import tqdm
+except ImportError:
+    tqdm = None
+
 
 class MD5FileTestSuite(unittest.TestCase):
     """Test cases for gem5.resources.md5_utils.md5_file()"""
@@ -73,6 +84,50 @@ class MD5FileTestSuite(unittest.TestCase):
 
         self.assertEqual(first_file_md5, second_file_md5)
 
+    def test_md5FileCacheReused(self) -> None:
+        # This test ensures a cached md5 is reused while the file is unchanged
+        # and recomputed once it changes.
+
+        dir = Path(tempfile.mkdtemp())
+        path = dir / "file"
+        path.write_text("This is a test string, to be put in a temp file")
+
+        self.assertIsNone(cached_md5(path))
+        md5 = md5_file(path, use_cache=True)
+        self.assertEqual("b113b29fce251f2023066c3fda2ec9dd", md5)
+        self.assertEqual(md5, cached_md5(path))
+
+        # Corrupt the sidecar to check the hash is not recomputed.
+        cache = dir / "file.md5cache"
+        cache.write_text(cache.read_text().replace(md5, "0" * 32))
+        self.assertEqual("0" * 32, md5_file(path, use_cache=True))
+
+        path.write_text("Some other test string of a different length")
+        self.assertIsNone(cached_md5(path))
+        self.assertEqual(md5_file(path), md5_file(path, use_cache=True))
+
+        shutil.rmtree(dir)
+
+    @unittest.skipIf(tqdm is None, "Needs tqdm")
+    def test_md5FileProgressBar(self) -> None:
+        # This test ensures the md5 of a file large enough to show a progress
+        # bar is computed through tqdm and is the same as without it.
+
+        data = os.urandom(3 * md5_utils._READ_SIZE + 5)
+        file = tempfile.NamedTemporaryFile(delete=False)
+        file.write(data)
+        file.close()
+
+        stderr = io.StringIO()
+        with mock.patch.object(
+            md5_utils, "_PROGRESS_BAR_SIZE", 0
+        ), contextlib.redirect_stderr(stderr):
+            md5 = md5_file(Path(file.name))
+        os.remove(file.name)
+
+        self.assertEqual(hashlib.md5(data).hexdigest(), md5)
+        self.assertIn("Computing md5sum", stderr.getvalue())
+
 
 class MD5DirTestSuite(unittest.TestCase):
     """Test cases for gem5.resources.md5_utils.md5_dir()"""
@@ -116,3 +171,20 @@ class MD5DirTestSuite(unittest.TestCase):
         shutil.rmtree(dir2)
 
         self.assertEqual(first_md5, second_md5)
+
+    def test_md5DirCacheInvalidated(self) -> None:
+        # This test ensures a cached directory md5 is dropped once a file in
+        # the directory changes.
+
+        dir = self._create_temp_directory()
+        md5 = md5_dir(dir, use_cache=True)
+        self.assertEqual("ad5ac785de44c9fc2fe2798cab2d7b1a", md5)
+        self.assertEqual(md5, cached_md5(dir))
+
+        with open(os.path.join(dir, "dir2", "file1"), "a") as f:
+            f.write("Even more data")
+        self.assertIsNone(cached_md5(dir))
+        self.assertEqual(md5_dir(dir), md5_dir(dir, use_cache=True))
+
+        shutil.rmtree(dir)
+        os.remove(f"{dir}.md5cache")
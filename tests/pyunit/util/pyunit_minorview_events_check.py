@@ -0,0 +1,163 @@
+# Copyright (c) 2024 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+gem5_root = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, os.pardir)
+)
+sys.path.insert(0, os.path.join(gem5_root, "util"))
+
+from minorview.events import (
+    EventIndex,
+    merge_times,
+    split_line,
+)
+
+Id = collections.namedtuple("Id", "lineSeqNum fetchSeqNum execSeqNum")
+
+
+def parse_id(string):
+    line, fetch, exec = string.replace(".", "/").split("/")
+    return Id(int(line), int(fetch), int(exec))
+
+
+trace = [
+    "100: system.cpu.fetch1: MinorTrace: state=a",
+    "100: system.cpu.fetch1: first comment",
+    "100: system.cpu.decode: MinorTrace: insts=x",
+    "100: system.cpu.execute: MinorInst: id=1/1.0 addr=0x10",
+    "100: system.cpu.execute: MinorInst: id=1/1.1 addr=0x10",
+    "Not an event line",
+    "200: system.cpu.fetch1: MinorTrace: state=a",
+    "200: system.cpu.decode: MinorTrace: insts=y",
+    "200: system.cpu.fetch1: MinorLine: id=7/0.0 size=16",
+    "300: system.cpu.fetch1: second comment",
+    "300: system.cpu.execute: MinorInst: id=1/2.1 addr=0x20",
+    "300: system.cpu.execute: MinorInst: id=1/1.1 addr=0x11",
+]
+
+
+class MinorviewEventsTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.trace = os.path.join(self.tmpdir, "trace.out")
+        with open(self.trace, "w") as f:
+            f.write("\n".join(trace) + "\n")
+        self.offsets = []
+        offset = 0
+        for line in trace:
+            self.offsets.append(offset)
+            offset += len(line) + 1
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _load(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            index = EventIndex.load(self.trace, "system.cpu", parse_id)
+        return index, stdout.getvalue()
+
+    def _read(self, offset):
+        # Events are parsed from the trace on demand, by offset
+        with open(self.trace, "rb") as f:
+            f.seek(offset)
+            return split_line(f.readline())
+
+    def test_unit_events(self):
+        index, _ = self._load()
+        self.assertEqual({"fetch1", "decode"}, set(index.units.keys()))
+
+        # The repeated fetch1 trace at 200 is dropped and the comment at
+        # 300 makes a new event with the data of the one at 100
+        fetch1 = index.units["fetch1"]
+        self.assertEqual([100, 300], list(fetch1.times))
+        self.assertEqual([self.offsets[0]] * 2, list(fetch1.traces))
+        self.assertEqual([self.offsets[1]], list(fetch1.comment_offsets(0)))
+        self.assertEqual([self.offsets[9]], list(fetch1.comment_offsets(1)))
+        self.assertEqual(
+            (300, "system.cpu.fetch1", None, "second comment"),
+            self._read(fetch1.comment_offsets(1)[0]),
+        )
+
+        decode = index.units["decode"]
+        self.assertEqual([100, 200], list(decode.times))
+        self.assertEqual(
+            (200, "system.cpu.decode", "MinorTrace:", "insts=y"),
+            self._read(decode.traces[1]),
+        )
+        self.assertEqual(1, decode.find_index(250))
+        self.assertIsNone(decode.find_index(50))
+        self.assertEqual(4, index.minorTraceLineCount)
+        self.assertEqual(4, index.numEvents)
+
+    def test_merge_times(self):
+        index, _ = self._load()
+        times = merge_times(
+            [
+                memoryview(index.units["fetch1"].times),
+                memoryview(index.units["decode"].times)[1:],
+                [],
+            ]
+        )
+        self.assertEqual([100, 200, 300], list(times))
+
+    def test_insts_and_lines(self):
+        index, _ = self._load()
+        # The last definition of an instruction wins
+        self.assertEqual(self.offsets[11], index.find_inst_offset(1, 1))
+        # A macroop with no definition is represented by its first microop
+        self.assertEqual(self.offsets[10], index.find_inst_offset(2, 0))
+        self.assertEqual(self.offsets[3], index.find_inst_offset(1, 0))
+        self.assertIsNone(index.find_inst_offset(3, 0))
+
+        self.assertEqual(self.offsets[8], index.find_line_offset(7))
+        self.assertIsNone(index.find_line_offset(6))
+        self.assertEqual("size=16", self._read(self.offsets[8])[3][-7:])
+
+    def test_saved_index(self):
+        _, output = self._load()
+        self.assertIn("Indexing file", output)
+        self.assertTrue(os.path.exists(EventIndex.index_filename(self.trace)))
+
+        index, output = self._load()
+        self.assertNotIn("Indexing file", output)
+        self.assertEqual([100, 300], list(index.units["fetch1"].times))
+
+        # A changed trace is indexed again
+        with open(self.trace, "a") as f:
+            f.write("400: system.cpu.fetch1: MinorTrace: state=b\n")
+        index, output = self._load()
+        self.assertIn("Indexing file", output)
+        self.assertEqual([100, 300, 400], list(index.units["fetch1"].times))
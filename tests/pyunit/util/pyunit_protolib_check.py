@@ -0,0 +1,159 @@
+# Copyright (c) 2024 The Regents of the University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import contextlib
+import gzip
+import importlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+gem5_root = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, os.pardir)
+)
+sys.path.insert(0, os.path.join(gem5_root, "util"))
+
+import protolib
+
+try:
+    import numpy
+    from google.protobuf import wrappers_pb2
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "Needs numpy and protobuf")
+class ProtolibTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, frames, compress=False):
+        path = os.path.join(self.tmpdir, name)
+        with (gzip.open if compress else open)(path, "wb") as f:
+            for message in frames:
+                protolib.encodeMessage(f, message)
+        return path
+
+    def test_empty_frames(self):
+        # A zero size is an empty message rather than the end of the trace
+        values = [5, 0, 7, 0]
+        for compress in (False, True):
+            path = self._write(
+                "values",
+                [wrappers_pb2.UInt64Value(value=v) for v in values],
+                compress,
+            )
+            message = wrappers_pb2.UInt64Value()
+
+            proto_in = protolib.openFileRd(path)
+            decoded = []
+            while protolib.decodeMessage(proto_in, message):
+                decoded.append(message.value)
+            proto_in.close()
+            self.assertEqual(values, decoded)
+
+            proto_in = protolib.openFileRd(path)
+            decoded = [
+                m.value for m in protolib.decodeMessages(proto_in, message)
+            ]
+            proto_in.close()
+            self.assertEqual(values, decoded)
+
+    @unittest.skipIf(shutil.which("protoc") is None, "Needs protoc")
+    def test_decode_inst_dep_trace_table(self):
+        subprocess.check_call(
+            [
+                "protoc",
+                f"--python_out={self.tmpdir}",
+                f"--proto_path={os.path.join(gem5_root, 'src', 'proto')}",
+                "inst_dep_record.proto",
+            ]
+        )
+        sys.path.insert(0, self.tmpdir)
+        self.addCleanup(sys.path.remove, self.tmpdir)
+        import inst_dep_record_pb2 as pb2
+
+        decoder = importlib.import_module("decode_inst_dep_trace")
+
+        records = [
+            pb2.InstDepRecordHeader(obj_id="t", tick_freq=1, window_size=1)
+        ]
+        for seq_num in range(1, 10):
+            records.append(
+                pb2.InstDepRecord(
+                    seq_num=seq_num,
+                    type=pb2.InstDepRecord.COMP,
+                    comp_delay=seq_num,
+                    rob_dep=range(1, seq_num % 3),
+                    reg_dep=range(1, seq_num % 4),
+                )
+            )
+        trace = os.path.join(self.tmpdir, "trace")
+        with open(trace, "wb") as f:
+            f.write(b"gem5")
+            for record in records:
+                protolib.encodeMessage(f, record)
+
+        summaries = {}
+        for out in ("trace.txt", "trace.npy"):
+            out_path = os.path.join(self.tmpdir, out)
+            stdout = io.StringIO()
+            with mock.patch.object(
+                sys, "argv", ["decode", trace, out_path]
+            ), contextlib.redirect_stdout(stdout):
+                decoder.main()
+            summaries[out] = stdout.getvalue().splitlines()[-3:]
+
+        self.assertEqual(summaries["trace.txt"], summaries["trace.npy"])
+        self.assertEqual(
+            [
+                "Parsed packets: 9",
+                "Packets with at least 1 reg dep: 4",
+                "Packets with at least 1 rob dep: 3",
+            ],
+            summaries["trace.npy"],
+        )
+
+        table = numpy.load(
+            os.path.join(self.tmpdir, "trace.npy"), allow_pickle=True
+        )
+        with open(os.path.join(self.tmpdir, "trace.txt")) as f:
+            for row, line in zip(table, f):
+                _, rob_deps, reg_deps = line.rstrip("\n").split(":")
+                self.assertEqual(
+                    rob_deps, "".join(f",{dep}" for dep in row["rob_dep"])
+                )
+                self.assertEqual(
+                    reg_deps, "".join(f",{dep}" for dep in row["reg_dep"])
+                )
@@ -28,10 +28,17 @@
 
 import gzip
 import os
+import queue
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser
 
+# Bytes of memory decompressed, and compressed as one gzip member, at a time
+CHUNK_SIZE = 1 << 22
+# Chunks of each memory image buffered ahead of the output
+CHUNKS_AHEAD = 2
+
 
 class myCP(ConfigParser):
     def __init__(self):
@@ -41,19 +48,98 @@ class myCP(ConfigParser):
         return optionstr
 
 
-def aggregate(output_dir, cpts, no_compress, memory_size):
+def read_chunks(path, size):
+    """Yields the first size bytes of a gzipped memory image."""
+    with gzip.open(path, "rb") as gf:
+        while size > 0:
+            chunk = gf.read(min(size, CHUNK_SIZE))
+            if not chunk:
+                break
+            size -= len(chunk)
+            yield chunk
+
+
+class MemoryMerger:
+    """
+    Writes memory images one after the other to a single image.
+
+    The input images are decompressed concurrently. A compressed output is
+    made of independent gzip members, one per chunk, which are compressed
+    in parallel. gzip readers, gem5's included, read consecutive members
+    as a single stream.
+    """
+
+    def __init__(self, out, compress, jobs):
+        self.out = out
+        self.compress = compress
+        self.readers = ThreadPoolExecutor(jobs)
+        self.compressors = ThreadPoolExecutor(jobs)
+        self.images = []
+
+    def _encode(self, chunk):
+        return gzip.compress(chunk) if self.compress else chunk
+
+    def _read(self, path, size, chunks):
+        try:
+            for chunk in read_chunks(path, size):
+                chunks.put(self.compressors.submit(self._encode, chunk))
+        finally:
+            chunks.put(None)
+
+    def add(self, path, size):
+        """Appends the first size bytes of a gzipped memory image."""
+        chunks = queue.Queue(CHUNKS_AHEAD)
+        reader = self.readers.submit(self._read, path, size, chunks)
+        self.images.append((reader, chunks))
+
+    def pad(self, size):
+        """
+        Appends size zero bytes. An uncompressed image is extended as a
+        sparse file, a compressed one repeats the same compressed chunk of
+        zeros.
+        """
+        if not self.compress:
+            self.out.truncate(self.out.tell() + size)
+            self.out.seek(0, os.SEEK_END)
+            return
+
+        chunks, rest = divmod(size, CHUNK_SIZE)
+        if chunks:
+            zeros = gzip.compress(bytes(CHUNK_SIZE))
+            for _ in range(chunks):
+                self.out.write(zeros)
+        if rest:
+            self.out.write(gzip.compress(bytes(rest)))
+
+    def write(self):
+        """Writes the images added so far."""
+        for reader, chunks in self.images:
+            chunk = chunks.get()
+            while chunk is not None:
+                self.out.write(chunk.result())
+                chunk = chunks.get()
+            # Raise the errors of the reader, if any
+            reader.result()
+        self.images = []
+
+    def close(self):
+        self.readers.shutdown()
+        self.compressors.shutdown()
+
+
+def aggregate(output_dir, cpts, no_compress, memory_size, jobs=None):
     merged_config = None
     page_ptr = 0
 
     output_path = output_dir
-    if not os.path.isdir(output_path):
-        os.system("mkdir -p " + output_path)
+    os.makedirs(output_path, exist_ok=True)
 
     agg_mem_file = open(output_path + "/system.physmem.store0.pmem", "wb+")
-    agg_config_file = open(output_path + "/m5.cpt", "wb+")
+    agg_config_file = open(output_path + "/m5.cpt", "w+")
 
-    if not no_compress:
-        merged_mem = gzip.GzipFile(fileobj=agg_mem_file, mode="wb")
+    merged_mem = MemoryMerger(
+        agg_mem_file, not no_compress, jobs or os.cpu_count()
+    )
 
     max_curtick = 0
     num_digits = len(str(len(cpts) - 1))
@@ -62,7 +148,8 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
         print(arg)
         merged_config = myCP()
         config = myCP()
-        config.readfp(open(cpts[i] + "/m5.cpt"))
+        with open(cpts[i] + "/m5.cpt") as f:
+            config.read_file(f)
 
         for sec in config.sections():
             if re.compile("cpu").search(sec):
@@ -73,13 +160,15 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
                 for item in items:
                     if item[0] == "paddr":
                         merged_config.set(
-                            newsec, item[0], int(item[1]) + (page_ptr << 12)
+                            newsec,
+                            item[0],
+                            str(int(item[1]) + (page_ptr << 12)),
                         )
                         continue
                     merged_config.set(newsec, item[0], item[1])
 
                 if re.compile("workload.FdMap256$").search(sec):
-                    merged_config.set(newsec, "M5_pid", i)
+                    merged_config.set(newsec, "M5_pid", str(i))
 
             elif sec == "system":
                 pass
@@ -101,34 +190,20 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
         page_ptr = page_ptr + pages
         print("pages to be read: ", pages)
 
-        f = open(cpts[i] + "/system.physmem.store0.pmem", "rb")
-        gf = gzip.GzipFile(fileobj=f, mode="rb")
+        merged_mem.add(cpts[i] + "/system.physmem.store0.pmem", pages << 12)
 
-        x = 0
-        while x < pages:
-            bytesRead = gf.read(1 << 12)
-            if not no_compress:
-                merged_mem.write(bytesRead)
-            else:
-                agg_mem_file.write(bytesRead)
-            x += 1
-
-        gf.close()
-        f.close()
+    merged_mem.write()
 
     merged_config.add_section("system")
-    merged_config.set("system", "pagePtr", page_ptr)
-    merged_config.set("system", "nextPID", len(cpts))
+    merged_config.set("system", "pagePtr", str(page_ptr))
+    merged_config.set("system", "nextPID", str(len(cpts)))
 
     file_size = page_ptr * 4 * 1024
-    dummy_data = "".zfill(4096)
-    while file_size < memory_size:
-        if not no_compress:
-            merged_mem.write(dummy_data)
-        else:
-            agg_mem_file.write(dummy_data)
-        file_size += 4 * 1024
-        page_ptr += 1
+    if memory_size is not None and file_size < memory_size:
+        pad_pages = -(-(memory_size - file_size) // (4 * 1024))
+        merged_mem.pad(pad_pages * 4 * 1024)
+        page_ptr += pad_pages
+    merged_mem.close()
 
     print("WARNING: ")
     print(
@@ -136,19 +211,16 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
     )
     print(page_ptr, "x 4K of memory")
     merged_config.set(
-        "system.physmem.store0", "range_size", page_ptr * 4 * 1024
+        "system.physmem.store0", "range_size", str(page_ptr * 4 * 1024)
     )
 
     merged_config.add_section("Globals")
-    merged_config.set("Globals", "curTick", max_curtick)
+    merged_config.set("Globals", "curTick", str(max_curtick))
 
     merged_config.write(agg_config_file)
 
-    if not no_compress:
-        merged_mem.close()
-        agg_mem_file.close()
-    else:
-        agg_mem_file.close()
+    agg_mem_file.close()
+    agg_config_file.close()
 
 
 if __name__ == "__main__":
@@ -164,6 +236,14 @@ if __name__ == "__main__":
     parser.add_argument("-c", "--no-compress", action="store_true")
     parser.add_argument("--cpts", nargs="+")
     parser.add_argument("--memory-size", action="store", type=int)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        action="store",
+        type=int,
+        help="Number of threads decompressing and compressing memory images "
+        "(default: number of CPUs)",
+    )
 
     # Assume x86 ISA.  Any other ISAs would need extra stuff in this script
     # to appropriately parse their page tables and understand page sizes.
@@ -180,4 +260,5 @@ if __name__ == "__main__":
         options.cpts,
         options.no_compress,
         options.memory_size,
+        options.jobs,
     )
@@ -70,10 +70,14 @@
 
 
 import configparser
+import functools
 import glob
+import multiprocessing
 import os
 import os.path as osp
+import shutil
 import sys
+import time
 import types
 
 verbose_print = False
@@ -87,11 +91,16 @@ def verboseprint(*args):
     print("\n")
 
 
+class UpgradeError(Exception):
+    pass
+
+
 class Upgrader:
     tag_set = set()
     untag_set = set()  # tags to remove by downgrading
     by_tag = {}
     legacy = {}
+    plans = {}  # migrations to apply, by tag set
 
     def __init__(self, filename):
         self.filename = filename
@@ -161,6 +170,45 @@ class Upgrader:
     def get(tag):
         return Upgrader.by_tag[tag]
 
+    @staticmethod
+    def plan(tags):
+        """
+        Returns the tags of the migrations to apply to a checkpoint with the
+        given tags, in an order respecting dependences. The dependences are
+        only resolved once for each set of tags.
+        """
+        tags = frozenset(tags)
+        if tags in Upgrader.plans:
+            return Upgrader.plans[tags]
+
+        # Apply migrations for tags not in checkpoint and tags present for
+        # which downgraders are present, respecting dependences
+        plan = []
+        current = set(tags)
+        to_apply = (Upgrader.tag_set - current) | (
+            Upgrader.untag_set & current
+        )
+        while to_apply:
+            ready = {t for t in to_apply if Upgrader.get(t).ready(current)}
+            if not ready:
+                raise UpgradeError(
+                    "could not apply these upgrades: {}\n"
+                    "update dependences impossible to resolve; "
+                    "aborting".format(" ".join(to_apply))
+                )
+
+            for tag in sorted(ready):
+                plan.append(tag)
+                if tag in Upgrader.tag_set:
+                    current.add(tag)
+                else:
+                    current.remove(tag)
+
+            to_apply -= ready
+
+        Upgrader.plans[tags] = plan
+        return plan
+
     @staticmethod
     def load_all():
         util_dir = osp.dirname(osp.abspath(__file__))
@@ -192,28 +240,67 @@ class Upgrader:
                     sys.exit(1)
 
 
-def process_file(path, **kwargs):
-    if not osp.isfile(path):
-        import errno
-
-        raise OSError(errno.ENOENT, "No such file", path)
-
-    verboseprint(f"Processing file {path}....")
-
-    if kwargs.get("backup", True):
-        import shutil
-
-        shutil.copyfile(path, path + ".bak")
-
+def read_version_tags(path):
+    """
+    Returns the version tags of a checkpoint file, only reading it up to the
+    tags, which follow the root section in checkpoints written by gem5.
+    Returns None if the checkpoint has a legacy version number or no
+    version information, i.e., if it must be fully parsed to be upgraded.
+    """
+    section = None
+    root_done = False
+    tags = None
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("[") and line.endswith("]"):
+                if section == "root":
+                    root_done = True
+                if root_done and tags is not None:
+                    break
+                section = line[1:-1]
+                continue
+
+            option, sep, value = line.partition("=")
+            if not sep:
+                continue
+            option = option.strip()
+            if section == "root" and option == "cpt_ver":
+                return None
+            # @todo The 'Globals' option is deprecated, and should be removed
+            # in the future
+            if option == "version_tags" and (
+                section == "Globals"
+                or (section == "root.globals" and tags is None)
+            ):
+                tags = set(value.split())
+    return tags
+
+
+def upgrade_file(path, backup=True, times=None):
+    """
+    Upgrades a checkpoint file, replacing it atomically. Returns whether it
+    was changed. The time taken by each migration, and to read and write the
+    file, is added to times if given.
+    """
+    if times is None:
+        times = {}
+
+    def timed(name, start):
+        end = time.perf_counter()
+        times[name] = times.get(name, 0.0) + end - start
+        return end
+
+    start = time.perf_counter()
     cpt = configparser.ConfigParser()
 
     # gem5 is case sensitive with paramaters
     cpt.optionxform = str
 
     # Read the current data
-    cpt_file = open(path)
-    cpt.read_file(cpt_file)
-    cpt_file.close()
+    with open(path) as cpt_file:
+        cpt.read_file(cpt_file)
+    start = timed("(read)", start)
 
     change = False
 
@@ -237,8 +324,7 @@ def process_file(path, **kwargs):
     elif cpt.has_option("root.globals", "version_tags"):
         tags = set(("".join(cpt.get("root.globals", "version_tags"))).split())
     else:
-        print("fatal: no version information in checkpoint")
-        exit(1)
+        raise UpgradeError("fatal: no version information in checkpoint")
 
     verboseprint("has tags", " ".join(tags))
     # If the current checkpoint has a tag we don't know about, we have
@@ -252,31 +338,128 @@ def process_file(path, **kwargs):
             " ".join(unknown_tags),
         )
 
-    # Apply migrations for tags not in checkpoint and tags present for which
-    # downgraders are present, respecting dependences
-    to_apply = (Upgrader.tag_set - tags) | (Upgrader.untag_set & tags)
-    while to_apply:
-        ready = {t for t in to_apply if Upgrader.get(t).ready(tags)}
-        if not ready:
-            print("could not apply these upgrades:", " ".join(to_apply))
-            print("update dependences impossible to resolve; aborting")
-            exit(1)
-
-        for tag in ready:
-            Upgrader.get(tag).update(cpt, tags)
-            change = True
-
-        to_apply -= ready
+    for tag in Upgrader.plan(tags):
+        Upgrader.get(tag).update(cpt, tags)
+        start = timed(tag, start)
+        change = True
 
     if not change:
         verboseprint("...nothing to do")
-        return
+        return False
 
     cpt.set("root.globals", "version_tags", " ".join(tags))
 
-    # Write the old data back
+    if backup:
+        shutil.copyfile(path, path + ".bak")
+
+    # Write the new data to a temporary file and move it into place, so
+    # the checkpoint is never left half written
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w") as cpt_file:
+        cpt.write(cpt_file)
+    shutil.copymode(path, tmp_path)
+    os.replace(tmp_path, path)
+    timed("(write)", start)
     verboseprint("...completed")
-    cpt.write(open(path, "w"))
+    return True
+
+
+def process_file(path, **kwargs):
+    if not osp.isfile(path):
+        import errno
+
+        raise OSError(errno.ENOENT, "No such file", path)
+
+    verboseprint(f"Processing file {path}....")
+
+    try:
+        upgrade_file(path, kwargs.get("backup", True))
+    except UpgradeError as e:
+        print(e)
+        exit(1)
+
+
+def _init_worker(verbose):
+    global verbose_print
+    verbose_print = verbose
+    if not Upgrader.by_tag:
+        Upgrader.load_all()
+
+
+def _process_checkpoint(path, backup):
+    """
+    Upgrades a checkpoint of a batch, unless its tags are already current.
+    Returns the path, the outcome and the time taken by each migration.
+    """
+    times = {}
+    verboseprint(f"Processing file {path}....")
+    try:
+        tags = read_version_tags(path)
+        if tags is not None and not Upgrader.plan(tags):
+            verboseprint("...already current")
+            return path, "current", times
+        if upgrade_file(path, backup, times):
+            return path, "upgraded", times
+        return path, "current", times
+    except UpgradeError as e:
+        return path, f"error: {e}", times
+    except Exception as e:
+        # Upgraders may raise anything on a checkpoint they do not expect
+        return path, f"error: {type(e).__name__}: {e}", times
+
+
+def process_dir(path, backup=True, jobs=None):
+    """
+    Upgrades every checkpoint found under a directory, in a pool of jobs
+    processes, and reports the time taken by each migration. Returns the
+    number of checkpoints which could not be upgraded.
+    """
+    paths = [
+        osp.join(root, "m5.cpt")
+        for root, dirs, files in os.walk(path)
+        if "m5.cpt" in files
+    ]
+    if jobs is None:
+        jobs = os.cpu_count()
+
+    counts = {"current": 0, "upgraded": 0}
+    errors = 0
+    times = {}
+    runs = {}
+    process = functools.partial(_process_checkpoint, backup=backup)
+    if jobs > 1 and len(paths) > 1:
+        pool = multiprocessing.Pool(
+            min(jobs, len(paths)), _init_worker, (verbose_print,)
+        )
+        results = pool.imap_unordered(process, paths, chunksize=8)
+    else:
+        pool = None
+        results = map(process, paths)
+
+    try:
+        for cpt_path, outcome, cpt_times in results:
+            if outcome in counts:
+                counts[outcome] += 1
+            else:
+                errors += 1
+                print(f"{cpt_path}: {outcome}")
+            for name, seconds in cpt_times.items():
+                times[name] = times.get(name, 0.0) + seconds
+                runs[name] = runs.get(name, 0) + 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    print(
+        f"{len(paths)} checkpoints: {counts['upgraded']} upgraded, "
+        f"{counts['current']} already current, {errors} failed"
+    )
+    if times:
+        print(f"{'migration':40} {'checkpoints':>11} {'total (s)':>10}")
+        for name in sorted(times, key=times.get, reverse=True):
+            print(f"{name:40} {runs[name]:11} {times[name]:10.3f}")
+    return errors
 
 
 if __name__ == "__main__":
@@ -301,6 +484,14 @@ if __name__ == "__main__":
         default=True,
         help="Do no backup each checkpoint before modifying it",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of checkpoints upgraded in parallel when recursing "
+        "(default: number of CPUs)",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -352,12 +543,8 @@ if __name__ == "__main__":
         cpt_file = osp.join(path, "m5.cpt")
         if args.recurse:
             # Visit very file and see if it matches
-            for root, dirs, files in os.walk(path):
-                for name in files:
-                    if name == "m5.cpt":
-                        process_file(osp.join(root, name), **vars(args))
-                for dir in dirs:
-                    pass
+            if process_dir(path, args.backup, args.jobs):
+                sys.exit(1)
         # Maybe someone passed a cpt.XXXXXXX directory and not m5.cpt
         elif osp.isfile(cpt_file):
             process_file(cpt_file, **vars(args))
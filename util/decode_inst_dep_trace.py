@@ -116,6 +116,104 @@ except:
         exit(-1)
 
 
+def write_ascii(proto_in, packet, enumNames, ascii_out):
+    """
+    Write the packets remaining in proto_in to ascii_out, one line per
+    packet and a batch of lines at a time. Return the number of packets and
+    of packets with at least one register and ROB dependency.
+    """
+    num_packets = 0
+    num_regdeps = 0
+    num_robdeps = 0
+    lines = []
+    for packet in protolib.decodeMessages(proto_in, packet):
+        num_packets += 1
+
+        # The seq num
+        line = [f"{packet.seq_num}"]
+        # The pc of the instruction, default is 0
+        if packet.HasField("pc"):
+            line.append(f",{packet.pc}")
+        else:
+            line.append(",0")
+        # The weight, default is 1
+        if packet.HasField("weight"):
+            line.append(f",{packet.weight}")
+        else:
+            line.append(",1")
+        # The type of the record
+        try:
+            line.append(f",{enumNames[packet.type]}")
+        except KeyError:
+            print(
+                "Seq. num", packet.seq_num, "has unsupported type", packet.type
+            )
+            exit(-1)
+
+        # The optional fields physical addr, size, flags if it has them
+        if packet.HasField("p_addr"):
+            line.append(f",{packet.p_addr}")
+        if packet.HasField("size"):
+            line.append(f",{packet.size}")
+        if packet.HasField("flags"):
+            line.append(f",{packet.flags}")
+
+        # The comp delay
+        line.append(f",{packet.comp_delay}")
+
+        # The repeated field order dependency
+        line.append(":")
+        if packet.rob_dep:
+            num_robdeps += 1
+            line.extend(f",{dep}" for dep in packet.rob_dep)
+        # The repeated field register dependency
+        line.append(":")
+        if packet.reg_dep:
+            num_regdeps += (
+                1  # No. of packets with atleast 1 register dependency
+            )
+            line.extend(f",{dep}" for dep in packet.reg_dep)
+        # New line
+        line.append("\n")
+        lines.append("".join(line))
+        if len(lines) == protolib.BATCH_SIZE:
+            ascii_out.writelines(lines)
+            lines = []
+    ascii_out.writelines(lines)
+    return num_packets, num_regdeps, num_robdeps
+
+
+def write_table(proto_in, packet, out_path):
+    """
+    Write the packets remaining in proto_in to out_path as a table with one
+    column per field. Return the same counts as write_ascii().
+    """
+    fields = (
+        "seq_num",
+        "type",
+        "pc",
+        "weight",
+        "p_addr",
+        "size",
+        "flags",
+        "comp_delay",
+        "rob_dep",
+        "reg_dep",
+    )
+    num_deps = {"reg_dep": 0, "rob_dep": 0}
+
+    def count_deps(arrays):
+        for array in arrays:
+            for name in num_deps:
+                num_deps[name] += sum(len(deps) > 0 for deps in array[name])
+            yield array
+
+    num_packets = protolib.writeTable(
+        count_deps(protolib.messageArrays(proto_in, packet, fields)), out_path
+    )
+    return num_packets, num_deps["reg_dep"], num_deps["rob_dep"]
+
+
 def main():
     if len(sys.argv) != 3:
         print("Usage: ", sys.argv[0], " <protobuf input> <ASCII output>")
@@ -124,11 +222,16 @@ def main():
     # Open the file on read mode
     proto_in = protolib.openFileRd(sys.argv[1])
 
-    try:
-        ascii_out = open(sys.argv[2], "w")
-    except OSError:
-        print("Failed to open ", sys.argv[2], " for writing")
-        exit(-1)
+    # Write a table with one column per field for .parquet or .npy outputs
+    out_path = sys.argv[2]
+    as_table = out_path.endswith((".parquet", ".npy"))
+    ascii_out = None
+    if not as_table:
+        try:
+            ascii_out = open(out_path, "w")
+        except OSError:
+            print("Failed to open ", out_path, " for writing")
+            exit(-1)
 
     # Read the magic number in 4-byte Little Endian
     magic_number = proto_in.read(4).decode()
@@ -155,71 +258,24 @@ def main():
         print("\t", valdesc.number, namestr)
         enumNames[valdesc.number] = namestr
 
-    num_packets = 0
-    num_regdeps = 0
-    num_robdeps = 0
     packet = inst_dep_record_pb2.InstDepRecord()
 
     # Decode the packet messages until we hit the end of the file
-    while protolib.decodeMessage(proto_in, packet):
-        num_packets += 1
-
-        # Write to file the seq num
-        ascii_out.write(f"{packet.seq_num}")
-        # Write to file the pc of the instruction, default is 0
-        if packet.HasField("pc"):
-            ascii_out.write(f",{packet.pc}")
-        else:
-            ascii_out.write(",0")
-        # Write to file the weight, default is 1
-        if packet.HasField("weight"):
-            ascii_out.write(f",{packet.weight}")
-        else:
-            ascii_out.write(",1")
-        # Write to file the type of the record
-        try:
-            ascii_out.write(f",{enumNames[packet.type]}")
-        except KeyError:
-            print(
-                "Seq. num", packet.seq_num, "has unsupported type", packet.type
-            )
-            exit(-1)
-
-        # Write to file if it has the optional fields physical addr, size,
-        # flags
-        if packet.HasField("p_addr"):
-            ascii_out.write(f",{packet.p_addr}")
-        if packet.HasField("size"):
-            ascii_out.write(f",{packet.size}")
-        if packet.HasField("flags"):
-            ascii_out.write(f",{packet.flags}")
-
-        # Write to file the comp delay
-        ascii_out.write(f",{packet.comp_delay}")
-
-        # Write to file the repeated field order dependency
-        ascii_out.write(":")
-        if packet.rob_dep:
-            num_robdeps += 1
-            for dep in packet.rob_dep:
-                ascii_out.write(f",{dep}")
-        # Write to file the repeated field register dependency
-        ascii_out.write(":")
-        if packet.reg_dep:
-            num_regdeps += (
-                1  # No. of packets with atleast 1 register dependency
-            )
-            for dep in packet.reg_dep:
-                ascii_out.write(f",{dep}")
-        # New line
-        ascii_out.write("\n")
+    if as_table:
+        num_packets, num_regdeps, num_robdeps = write_table(
+            proto_in, packet, out_path
+        )
+    else:
+        num_packets, num_regdeps, num_robdeps = write_ascii(
+            proto_in, packet, enumNames, ascii_out
+        )
+        ascii_out.close()
 
     print("Parsed packets:", num_packets)
     print("Packets with at least 1 reg dep:", num_regdeps)
     print("Packets with at least 1 rob dep:", num_robdeps)
 
     # We're done
-    ascii_out.close()
     proto_in.close()
 
 
@@ -125,7 +125,8 @@ def main():
         "size",
         "mem_flags",
     )
-    while protolib.decodeMessage(proto_in, inst):
+    lines = []
+    for inst in protolib.decodeMessages(proto_in, inst):
         # If we have a tick use it, otherwise count instructions
         if inst.HasField("tick"):
             tick = inst.tick
@@ -141,26 +142,31 @@ def main():
         else:
             cpu_id = 0
 
-        ascii_out.write(
-            "%-20d: (%03d/%03d) %#010x @ %#016x "
-            % (tick, node_id, cpu_id, inst.inst, inst.pc)
+        line = "%-20d: (%03d/%03d) %#010x @ %#016x " % (
+            tick,
+            node_id,
+            cpu_id,
+            inst.inst,
+            inst.pc,
         )
 
         if inst.HasField("type"):
-            ascii_out.write(
+            line += (
                 " : %10s"
                 % inst_pb2._INST_INSTTYPE.values_by_number[inst.type].name
             )
 
         for mem_acc in inst.mem_access:
-            ascii_out.write(
-                " {:#x}-{:#x};".format(
-                    mem_acc.addr, mem_acc.addr + mem_acc.size
-                )
+            line += " {:#x}-{:#x};".format(
+                mem_acc.addr, mem_acc.addr + mem_acc.size
             )
 
-        ascii_out.write("\n")
+        lines.append(line + "\n")
+        if len(lines) == protolib.BATCH_SIZE:
+            ascii_out.writelines(lines)
+            lines = []
         num_insts += 1
+    ascii_out.writelines(lines)
 
     print("Parsed instructions:", num_insts)
 
@@ -36,7 +36,8 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 # This script is used to dump protobuf packet traces to ASCII
-# format.
+# format. If the output ends in .parquet or .npy, the packets are
+# written as a table with one column per field instead.
 
 import os
 import subprocess
@@ -58,11 +59,15 @@ def main():
     # Open the file in read mode
     proto_in = protolib.openFileRd(sys.argv[1])
 
-    try:
-        ascii_out = open(sys.argv[2], "w")
-    except OSError:
-        print("Failed to open ", sys.argv[2], " for writing")
-        exit(-1)
+    out_path = sys.argv[2]
+    as_table = out_path.endswith((".parquet", ".npy"))
+    ascii_out = None
+    if not as_table:
+        try:
+            ascii_out = open(out_path, "w")
+        except OSError:
+            print("Failed to open ", out_path, " for writing")
+            exit(-1)
 
     # Read the magic number in 4-byte Little Endian
     magic_number = proto_in.read(4).decode()
@@ -88,28 +93,36 @@ def main():
     num_packets = 0
     packet = packet_pb2.Packet()
 
-    # Decode the packet messages until we hit the end of the file
-    while protolib.decodeMessage(proto_in, packet):
-        num_packets += 1
-        # ReadReq is 1 and WriteReq is 4 in src/mem/packet.hh Command enum
-        cmd = "r" if packet.cmd == 1 else ("w" if packet.cmd == 4 else "u")
-        if packet.HasField("pkt_id"):
-            ascii_out.write(f"{packet.pkt_id},")
-        if packet.HasField("flags"):
-            ascii_out.write(
-                f"{cmd},{packet.addr},{packet.size},{packet.flags},{packet.tick}"
-            )
-        else:
-            ascii_out.write(f"{cmd},{packet.addr},{packet.size},{packet.tick}")
-        if packet.HasField("pc"):
-            ascii_out.write(f",{packet.pc}\n")
-        else:
-            ascii_out.write("\n")
+    if as_table:
+        fields = ("tick", "cmd", "addr", "size", "flags", "pkt_id", "pc")
+        num_packets = protolib.writeTable(
+            protolib.messageArrays(proto_in, packet, fields), out_path
+        )
+    else:
+        # Decode the packet messages until we hit the end of the file. Lines
+        # are written out a batch at a time.
+        lines = []
+        for packet in protolib.decodeMessages(proto_in, packet):
+            num_packets += 1
+            # ReadReq is 1 and WriteReq is 4 in src/mem/packet.hh Command enum
+            cmd = "r" if packet.cmd == 1 else ("w" if packet.cmd == 4 else "u")
+            line = f"{packet.pkt_id}," if packet.HasField("pkt_id") else ""
+            if packet.HasField("flags"):
+                line += f"{cmd},{packet.addr},{packet.size},{packet.flags},{packet.tick}"
+            else:
+                line += f"{cmd},{packet.addr},{packet.size},{packet.tick}"
+            if packet.HasField("pc"):
+                line += f",{packet.pc}"
+            lines.append(line + "\n")
+            if len(lines) == protolib.BATCH_SIZE:
+                ascii_out.writelines(lines)
+                lines = []
+        ascii_out.writelines(lines)
+        ascii_out.close()
 
     print("Parsed packets:", num_packets)
 
     # We're done
-    ascii_out.close()
     proto_in.close()
 
 
@@ -35,20 +35,25 @@ Some common queries can be found in common_queries.py
 """
 
 import copy
+import fcntl
 import json
 import os
+import re
 import shutil
 from abc import (
     ABC,
     abstractmethod,
 )
+from contextlib import contextmanager
 from pathlib import Path
 from typing import (
     Any,
+    Callable,
     Dict,
     Iterable,
+    Iterator,
     List,
-    Tuple,
+    Optional,
     Type,
     Union,
 )
@@ -226,10 +231,18 @@ class ArtifactMongoDB(ArtifactDB):
 class ArtifactFileDB(ArtifactDB):
     """
     This is a file-based database where Artifacts (as defined in artifacts.py)
-    are stored in a JSON file.
+    are stored in a JSON lines file.
 
-    This database stores a list of serialized artifacts in a JSON file.
-    This database is not thread-safe.
+    Artifacts are appended to the file, one serialized artifact per line,
+    while holding an exclusive lock on "<file>.lock". This makes inserts
+    cheap and lets several processes add artifacts to the same database.
+    Each connection indexes the artifacts by UUID, hash, name and type in
+    memory and reads the lines appended by other processes before every
+    lookup. The file is compacted, i.e. rewritten without duplicate or
+    truncated lines, once enough of those have accumulated.
+
+    Files written by earlier versions, which hold a single JSON list of
+    artifacts, are read as is and converted on the first insert.
 
     If the user specifies a valid path in the environment variable
     GEM5ART_STORAGE then this database will copy all artifacts to that
@@ -242,15 +255,25 @@ class ArtifactFileDB(ArtifactDB):
                 return str(obj)
             return ArtifactFileDB.ArtifactEncoder(self, obj)
 
+    # Number of unused lines in the file above which it gets compacted.
+    compact_threshold = 1000
+
     _json_file: Path
+    _lock_file: Path
     _uuid_artifact_map: Dict[str, Dict[str, str]]
     _hash_uuid_map: Dict[str, List[str]]
+    _name_uuid_map: Dict[str, List[str]]
+    _type_uuid_map: Dict[str, List[str]]
+    _offset: int
+    _inode: Optional[int]
+    _legacy: bool
+    _garbage: int
     _storage_enabled: bool
     _storage_path: Path
 
     def __init__(self, uri: str) -> None:
-        """Initialize the file-driven database from a JSON file.
-        If the file doesn't exist, a new file will be created.
+        """Initialize the file-driven database from a JSON lines file.
+        If the file doesn't exist, it will be created on the first insert.
         """
         parsed_uri = urlparse(uri)
         # using urlparse to parse relative/absolute file path
@@ -260,6 +283,9 @@ class ArtifactFileDB(ArtifactDB):
         #           (netloc='path', path='/to/file')
         # so, the filepath would be netloc+path for both cases
         self._json_file = Path(parsed_uri.netloc) / Path(parsed_uri.path)
+        self._lock_file = self._json_file.with_name(
+            self._json_file.name + ".lock"
+        )
         storage_path = os.environ.get("GEM5ART_STORAGE", "")
         self._storage_enabled = True if storage_path else False
         self._storage_path = Path(storage_path)
@@ -274,9 +300,8 @@ class ArtifactFileDB(ArtifactDB):
         if self._storage_enabled:
             os.makedirs(self._storage_path, exist_ok=True)
 
-        self._uuid_artifact_map, self._hash_uuid_map = self._load_from_file(
-            self._json_file
-        )
+        self._reset()
+        self._refresh()
 
     def put(self, key: UUID, artifact: Dict[str, Union[str, UUID]]) -> None:
         """Insert the artifact into the database with the key."""
@@ -320,41 +345,133 @@ class ArtifactFileDB(ArtifactDB):
         dst_path = path
         shutil.copy2(src_path, dst_path)
 
-    def _load_from_file(
-        self, json_file: Path
-    ) -> Tuple[Dict[str, Dict[str, str]], Dict[str, List[str]]]:
-        uuid_mapping: Dict[str, Dict[str, str]] = {}
-        hash_mapping: Dict[str, List[str]] = {}
-        if json_file.exists():
-            with open(json_file) as f:
-                j = json.load(f)
-                for an_artifact in j:
-                    the_uuid = an_artifact["_id"]
-                    the_hash = an_artifact["hash"]
-                    uuid_mapping[the_uuid] = an_artifact
-                    if not the_hash in hash_mapping:
-                        hash_mapping[the_hash] = []
-                    hash_mapping[the_hash].append(the_uuid)
-        return uuid_mapping, hash_mapping
-
-    def _save_to_file(self, json_file: Path) -> None:
-        content = list(self._uuid_artifact_map.values())
-        with open(json_file, "w") as f:
-            json.dump(content, f, indent=4, cls=ArtifactFileDB.ArtifactEncoder)
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Holds the lock serializing the writers of the file."""
+        with open(self._lock_file, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _reset(self) -> None:
+        self._uuid_artifact_map = {}
+        self._hash_uuid_map = {}
+        self._name_uuid_map = {}
+        self._type_uuid_map = {}
+        self._offset = 0
+        self._inode = None
+        self._legacy = False
+        self._garbage = 0
+
+    def _index(self, artifact: Dict[str, str]) -> bool:
+        """Adds an artifact read from the file to the indexes. Returns False
+        if an artifact with the same UUID was already indexed."""
+        uuid_str = str(artifact["_id"])
+        if uuid_str in self._uuid_artifact_map:
+            return False
+        self._uuid_artifact_map[uuid_str] = artifact
+        for mapping, attr in (
+            (self._hash_uuid_map, "hash"),
+            (self._name_uuid_map, "name"),
+            (self._type_uuid_map, "type"),
+        ):
+            mapping.setdefault(artifact.get(attr, ""), []).append(uuid_str)
+        return True
+
+    def _refresh(self) -> None:
+        """Indexes the artifacts added to the file since the last call. The
+        file is read again from the start if it was replaced, e.g. by a
+        compaction in another process."""
+        try:
+            f = open(self._json_file, "rb")
+        except FileNotFoundError:
+            if self._inode is not None:
+                self._reset()
+            return
+
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                self._reset()
+                self._inode = st.st_ino
+            if st.st_size == self._offset:
+                return
+
+            if self._offset == 0 and f.read(1) == b"[":
+                f.seek(0)
+                for an_artifact in json.load(f):
+                    self._index(an_artifact)
+                self._legacy = True
+                self._offset = st.st_size
+                return
+
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+
+        # A line without its newline is still being written
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                an_artifact = json.loads(line)
+            except ValueError:
+                # Left behind by a writer which did not finish its line
+                self._garbage += 1
+                continue
+            if not self._index(an_artifact):
+                self._garbage += 1
+        self._offset += end
+
+    @staticmethod
+    def _dumps(artifact: Dict[str, Any]) -> str:
+        return json.dumps(artifact, cls=ArtifactFileDB.ArtifactEncoder) + "\n"
+
+    def _append(self, artifact: Dict[str, Any]) -> None:
+        """Appends an artifact to the file. The caller must hold the lock
+        and have read the file up to its end."""
+        with open(self._json_file, "a") as f:
+            if f.tell() > self._offset:
+                # Terminate the partial line of a writer that died
+                f.write("\n")
+            f.write(self._dumps(artifact))
+
+    def _compact(self) -> None:
+        """Rewrites the file with one line per artifact. The caller must
+        hold the lock."""
+        tmp_file = self._json_file.with_name(
+            f"{self._json_file.name}.tmp-{os.getpid()}"
+        )
+        with open(tmp_file, "w") as f:
+            for an_artifact in self._uuid_artifact_map.values():
+                f.write(self._dumps(an_artifact))
+        os.replace(tmp_file, self._json_file)
+        self._reset()
+        self._refresh()
+
+    def compact(self) -> None:
+        """Rewrites the file without duplicate or truncated lines."""
+        with self._locked():
+            self._refresh()
+            self._compact()
 
     def has_uuid(self, the_uuid: UUID) -> bool:
+        self._refresh()
         return str(the_uuid) in self._uuid_artifact_map
 
     def has_hash(self, the_hash: str) -> bool:
+        self._refresh()
         return the_hash in self._hash_uuid_map
 
     def get_artifact_by_uuid(self, the_uuid: UUID) -> Iterable[Dict[str, str]]:
+        self._refresh()
         uuid_str = str(the_uuid)
         if not uuid_str in self._uuid_artifact_map:
             return
         yield self._uuid_artifact_map[uuid_str]
 
     def get_artifact_by_hash(self, the_hash: str) -> Iterable[Dict[str, str]]:
+        self._refresh()
         if not the_hash in self._hash_uuid_map:
             return
         for the_uuid in self._hash_uuid_map[the_hash]:
@@ -373,17 +490,74 @@ class ArtifactFileDB(ArtifactDB):
         to calling this function; return False otherwise.
         """
         uuid_str = str(the_uuid)
-        if uuid_str in self._uuid_artifact_map:
-            return False
         artifact_copy = copy.deepcopy(the_artifact)
         artifact_copy["_id"] = str(artifact_copy["_id"])
-        self._uuid_artifact_map[uuid_str] = artifact_copy  # type: ignore
-        if not the_hash in self._hash_uuid_map:
-            self._hash_uuid_map[the_hash] = []
-        self._hash_uuid_map[the_hash].append(uuid_str)
-        self._save_to_file(self._json_file)
+        with self._locked():
+            self._refresh()
+            if uuid_str in self._uuid_artifact_map:
+                return False
+            if self._legacy or self._garbage > self.compact_threshold:
+                self._compact()
+            self._append(artifact_copy)
+            self._refresh()
         return True
 
+    def _search(
+        self,
+        uuids: Iterable[str],
+        limit: int,
+        match: Callable[[Dict[str, Any]], bool] = lambda artifact: True,
+    ) -> Iterable[Dict[str, Any]]:
+        """Yields the artifacts of the given UUIDs that match, at most limit
+        of them unless limit is 0."""
+        count = 0
+        for the_uuid in uuids:
+            an_artifact = self._uuid_artifact_map[the_uuid]
+            if not match(an_artifact):
+                continue
+            yield an_artifact
+            count += 1
+            if count == limit:
+                return
+
+    def searchByName(self, name: str, limit: int) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some name."""
+        self._refresh()
+        yield from self._search(self._name_uuid_map.get(name, []), limit)
+
+    def searchByType(self, typ: str, limit: int) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some type."""
+        self._refresh()
+        yield from self._search(self._type_uuid_map.get(typ, []), limit)
+
+    def searchByNameType(
+        self, name: str, typ: str, limit: int
+    ) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some name and type."""
+        self._refresh()
+        yield from self._search(
+            self._name_uuid_map.get(name, []),
+            limit,
+            lambda artifact: artifact.get("type") == typ,
+        )
+
+    def searchByLikeNameType(
+        self, name: str, typ: str, limit: int
+    ) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some type and a regex name."""
+        self._refresh()
+        regex = re.compile(name)
+        yield from self._search(
+            self._type_uuid_map.get(typ, []),
+            limit,
+            lambda artifact: regex.search(artifact.get("name", ""))
+            is not None,
+        )
+
     def find_exact(
         self, attr: Dict[str, str], limit: int
     ) -> Iterable[Dict[str, Any]]:
@@ -392,13 +566,22 @@ class ArtifactFileDB(ArtifactDB):
         and for every (k,v) in attr, the attribute `k` of the artifact has
         the value of `v`.
         """
-        count = 0
-        if count >= limit:
-            return
-        for artifact in self._uuid_artifact_map.values():
-            # https://docs.python.org/3/library/stdtypes.html#frozenset.issubset
-            if attr.items() <= artifact.items():
-                yield artifact
+        self._refresh()
+        uuids: Iterable[str] = self._uuid_artifact_map.keys()
+        for mapping, key in (
+            (self._hash_uuid_map, "hash"),
+            (self._name_uuid_map, "name"),
+            (self._type_uuid_map, "type"),
+        ):
+            if key in attr:
+                uuids = mapping.get(attr[key], [])
+                break
+        # https://docs.python.org/3/library/stdtypes.html#frozenset.issubset
+        yield from self._search(
+            list(uuids),
+            limit,
+            lambda artifact: attr.items() <= artifact.items(),
+        )
 
 
 _db = None
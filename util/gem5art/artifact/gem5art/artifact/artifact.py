@@ -29,6 +29,7 @@
 
 import hashlib
 import json
+import os
 import subprocess
 import time
 from inspect import cleandoc
@@ -38,6 +39,7 @@ from typing import (
     Dict,
     List,
     Optional,
+    Tuple,
     Union,
 )
 from uuid import (
@@ -47,11 +49,32 @@ from uuid import (
 
 from ._artifactdb import getDBConnection
 
+# md5 hashes of files, keyed by _fileKey()
+_known_hashes: Dict[Tuple[str, int, int, int], str] = {}
+
+
+def _fileKey(path: Path) -> Tuple[str, int, int, int]:
+    st = os.stat(path)
+    return (str(Path(path).resolve()), st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def rememberHash(path: Path, md5sum: str) -> None:
+    """
+    Records the md5 hash of a file computed while writing it, so that
+    getHash() does not have to read the file again as long as it is not
+    modified.
+    """
+    _known_hashes[_fileKey(path)] = md5sum
+
 
 def getHash(path: Path) -> str:
     """
     Returns an md5 hash for the file in self.path.
     """
+    key = _fileKey(path)
+    if key in _known_hashes:
+        return _known_hashes[key]
+
     BUF_SIZE = 65536
     md5 = hashlib.md5()
     with open(path, "rb") as f:
@@ -61,7 +84,8 @@ def getHash(path: Path) -> str:
                 break
             md5.update(data)
 
-    return md5.hexdigest()
+    _known_hashes[key] = md5.hexdigest()
+    return _known_hashes[key]
 
 
 def getGit(path: Path) -> Dict[str, str]:
@@ -26,7 +26,6 @@
 
 """Tests for ArtifactFileDB"""
 
-
 import json
 import os
 import unittest
@@ -34,7 +33,10 @@ from pathlib import Path
 from uuid import UUID
 
 from gem5art.artifact import Artifact
-from gem5art.artifact._artifactdb import getDBConnection
+from gem5art.artifact._artifactdb import (
+    ArtifactFileDB,
+    getDBConnection,
+)
 
 
 class TestArtifactFileDB(unittest.TestCase):
@@ -57,14 +59,72 @@ class TestArtifactFileDB(unittest.TestCase):
     def tearDown(self):
         os.remove("test-file.txt")
         os.remove("test.json")
+        os.remove("test.json.lock")
 
     def test_init_function(self):
         self.assertTrue(Path("test.json").exists())
 
     def test_json_content(self):
         with open("test.json") as f:
-            artifacts = json.load(f)
+            artifacts = [json.loads(line) for line in f]
         self.assertTrue(len(artifacts) == 1)
         artifact = artifacts[0]
         self.assertTrue(artifact["hash"] == self.artifact.hash)
         self.assertTrue(UUID(artifact["_id"]) == self.artifact._id)
+
+    def test_search(self):
+        db = ArtifactFileDB("file://test.json")
+        self.assertEqual(
+            [self.artifact.hash],
+            [a["hash"] for a in db.searchByName("test-artifact", limit=0)],
+        )
+        self.assertEqual(1, len(list(db.searchByType("text", limit=1))))
+        self.assertEqual(
+            1, len(list(db.searchByNameType("test-artifact", "text", 0)))
+        )
+        self.assertEqual(
+            0, len(list(db.searchByNameType("test-artifact", "binary", 0)))
+        )
+        self.assertEqual(
+            1, len(list(db.searchByLikeNameType("^test-", "text", 0)))
+        )
+        self.assertEqual(0, len(list(db.searchByName("other", limit=0))))
+
+    def test_concurrent_connections(self):
+        other = ArtifactFileDB("file://test.json")
+        self.assertTrue(self.artifact._id in other)
+
+        artifact = dict(other.get(self.artifact._id))
+        artifact["_id"] = "00000000-0000-0000-0000-000000000001"
+        artifact["hash"] = "another-hash"
+        self.assertTrue(
+            other.insert_artifact(
+                UUID(artifact["_id"]), artifact["hash"], artifact
+            )
+        )
+        # A duplicate written by a racing connection is ignored
+        with open("test.json", "a") as f:
+            f.write(json.dumps(artifact) + "\n")
+
+        db = getDBConnection()
+        self.assertTrue("another-hash" in db)
+        self.assertEqual(2, len(list(db.searchByName("test-artifact", 0))))
+
+        db.compact()
+        with open("test.json") as f:
+            self.assertEqual(2, len(f.readlines()))
+
+    def test_legacy_file(self):
+        with open("test.json") as f:
+            artifact = json.loads(f.readline())
+        with open("test.json", "w") as f:
+            json.dump([artifact], f, indent=4)
+
+        db = ArtifactFileDB("file://test.json")
+        self.assertTrue(self.artifact.hash in db)
+
+        artifact["_id"] = "00000000-0000-0000-0000-000000000001"
+        db.insert_artifact(UUID(artifact["_id"]), artifact["hash"], artifact)
+        with open("test.json") as f:
+            artifacts = [json.loads(line) for line in f]
+        self.assertEqual(2, len(artifacts))
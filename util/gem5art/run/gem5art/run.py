@@ -32,17 +32,28 @@ This class works closely with the artifact module to ensure that the gem5
 experiment is reproducible and the output is saved to the database.
 """
 
+import collections
+import concurrent.futures
+import fnmatch
 import hashlib
+import heapq
+import itertools
 import json
 import os
+import shutil
 import signal
 import subprocess
+import sys
+import threading
 import time
+import traceback
 import zipfile
+import zlib
 from pathlib import Path
 from typing import (
     Any,
     Callable,
+    Deque,
     Dict,
     Iterable,
     List,
@@ -58,6 +69,477 @@ from uuid import (
 from gem5art import artifact
 from gem5art.artifact import Artifact
 from gem5art.artifact._artifactdb import ArtifactDB
+from gem5art.artifact.artifact import rememberHash
+
+
+class TerminalTail:
+    """
+    Follows the terminal output of a run by reading only what was appended
+    since the last call, instead of re-reading the end of the file.
+    """
+
+    # Maximum number of bytes read at once, from the end of the output
+    max_read = 64 * 1024
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.offset = 0
+        # Last line read so far, as gem5Run.checkKernelPanic sees it
+        self.last_line = b""
+        # Output after the last newline, continued by the next read
+        self.partial = b""
+
+    def update(self) -> bool:
+        """Reads the new output. Returns true if there was any."""
+        try:
+            size = os.stat(self.path).st_size
+        except FileNotFoundError:
+            return False
+        if size == self.offset:
+            return False
+        if size < self.offset:
+            # The file was truncated, start over
+            self.offset = 0
+            self.partial = b""
+        if size - self.offset > self.max_read:
+            # Only the last line matters
+            self.offset = size - self.max_read
+            self.partial = b""
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()[-self.max_read :]
+        self.last_line = self.partial or lines[-1]
+        return True
+
+    def hasKernelPanic(self) -> bool:
+        """Returns true if the last line of the terminal output is a kernel
+        panic, like gem5Run.checkKernelPanic."""
+        try:
+            return "Kernel panic" in self.last_line.decode()
+        except UnicodeDecodeError:
+            return False
+
+
+class RunWatch:
+    """The state the RunMonitor keeps about one running gem5 process."""
+
+    def __init__(self, run: "gem5Run", proc: subprocess.Popen) -> None:
+        self.run = run
+        self.proc = proc
+        self.terminal = TerminalTail(run.outdir / "system.pc.com_1.device")
+        self.done = False
+        # Serializes the updates of the run's status by the monitor thread,
+        # the signal handler and the thread running the process.
+        self.lock = threading.RLock()
+
+    def kill(self, reason: str) -> None:
+        """Kills the process, if still running, and records why."""
+        with self.lock:
+            if self.done or self.proc.poll() is not None:
+                return
+            self.proc.kill()
+            self.run.kill_reason = reason
+            self.run.current_time = time.time()
+            self.run.dumpJson("info.json")
+
+    def check(self) -> None:
+        """Kills the process if it hit a kernel panic or the user defined
+        failure function says so."""
+        if self.terminal.update() and self.terminal.hasKernelPanic():
+            self.kill("kernel panic")
+            return
+        # Assigning a function/lambda to an object variable does not make
+        # the function/lambda become a bound one. Therefore, the
+        # user-defined function must pass `self` in.
+        # Here, mypy classifies self.check_failure() as a bound function,
+        # so we tell mypy to ignore it.
+        if self.run.check_failure(self.run):  # type: ignore
+            self.kill("User defined kill")
+
+
+class RunMonitor:
+    """
+    Watches all the gem5 processes started by the runs of this process from
+    a single thread.
+
+    The thread sleeps until the next event in a heap of timers: either a
+    run's timeout or its next check, every `check_interval` seconds, of the
+    terminal output and the user defined failure function. The threads
+    running the processes just wait for them to exit, so a run is noticed
+    to be done as soon as its process is, and the status in info.json is
+    only written when it changes.
+    """
+
+    check_interval = 5.0
+
+    def __init__(self) -> None:
+        self._timers: List[Tuple[float, int, str, RunWatch]] = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def _schedule(self, when: float, event: str, watch: RunWatch) -> None:
+        heapq.heappush(self._timers, (when, next(self._counter), event, watch))
+
+    def watch(self, run: "gem5Run", proc: subprocess.Popen) -> RunWatch:
+        """Starts watching the process running `run`."""
+        watch = RunWatch(run, proc)
+        with self._cond:
+            self._schedule(run.start_time + run.timeout, "timeout", watch)
+            self._schedule(time.time() + self.check_interval, "check", watch)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="gem5art-run-monitor", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return watch
+
+    def unwatch(self, watch: RunWatch) -> None:
+        """Stops watching a process that exited. Its timers are dropped the
+        next time they are due."""
+        with watch.lock:
+            watch.done = True
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._timers or self._timers[0][0] > time.time():
+                    timeout = (
+                        self._timers[0][0] - time.time()
+                        if self._timers
+                        else None
+                    )
+                    self._cond.wait(timeout)
+                _, _, event, watch = heapq.heappop(self._timers)
+                if watch.done:
+                    continue
+                if event == "check":
+                    self._schedule(
+                        time.time() + self.check_interval, "check", watch
+                    )
+
+            try:
+                if event == "timeout":
+                    watch.kill("timeout")
+                else:
+                    watch.check()
+            except Exception:
+                # Keep watching the other runs
+                traceback.print_exc()
+
+
+_monitor = RunMonitor()
+
+
+class _HashingWriter:
+    """
+    A write-only, non-seekable file object computing the md5 hash of what is
+    written through it. Not being seekable makes zipfile write each entry in
+    one go, so the hash is the hash of the final file.
+    """
+
+    def __init__(self, f: Any) -> None:
+        self.f = f
+        self.md5 = hashlib.md5()
+        self.offset = 0
+
+    def write(self, data: bytes) -> int:
+        self.md5.update(data)
+        self.offset += len(data)
+        return self.f.write(data)
+
+    def tell(self) -> int:
+        return self.offset
+
+    def flush(self) -> None:
+        self.f.flush()
+
+
+class _ChunkDeflater:
+    """
+    Stands in for the compressor of a zipfile entry, returning for each
+    chunk written to the entry its deflated form, computed beforehand in a
+    thread pool.
+    """
+
+    def __init__(self, level: int) -> None:
+        self.level = level
+        self.next = b""
+        self.written = False
+
+    def compress(self, data: bytes) -> bytes:
+        self.written = True
+        out, self.next = self.next, b""
+        return out
+
+    def flush(self) -> bytes:
+        if self.written:
+            return b""
+        # An empty file still needs a final deflate block
+        return zlib.compressobj(self.level, zlib.DEFLATED, -15).flush()
+
+
+# _writeChunked() swaps the compressor of a zipfile entry being written, a
+# private attribute of the entries returned by ZipFile.open(mode="w") in the
+# CPython versions below. Elsewhere large files are deflated serially.
+_SWAP_COMPRESSOR = sys.implementation.name == "cpython" and (
+    (3, 6) <= sys.version_info[:2] <= (3, 13)
+)
+
+
+def _deflateChunk(data: bytes, zdict: bytes, last: bool, level: int) -> bytes:
+    """Deflates a chunk of a file independently of the others, pigz-style:
+    the chunk is primed with the end of the previous one and all but the last
+    chunk end on a byte boundary without the final block flag, so that the
+    deflated chunks concatenate into a single deflate stream."""
+    if zdict:
+        compressor = zlib.compressobj(
+            level,
+            zlib.DEFLATED,
+            -15,
+            zlib.DEF_MEM_LEVEL,
+            zlib.Z_DEFAULT_STRATEGY,
+            zdict,
+        )
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(
+        zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH
+    )
+
+
+class ResultsPackager:
+    """
+    Zips the output directory of a run in a single pass.
+
+    The md5 hash of the zip file is computed while it is written, so that
+    registering it as an artifact does not read it again. Files that are
+    already compressed (gzipped memory images of checkpoints, archives, ...)
+    are stored as is, and large files are deflated in parallel chunks.
+
+    include and exclude are lists of fnmatch patterns matched against the
+    paths relative to the output directory. A file is packaged if it matches
+    an include pattern and no exclude pattern.
+    """
+
+    # File suffixes and first bytes of already compressed files
+    compressed_suffixes = {
+        ".gz",
+        ".tgz",
+        ".bz2",
+        ".xz",
+        ".zst",
+        ".lz4",
+        ".zip",
+        ".7z",
+        ".png",
+        ".jpg",
+    }
+    compressed_magics = (
+        b"\x1f\x8b",  # gzip
+        b"\x28\xb5\x2f\xfd",  # zstd
+        b"\xfd7zXZ\x00",  # xz
+        b"BZh",  # bzip2
+        b"PK\x03\x04",  # zip
+        b"\x04\x22\x4d\x18",  # lz4
+    )
+    # Files larger than this are deflated in parallel chunks of this size
+    chunk_size = 4 * 1024 * 1024
+
+    def __init__(
+        self,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        jobs: Optional[int] = None,
+        level: int = zlib.Z_DEFAULT_COMPRESSION,
+    ) -> None:
+        self.include = include if include is not None else ["*"]
+        self.exclude = exclude if exclude is not None else []
+        self.jobs = jobs or os.cpu_count() or 1
+        self.level = level
+
+    def selected(self, outdir: Path, zip_path: Path) -> List[Path]:
+        """Returns the files and directories of outdir to package."""
+        paths = []
+        for path in sorted(outdir.glob("**/*")):
+            if path.name == zip_path.name:
+                continue
+            rel = path.relative_to(outdir).as_posix()
+            if not any(fnmatch.fnmatch(rel, p) for p in self.include):
+                continue
+            if any(fnmatch.fnmatch(rel, p) for p in self.exclude):
+                continue
+            paths.append(path)
+        return paths
+
+    def isCompressed(self, path: Path) -> bool:
+        if path.suffix.lower() in self.compressed_suffixes:
+            return True
+        with open(path, "rb") as f:
+            return f.read(8).startswith(self.compressed_magics)
+
+    def _writeChunked(
+        self,
+        zipf: zipfile.ZipFile,
+        path: Path,
+        arcname: str,
+        executor: concurrent.futures.Executor,
+    ) -> None:
+        zinfo = zipfile.ZipInfo.from_file(path, arcname)
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        deflater = _ChunkDeflater(self.level)
+        pending: collections.deque = collections.deque()
+
+        with open(path, "rb") as src, zipf.open(zinfo, "w") as dst:
+            if not hasattr(dst, "_compressor"):
+                shutil.copyfileobj(src, dst, self.chunk_size)
+                return
+            # zipfile computes the CRC and sizes of what is written and
+            # passes it to its compressor, which is replaced so that it
+            # returns the chunks deflated in the thread pool.
+            dst._compressor = deflater  # type: ignore
+
+            def writeOldest() -> None:
+                chunk, future = pending.popleft()
+                deflater.next = future.result()
+                dst.write(chunk)
+
+            chunk = src.read(self.chunk_size)
+            zdict = b""
+            while chunk:
+                next_chunk = src.read(self.chunk_size)
+                pending.append(
+                    (
+                        chunk,
+                        executor.submit(
+                            _deflateChunk,
+                            chunk,
+                            zdict,
+                            not next_chunk,
+                            self.level,
+                        ),
+                    )
+                )
+                zdict = chunk[-32768:]
+                chunk = next_chunk
+                if len(pending) >= 2 * self.jobs:
+                    writeOldest()
+            while pending:
+                writeOldest()
+
+    def package(self, outdir: Path, zip_path: Path) -> str:
+        """
+        Zips outdir into zip_path, with the same paths relative to the parent
+        of outdir as `zip -r`. Returns the md5 hash of the zip file.
+        """
+        paths = self.selected(outdir, zip_path)
+        with open(zip_path, "wb") as f:
+            writer = _HashingWriter(f)
+            with concurrent.futures.ThreadPoolExecutor(
+                self.jobs
+            ) as executor, zipfile.ZipFile(
+                writer, "w", zipfile.ZIP_DEFLATED, compresslevel=self.level
+            ) as zipf:
+                for path in paths:
+                    arcname = str(path.relative_to(outdir.parent))
+                    if path.is_dir():
+                        zipf.write(path, arcname)
+                    elif self.isCompressed(path):
+                        zipf.write(path, arcname, zipfile.ZIP_STORED)
+                    elif (
+                        _SWAP_COMPRESSOR
+                        and path.stat().st_size > self.chunk_size
+                    ):
+                        self._writeChunked(zipf, path, arcname, executor)
+                    else:
+                        zipf.write(path, arcname)
+
+        md5sum = writer.md5.hexdigest()
+        rememberHash(zip_path, md5sum)
+        return md5sum
+
+
+class ResultsQueue:
+    """
+    Packages and stores the results of the runs of this process one at a
+    time in a background thread, so that the caller can start its next run
+    as soon as the gem5 process of the previous one exits.
+
+    The thread is not a daemon and only lives while there is work queued, so
+    the interpreter, or a multiprocessing worker, exits once every queued
+    result is stored.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: Deque[
+            Tuple[Callable[[], None], concurrent.futures.Future]
+        ] = collections.deque()
+        self._futures: List[concurrent.futures.Future] = []
+        self._thread: Optional[threading.Thread] = None
+        self._pid = 0
+
+    def submit(self, fn: Callable[[], None]) -> concurrent.futures.Future:
+        """Queues fn. Returns a future which is done once fn returned."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked process doesn't have the thread of its parent
+                self._pid = os.getpid()
+                self._pending.clear()
+                self._futures = []
+                self._thread = None
+            self._pending.append((fn, future))
+            self._futures.append(future)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="gem5art-results"
+                )
+                self._thread.start()
+        return future
+
+    def wait(self) -> None:
+        """Waits until everything queued so far is done. Raises the first
+        exception raised by any of it."""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def _loop(self) -> None:
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                fn, future = self._pending.popleft()
+            try:
+                fn()
+            except BaseException as e:
+                # Keep storing the results of the other runs
+                traceback.print_exc()
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+
+
+_results = ResultsQueue()
+
+
+def waitForResults() -> None:
+    """
+    Waits until the results of every run started by this process are
+    packaged and stored in the database.
+    """
+    _results.wait()
 
 
 class gem5Run:
@@ -457,19 +939,30 @@ class gem5Run:
         d = self._convertForJson(self._getSerializable())
         return json.dumps(d)
 
-    def _run(self, task: Any = None, cwd: str = ".") -> None:
+    def _run(
+        self,
+        task: Any = None,
+        cwd: str = ".",
+        packager: Optional[ResultsPackager] = None,
+        wait: bool = False,
+    ) -> None:
         """Actually run the test.
 
-        Calls Popen with the command to fork a new process.
-        Then, this function polls the process every 5 seconds to check if it
-        has finished or not. Each time it checks, it dumps the json info so
-        other applications can poll those files.
+        Calls Popen with the command to fork a new process, then waits for it
+        to finish while the RunMonitor kills it on timeout, kernel panic or
+        user defined failure. The json info is dumped each time the status of
+        the run changes so other applications can poll those files.
 
         task is the celery task that is running this gem5 instance.
 
         cwd is the directory to change to before running. This allows a server
         process to run in a different directory than the running process. Note
         that only the spawned process runs in the new directory.
+
+        packager is the ResultsPackager zipping the output directory, by
+        default one packaging everything. Unless wait is true, the results are
+        packaged and stored in the database in the background once the gem5
+        process exits; waitForResults() waits for them.
         """
         # Connect to the database
         db = artifact.getDBConnection()
@@ -490,48 +983,31 @@ class gem5Run:
         # Start running the gem5 command
         proc = subprocess.Popen(self.command, cwd=cwd)
 
+        self.status = "Running"
+        self.current_time = time.time()
+        self.pid = proc.pid
+        self.running = True
+        watch = _monitor.watch(self, proc)
+
         # Register handler in case this process is killed while the gem5
         # instance is running. Note: there's a bit of a race condition here,
         # but hopefully it's not a big deal
         def handler(signum, frame):
-            proc.kill()
-            self.kill_reason = "sigterm"
-            self.dumpJson("info.json")
-            # Note: We'll fall out of the while loop after this.
+            watch.kill("sigterm")
+            # Note: proc.wait() will return after this.
 
         # This makes it so if you term *this* process, it will actually kill
         # the subprocess and then this process will die.
         signal.signal(signal.SIGTERM, handler)
 
-        # Do this until the subprocess is done (successfully or not)
-        while proc.poll() is None:
-            self.status = "Running"
-            # Still running
-            self.current_time = time.time()
-            self.pid = proc.pid
-            self.running = True
-
-            if self.current_time - self.start_time > self.timeout:
-                proc.kill()
-                self.kill_reason = "timeout"
-
-            if self.checkKernelPanic():
-                proc.kill()
-                self.kill_reason = "kernel panic"
-
-            # Assigning a function/lambda to an object variable does not make
-            # the function/lambda become a bound one. Therefore, the
-            # user-defined function must pass `self` in.
-            # Here, mypy classifies self.check_failure() as a bound function,
-            # so we tell mypy to ignore it./
-            if self.check_failure(self):  # type: ignore
-                proc.kill()
-                self.kill_reason = "User defined kill"
-
+        with watch.lock:
             self.dumpJson("info.json")
 
-            # Check again in five seconds
-            time.sleep(5)
+        # Wait until the subprocess is done (successfully or not)
+        try:
+            proc.wait()
+        finally:
+            _monitor.unwatch(watch)
 
         print(f"Done running {' '.join(self.command)}")
 
@@ -547,62 +1023,100 @@ class gem5Run:
 
         self.dumpJson("info.json")
 
-        self.saveResults()
+        def store() -> None:
+            self.saveResults(packager=packager)
 
-        # Store current gem5 run in the database
-        db.put(self._id, self._getSerializable())
+            # Store current gem5 run in the database
+            db.put(self._id, self._getSerializable())
 
-        print(f"Done storing the results of {' '.join(self.command)}")
+            print(f"Done storing the results of {' '.join(self.command)}")
 
-    def run(self, task: Any = None, cwd: str = ".") -> None:
+        if wait:
+            store()
+        else:
+            # Free the caller to start its next run while this one's results
+            # are packaged
+            _results.submit(store)
+
+    def run(
+        self,
+        task: Any = None,
+        cwd: str = ".",
+        packager: Optional[ResultsPackager] = None,
+        wait: bool = False,
+    ) -> None:
         """Actually run the test.
 
-        Calls Popen with the command to fork a new process.
-        Then, this function polls the process every 5 seconds to check if it
-        has finished or not. Each time it checks, it dumps the json info so
-        other applications can poll those files.
+        Calls Popen with the command to fork a new process, then waits for it
+        to finish while the RunMonitor kills it on timeout, kernel panic or
+        user defined failure. The json info is dumped each time the status of
+        the run changes so other applications can poll those files.
 
         task is the celery task that is running this gem5 instance.
 
         cwd is the directory to change to before running. This allows a server
         process to run in a different directory than the running process. Note
         that only the spawned process runs in the new directory.
+
+        packager is the ResultsPackager zipping the output directory, by
+        default one packaging everything. Unless wait is true, the results are
+        packaged and stored in the database in the background once the gem5
+        process exits; waitForResults() waits for them.
         """
         # Check if the run is already in the database
         db = artifact.getDBConnection()
         if self.hash in db:
             print(f"Error: Have already run {self.command}. Exiting!")
             return
-        self._run(task, cwd)
-
-    def rerun(self, task: Any = None, cwd: str = ".") -> None:
+        self._run(task, cwd, packager, wait)
+
+    def rerun(
+        self,
+        task: Any = None,
+        cwd: str = ".",
+        packager: Optional[ResultsPackager] = None,
+        wait: bool = False,
+    ) -> None:
         """Rerun the test.
 
-        Calls Popen with the command to fork a new process.
-        Then, this function polls the process every 5 seconds to check if it
-        has finished or not. Each time it checks, it dumps the json info so
-        other applications can poll those files.
+        Calls Popen with the command to fork a new process, then waits for it
+        to finish while the RunMonitor kills it on timeout, kernel panic or
+        user defined failure. The json info is dumped each time the status of
+        the run changes so other applications can poll those files.
 
         task is the celery task that is running this gem5 instance.
 
         cwd is the directory to change to before running. This allows a server
         process to run in a different directory than the running process. Note
         that only the spawned process runs in the new directory.
+
+        packager is the ResultsPackager zipping the output directory, by
+        default one packaging everything. Unless wait is true, the results are
+        packaged and stored in the database in the background once the gem5
+        process exits; waitForResults() waits for them.
         """
         # TODO: remove the old runs?
-        self._run(task, cwd)
-
-    def saveResults(self) -> None:
+        self._run(task, cwd, packager, wait)
+
+    def saveResults(
+        self,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        jobs: Optional[int] = None,
+        packager: Optional[ResultsPackager] = None,
+    ) -> None:
         """Zip up the output directory and store the results in the
-        database."""
+        database.
 
-        with zipfile.ZipFile(
-            self.outdir / "results.zip", "w", zipfile.ZIP_DEFLATED
-        ) as zipf:
-            for path in self.outdir.glob("**/*"):
-                if path.name == "results.zip":
-                    continue
-                zipf.write(path, path.relative_to(self.outdir.parent))
+        include and exclude are fnmatch patterns of the paths, relative to
+        the output directory, to package or not. By default everything is
+        packaged. jobs is the number of threads compressing large files.
+        Instead, packager is the ResultsPackager to use.
+        """
+
+        if packager is None:
+            packager = ResultsPackager(include, exclude, jobs)
+        packager.package(self.outdir, self.outdir / "results.zip")
 
         self.results = Artifact.registerArtifact(
             command=f"zip results.zip -r {self.outdir}",
@@ -26,14 +26,27 @@
 
 """Tests for gem5Run object"""
 
+import gzip
 import hashlib
 import os
+import shutil
+import subprocess
+import tempfile
+import time
 import unittest
+import zipfile
 from pathlib import Path
+from unittest import mock
 from uuid import uuid4
 
 from gem5art.artifact import artifact
-from gem5art.run import gem5Run
+from gem5art.run import (
+    ResultsPackager,
+    ResultsQueue,
+    RunMonitor,
+    TerminalTail,
+    gem5Run,
+)
 
 
 class TestSERun(unittest.TestCase):
@@ -120,5 +133,159 @@ class TestSERun(unittest.TestCase):
         )
 
 
+class TestRunMonitor(unittest.TestCase):
+    class FakeRun:
+        def __init__(self, outdir, timeout):
+            self.outdir = Path(outdir)
+            self.start_time = time.time()
+            self.timeout = timeout
+            self.kill_reason = ""
+            self.dumps = 0
+
+        def check_failure(self, run):
+            return False
+
+        def dumpJson(self, filename):
+            self.dumps += 1
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.monitor = RunMonitor()
+        self.monitor.check_interval = 0.05
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_timeout(self):
+        run = self.FakeRun(self.outdir, timeout=0.1)
+        proc = subprocess.Popen(["sleep", "10"])
+        watch = self.monitor.watch(run, proc)
+        proc.wait(timeout=5)
+        self.monitor.unwatch(watch)
+        self.assertEqual("timeout", run.kill_reason)
+        self.assertEqual(1, run.dumps)
+
+    def test_kernel_panic(self):
+        run = self.FakeRun(self.outdir, timeout=60)
+        proc = subprocess.Popen(["sleep", "10"])
+        watch = self.monitor.watch(run, proc)
+        with open(Path(self.outdir) / "system.pc.com_1.device", "w") as f:
+            f.write("Booting\nKernel panic - not syncing\n")
+        proc.wait(timeout=5)
+        self.monitor.unwatch(watch)
+        self.assertEqual("kernel panic", run.kill_reason)
+
+    def test_terminal_tail(self):
+        path = Path(self.outdir) / "system.pc.com_1.device"
+        tail = TerminalTail(path)
+        self.assertFalse(tail.update())
+        with open(path, "w") as f:
+            f.write("Kernel panic\nstill running")
+        self.assertTrue(tail.update())
+        self.assertFalse(tail.hasKernelPanic())
+        self.assertFalse(tail.update())
+        with open(path, "a") as f:
+            f.write("\nKernel panic - not syncing")
+        self.assertTrue(tail.update())
+        self.assertTrue(tail.hasKernelPanic())
+
+    def test_terminal_tail_lines(self):
+        # Complete lines written between updates are not joined
+        path = Path(self.outdir) / "system.pc.com_1.device"
+        tail = TerminalTail(path)
+        for line in ("line one\n", "line two\n", "Kernel\n", " panic? no\n"):
+            with open(path, "a") as f:
+                f.write(line)
+            self.assertTrue(tail.update())
+            self.assertEqual(line.rstrip("\n").encode(), tail.last_line)
+            self.assertFalse(tail.hasKernelPanic())
+        self.assertEqual(b"", tail.partial)
+
+        # A line written in pieces is put back together
+        for piece in ("Kernel ", "panic - not syncing"):
+            with open(path, "a") as f:
+                f.write(piece)
+            self.assertTrue(tail.update())
+        self.assertTrue(tail.hasKernelPanic())
+        with open(path, "a") as f:
+            f.write("\n")
+        self.assertTrue(tail.update())
+        self.assertTrue(tail.hasKernelPanic())
+
+
+class TestResultsPackager(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.outdir = self.tmpdir / "out"
+        (self.outdir / "sub").mkdir(parents=True)
+        with open(self.outdir / "stats.txt", "w") as f:
+            for i in range(20000):
+                f.write(f"system.cpu.stat{i % 97} {i}\n")
+        with gzip.open(self.outdir / "sub" / "store0.pmem", "wb") as f:
+            f.write(os.urandom(1000))
+        (self.outdir / "sub" / "debug.trace").write_text("trace")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_package(self):
+        self._checkPackage()
+
+    def test_package_serial(self):
+        # Where the zipfile compressor can't be swapped, large files are
+        # deflated by zipfile itself
+        with mock.patch("gem5art.run._SWAP_COMPRESSOR", False):
+            self._checkPackage()
+
+    def _checkPackage(self):
+        packager = ResultsPackager(exclude=["*.trace"], jobs=2)
+        packager.chunk_size = 16 * 1024
+        zip_path = self.outdir / "results.zip"
+        md5sum = packager.package(self.outdir, zip_path)
+
+        self.assertEqual(
+            md5sum, hashlib.md5(zip_path.read_bytes()).hexdigest()
+        )
+        with zipfile.ZipFile(zip_path) as zipf:
+            self.assertIsNone(zipf.testzip())
+            self.assertEqual(
+                (self.outdir / "stats.txt").read_bytes(),
+                zipf.read("out/stats.txt"),
+            )
+            self.assertEqual(
+                zipfile.ZIP_STORED,
+                zipf.getinfo("out/sub/store0.pmem").compress_type,
+            )
+            self.assertNotIn("out/sub/debug.trace", zipf.namelist())
+
+
+class TestResultsQueue(unittest.TestCase):
+    def test_order(self):
+        queue = ResultsQueue()
+        done = []
+        for i in range(5):
+            queue.submit(lambda i=i: (time.sleep(0.01), done.append(i)))
+        self.assertLess(len(done), 5)
+        queue.wait()
+        self.assertEqual(list(range(5)), done)
+
+    def test_exception(self):
+        queue = ResultsQueue()
+        done = []
+
+        def fail():
+            raise ValueError("no results")
+
+        with mock.patch("traceback.print_exc"):
+            future = queue.submit(fail)
+            queue.submit(lambda: done.append(True))
+            with self.assertRaises(ValueError):
+                queue.wait()
+        self.assertIsInstance(future.exception(), ValueError)
+        self.assertEqual([True], done)
+        # The failure is only raised once
+        queue.wait()
+
+
 if __name__ == "__main__":
     unittest.main()
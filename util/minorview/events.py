@@ -0,0 +1,294 @@
+# Copyright (c) 2013 ARM Limited
+# All rights reserved
+#
+# The license below extends only to copyright in the software and shall
+# not be construed as granting a license to any other intellectual
+# property including but not limited to intellectual property relating
+# to a hardware implementation of the functionality of the software
+# licensed hereunder.  You may use the software subject to the license
+# terms below provided that you ensure that this notice is replicated
+# unmodified and in its entirety in all distributions of the software,
+# modified or unmodified, in source code or in binary form.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Compact index of the events in a MinorTrace file.
+
+The index records, for every unit, the time of each of its unique events
+and the file offsets of the MinorTrace line and of the comment lines
+that make up that event, plus the offsets of every MinorInst and
+MinorLine line sorted by id.  Events are only parsed from the file when
+they are looked at, so the model never holds more than a window of them.
+
+The index is built in one pass over the trace and saved next to it as
+<trace>.mvidx, to be reused as long as the trace does not change."""
+
+import array
+import heapq
+import os
+import pickle
+import re
+from bisect import (
+    bisect_left,
+    bisect_right,
+)
+
+index_version = 1
+
+match_line_re = re.compile(rb"^\s*(\d+):\s*([\w\.]+):\s*(Minor\w+:)?\s*(.*)$")
+id_re = re.compile(rb"(?:^|\s)id=(\S+)")
+
+
+def split_line(line):
+    """Split a trace line into (time, unit, line_type, rest) or return
+    None if it is not an event line"""
+    match = match_line_re.match(line)
+    if match is None:
+        return None
+    time, unit, line_type, rest = match.groups()
+    return (
+        int(time),
+        unit.decode(),
+        line_type.decode() if line_type is not None else None,
+        rest.decode(errors="replace"),
+    )
+
+
+def merge_times(ranges):
+    """Merge sorted sequences of times into a sorted array of the unique
+    times, without making a Python object of every time"""
+    ret = array.array("q")
+    for time in heapq.merge(*ranges):
+        if len(ret) == 0 or ret[-1] != time:
+            ret.append(time)
+    return ret
+
+
+class UnitEvents:
+    """Events of a single unit.  Event i happens at times[i], takes its
+    MinorTrace data from the line at offset traces[i] (or has none if
+    that is -1) and has the comment lines at offsets
+    comments[firstComment[i]:firstComment[i + 1]]"""
+
+    def __init__(self):
+        self.times = array.array("q")
+        self.traces = array.array("q")
+        self.firstComment = array.array("q", [0])
+        self.comments = array.array("q")
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, time, trace):
+        self.times.append(time)
+        self.traces.append(trace)
+        self.firstComment.append(len(self.comments))
+
+    def add_comment(self, offset):
+        self.comments.append(offset)
+        self.firstComment[-1] = len(self.comments)
+
+    def comment_offsets(self, index):
+        return self.comments[
+            self.firstComment[index] : self.firstComment[index + 1]
+        ]
+
+    def find_index(self, time, lo=0, hi=None):
+        """Index of the last event at or before time in [lo, hi), or
+        None"""
+        if hi is None:
+            hi = len(self.times)
+        index = bisect_right(self.times, time, lo, hi) - 1
+        if index < lo:
+            return None
+        return index
+
+
+class EventIndex:
+    """Index of the events, instructions and lines of a trace file"""
+
+    def __init__(self):
+        self.units = {}
+        # Parallel arrays sorted by (fetchSeqNum, execSeqNum, file order)
+        self.instFetch = array.array("q")
+        self.instExec = array.array("q")
+        self.instOffsets = array.array("q")
+        # Parallel arrays sorted by (lineSeqNum, file order)
+        self.lineSeqNums = array.array("q")
+        self.lineOffsets = array.array("q")
+        self.minorTraceLineCount = 0
+        self.numEvents = 0
+
+    @staticmethod
+    def index_filename(filename):
+        return filename + ".mvidx"
+
+    @staticmethod
+    def signature(filename, unitNamePrefix):
+        st = os.stat(filename)
+        return (index_version, st.st_size, st.st_mtime_ns, unitNamePrefix)
+
+    @classmethod
+    def load(class_, filename, unitNamePrefix, parse_id):
+        """Load the index of filename, building and saving it if there is
+        no up-to-date one"""
+        signature = class_.signature(filename, unitNamePrefix)
+        index_filename = class_.index_filename(filename)
+        try:
+            with open(index_filename, "rb") as f:
+                if pickle.load(f) == signature:
+                    print("Reading index", index_filename)
+                    return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+
+        ret = class_.build(filename, unitNamePrefix, parse_id)
+        try:
+            with open(index_filename + ".tmp", "wb") as f:
+                pickle.dump(signature, f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(ret, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(index_filename + ".tmp", index_filename)
+        except OSError as e:
+            print("Can't write index", index_filename, e)
+        return ret
+
+    @classmethod
+    def build(class_, filename, unitNamePrefix, parse_id):
+        """Scan a trace file and index its events.  parse_id turns an id
+        string into an Id"""
+        ret = class_()
+        unit_re = re.compile("^" + unitNamePrefix + r"\.?(.*)$")
+        unit_names = {}
+
+        # A negative time will *always* be different from an event time
+        time = -1
+        last_time_lines = {}
+        comments = []
+        insts = []
+        lines = []
+
+        def update_comments():
+            # Attach the comments to the unit's event at this time if
+            #   there is one, or else to a new event at this time copying
+            #   the data of the unit's last event
+            for unit, offset in comments:
+                events = ret.unit(unit)
+                if len(events) == 0:
+                    events.add(time, -1)
+                elif events.times[-1] != time:
+                    events.add(time, events.traces[-1])
+                events.add_comment(offset)
+
+        print("Indexing file", filename)
+        with open(filename, "rb") as f:
+            offset = 0
+            for l in f:
+                line_offset = offset
+                offset += len(l)
+                match = match_line_re.match(l)
+                if match is None:
+                    continue
+
+                event_time, unit, line_type, rest = match.groups()
+                event_time = int(event_time)
+
+                if unit not in unit_names:
+                    unit_names[unit] = unit_re.sub(r"\1", unit.decode())
+                unit = unit_names[unit]
+
+                # When the time changes, resolve comments
+                if event_time != time:
+                    update_comments()
+                    comments = []
+                    time = event_time
+
+                if line_type is None:
+                    comments.append((unit, line_offset))
+                elif line_type == b"MinorTrace:":
+                    ret.minorTraceLineCount += 1
+
+                    # Only index this event if it's not the same as the
+                    #   last event we saw for this unit
+                    if last_time_lines.get(unit, None) != rest:
+                        ret.unit(unit).add(event_time, line_offset)
+                        last_time_lines[unit] = rest
+                elif line_type in (b"MinorInst:", b"MinorLine:"):
+                    id_match = id_re.search(rest)
+                    if id_match is None:
+                        continue
+                    id = parse_id(id_match.group(1).decode())
+                    if line_type == b"MinorInst:":
+                        insts.append(
+                            (id.fetchSeqNum, id.execSeqNum, line_offset)
+                        )
+                    else:
+                        lines.append((id.lineSeqNum, line_offset))
+
+        update_comments()
+
+        # Sort stability keeps the file order of entries with equal ids
+        insts.sort(key=lambda inst: inst[0:2])
+        for fetch, exec, offset in insts:
+            ret.instFetch.append(fetch)
+            ret.instExec.append(exec)
+            ret.instOffsets.append(offset)
+        lines.sort(key=lambda line: line[0])
+        for seq_num, offset in lines:
+            ret.lineSeqNums.append(seq_num)
+            ret.lineOffsets.append(offset)
+
+        ret.numEvents = sum(len(events) for events in ret.units.values())
+        return ret
+
+    def unit(self, unit):
+        if unit not in self.units:
+            self.units[unit] = UnitEvents()
+        return self.units[unit]
+
+    def find_inst_offset(self, fetchSeqNum, execSeqNum):
+        """Offset of the MinorInst line for an instruction either as a
+        microop or macroop, or None.  As when instructions were kept in a
+        dict, the last definition of an id wins and a macroop with no
+        definition of its own is represented by its first microop"""
+        lo = bisect_left(self.instFetch, fetchSeqNum)
+        hi = bisect_right(self.instFetch, fetchSeqNum)
+        if lo == hi:
+            return None
+
+        exec_hi = bisect_right(self.instExec, execSeqNum, lo, hi)
+        if exec_hi > lo and self.instExec[exec_hi - 1] == execSeqNum:
+            return self.instOffsets[exec_hi - 1]
+
+        macroop_hi = bisect_right(self.instExec, 0, lo, hi)
+        if macroop_hi > lo:
+            return self.instOffsets[macroop_hi - 1]
+        else:
+            return min(self.instOffsets[lo:hi])
+
+    def find_line_offset(self, lineSeqNum):
+        """Offset of the MinorLine line for a line, or None"""
+        hi = bisect_right(self.lineSeqNums, lineSeqNum)
+        if hi > 0 and self.lineSeqNums[hi - 1] == lineSeqNum:
+            return self.lineOffsets[hi - 1]
+        return None
@@ -33,8 +33,13 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import array
 import os
 import re
+from bisect import (
+    bisect_left,
+    bisect_right,
+)
 from time import time as wall_time
 
 from . import (
@@ -43,6 +48,11 @@ from . import (
     parse,
 )
 from .colours import unknownColour
+from .events import (
+    EventIndex,
+    merge_times,
+    split_line,
+)
 from .point import Point
 
 id_parts = "TSPLFE"
@@ -638,18 +648,39 @@ class BlobModel:
         self.picSize = Point(20, 10)
         self.lastTime = 0
         self.unitNamePrefix = unitNamePrefix
+        # Index of the loaded events file and the file itself, events are
+        #   read from it on demand
+        self.eventIndex = None
+        self.eventFile = None
+        # Number of time indices around the viewed time to keep parsed
+        self.windowSize = 1000
 
     def clear_events(self):
         """Drop all events and times"""
         self.lastTime = 0
-        self.times = []
+        self.times = array.array("q")
         self.insts = {}
         self.lines = {}
         self.numEvents = 0
+        self.clear_window()
+        # unit -> (first, last + 1) indices of its indexed events between
+        #   the start and end times
+        self.unitRanges = {}
 
         for unit, events in self.unitEvents.items():
             self.unitEvents[unit] = []
 
+    def clear_window(self):
+        """Drop the parsed events, instructions and lines"""
+        self.windowStart = None
+        self.windowEnd = None
+        # unit -> {event index: BlobEvent}
+        self.windowEvents = {}
+        # MinorTrace line offset -> (pairs, visuals)
+        self.parsedTraces = {}
+        # MinorInst/MinorLine line offset -> Inst/Line
+        self.parsedObjs = {}
+
     def add_blob(self, blob):
         """Add a parsed blob to the model"""
         self.blobs.append(blob)
@@ -672,6 +703,11 @@ class BlobModel:
 
     def find_inst(self, id):
         """Find an instruction either as a microop or macroop"""
+        if self.eventIndex is not None:
+            return self.read_ided_obj(
+                self.eventIndex.find_inst_offset(id.fetchSeqNum, id.execSeqNum)
+            )
+
         macroop_key = (id.fetchSeqNum, 0)
         full_key = (id.fetchSeqNum, id.execSeqNum)
 
@@ -709,6 +745,11 @@ class BlobModel:
 
     def find_line(self, id):
         """Find a line by id"""
+        if self.eventIndex is not None:
+            return self.read_ided_obj(
+                self.eventIndex.find_line_offset(id.lineSeqNum)
+            )
+
         key = id.lineSeqNum
         return self.lines.get(key, None)
 
@@ -717,7 +758,7 @@ class BlobModel:
     ):
         """Find an event by binary search on time indices"""
         while lower_index <= upper_index:
-            pivot = (upper_index + lower_index) / 2
+            pivot = (upper_index + lower_index) // 2
             pivotEvent = events[pivot]
             event_equal = pivotEvent.time == time or (
                 pivotEvent.time < time
@@ -742,7 +783,26 @@ class BlobModel:
 
     def find_unit_event_by_time(self, unit, time):
         """Find the last event for the given unit at time <= time"""
-        if unit in self.unitEvents:
+        if self.eventIndex is not None:
+            if unit not in self.unitRanges:
+                return None
+            lo, hi = self.unitRanges[unit]
+            index = self.eventIndex.units[unit].find_index(time, lo, hi)
+            if index is None:
+                return None
+
+            if (
+                self.windowStart is None
+                or time < self.windowStart
+                or (self.windowEnd is not None and time > self.windowEnd)
+            ):
+                self.load_window(time)
+
+            window = self.windowEvents.setdefault(unit, {})
+            if index not in window:
+                window[index] = self.read_event(unit, index)
+            return window[index]
+        elif unit in self.unitEvents:
             events = self.unitEvents[unit]
             ret = self.find_event_bisection(
                 unit, time, events, 0, len(events) - 1
@@ -755,14 +815,88 @@ class BlobModel:
     def find_time_index(self, time):
         """Find a time index close to the given time (where
         times[return] <= time and times[return+1] > time"""
-        ret = 0
-        lastIndex = len(self.times) - 1
-        while ret < lastIndex and self.times[ret + 1] <= time:
-            ret += 1
-        return ret
+        return max(bisect_right(self.times, time) - 1, 0)
+
+    def read_line(self, offset):
+        """Read the events file line at the given offset as (time, unit,
+        line_type, rest)"""
+        self.eventFile.seek(offset)
+        return split_line(self.eventFile.readline())
+
+    def read_event(self, unit, index):
+        """Parse the indexed event of a unit from the events file"""
+        events = self.eventIndex.units[unit]
+        event = BlobEvent(unit, events.times[index], {})
+
+        trace = events.traces[index]
+        if trace >= 0:
+            if trace not in self.parsedTraces:
+                pairs = parse.parse_pairs(self.read_line(trace)[3])
+                visuals = {}
+
+                # Try to decode the colour data for this event
+                blobs = self.unitNameToBlobs.get(unit, [])
+                for blob in blobs:
+                    if blob.visualDecoder is not None:
+                        visuals[blob.picChar] = blob.visualDecoder(pairs)
+                self.parsedTraces[trace] = (pairs, visuals)
+
+            event.pairs, visuals = self.parsedTraces[trace]
+            event.visuals = dict(visuals)
+
+        for offset in events.comment_offsets(index):
+            event.comments.append(self.read_line(offset)[3])
+        return event
+
+    def read_ided_obj(self, offset):
+        """Parse the MinorInst or MinorLine line at the given offset"""
+        if offset is None:
+            return None
+        if offset not in self.parsedObjs:
+            _, _, line_type, rest = self.read_line(offset)
+            if line_type == "MinorInst:":
+                obj = self.parse_minor_inst(rest)
+            else:
+                obj = self.parse_minor_line(rest)
+            self.parsedObjs[offset] = obj
+        return self.parsedObjs[offset]
+
+    def load_window(self, time):
+        """Parse the events of all units for windowSize time indices
+        around the given time, dropping those parsed before"""
+        self.clear_window()
+        if len(self.times) == 0:
+            return
+
+        timeIndex = self.find_time_index(time)
+        startIndex = max(timeIndex - self.windowSize // 2, 0)
+        endIndex = timeIndex + self.windowSize // 2
+        self.windowStart = self.times[startIndex]
+        if endIndex < len(self.times) - 1:
+            self.windowEnd = self.times[endIndex]
+        else:
+            # Every later time is past the last event
+            self.windowEnd = None
+
+        for unit, (lo, hi) in self.unitRanges.items():
+            events = self.eventIndex.units[unit]
+            first = events.find_index(self.windowStart, lo, hi)
+            if first is None:
+                first = lo
+            if self.windowEnd is None:
+                last = hi - 1
+            else:
+                last = events.find_index(self.windowEnd, lo, hi)
+                if last is None:
+                    continue
 
-    def add_minor_inst(self, rest):
-        """Parse and add a MinorInst line to the model"""
+            self.windowEvents[unit] = {
+                index: self.read_event(unit, index)
+                for index in range(first, last + 1)
+            }
+
+    def parse_minor_inst(self, rest):
+        """Parse a MinorInst line into an Inst or InstFault, or None"""
         pairs = parse.parse_pairs(rest)
         other_pairs = dict(pairs)
 
@@ -778,17 +912,21 @@ class BlobModel:
             # Collapse unnecessary spaces in disassembly
             disassembly = re.sub("  *", " ", re.sub("^ *", "", pairs["inst"]))
 
-            inst = Inst(id, disassembly, addr, other_pairs)
-            self.add_inst(inst)
+            return Inst(id, disassembly, addr, other_pairs)
         elif "fault" in other_pairs:
             del other_pairs["fault"]
 
-            inst = InstFault(id, pairs["fault"], addr, other_pairs)
+            return InstFault(id, pairs["fault"], addr, other_pairs)
+        return None
 
+    def add_minor_inst(self, rest):
+        """Parse and add a MinorInst line to the model"""
+        inst = self.parse_minor_inst(rest)
+        if inst is not None:
             self.add_inst(inst)
 
-    def add_minor_line(self, rest):
-        """Parse and add a MinorLine line to the model"""
+    def parse_minor_line(self, rest):
+        """Parse a MinorLine line into a Line or LineFault, or None"""
         pairs = parse.parse_pairs(rest)
         other_pairs = dict(pairs)
 
@@ -804,143 +942,69 @@ class BlobModel:
             paddr = int(pairs["paddr"], 0)
             size = int(pairs["size"], 0)
 
-            self.add_line(Line(id, vaddr, paddr, size, other_pairs))
+            return Line(id, vaddr, paddr, size, other_pairs)
         elif "fault" in other_pairs:
             del other_pairs["fault"]
 
-            self.add_line(LineFault(id, pairs["fault"], vaddr, other_pairs))
+            return LineFault(id, pairs["fault"], vaddr, other_pairs)
+        return None
+
+    def add_minor_line(self, rest):
+        """Parse and add a MinorLine line to the model"""
+        line = self.parse_minor_line(rest)
+        if line is not None:
+            self.add_line(line)
 
     def load_events(self, file, startTime=0, endTime=None):
-        """Load an event file and add everything to this model"""
-
-        def update_comments(comments, time):
-            # Add a list of comments to an existing event, if there is one at
-            #   the given time, or create a new, correctly-timed, event from
-            #   the last event and attach the comments to that
-            for commentUnit, commentRest in comments:
-                event = self.find_unit_event_by_time(commentUnit, time)
-                # Find an event to which this comment can be attached
-                if event is None:
-                    # No older event, make a new empty one
-                    event = BlobEvent(commentUnit, time, {})
-                    self.add_unit_event(event)
-                elif event.time != time:
-                    # Copy the old event and make a new one with the right
-                    #   time and comment
-                    newEvent = BlobEvent(commentUnit, time, event.pairs)
-                    newEvent.visuals = dict(event.visuals)
-                    event = newEvent
-                    self.add_unit_event(event)
-                event.comments.append(commentRest)
-
+        """Index an event file and make the events of the picture's units
+        between startTime and endTime available to this model.  The
+        events themselves are only parsed from the file as they are
+        looked at"""
         self.clear_events()
 
-        # A negative time will *always* be different from an event time
-        time = -1
-        time_events = {}
-        last_time_lines = {}
-        minor_trace_line_count = 0
-        comments = []
-
-        default_colour = [[colours.unknownColour]]
-        next_progress_print_event_count = 1000
-
         if not os.access(file, os.R_OK):
             print("Can't open file", file)
             exit(1)
         else:
             print("Opening file", file)
 
-        f = open(file)
-
         start_wall_time = wall_time()
 
-        # Skip leading events
-        still_skipping = True
-        l = f.readline()
-        while l and still_skipping:
-            match = re.match(r"^\s*(\d+):", l)
-            if match is not None:
-                event_time = match.groups()
-                if int(event_time[0]) >= startTime:
-                    still_skipping = False
-                else:
-                    l = f.readline()
-            else:
-                l = f.readline()
-
-        match_line_re = re.compile(
-            r"^\s*(\d+):\s*([\w\.]+):\s*(Minor\w+:)?\s*(.*)$"
+        self.eventIndex = EventIndex.load(
+            file, self.unitNamePrefix, lambda string: Id().from_string(string)
         )
-
-        # Parse each line of the events file, accumulating comments to be
-        #   attached to MinorTrace events when the time changes
-        reached_end_time = False
-        while not reached_end_time and l:
-            match = match_line_re.match(l)
-            if match is not None:
-                event_time, unit, line_type, rest = match.groups()
-                event_time = int(event_time)
-
-                unit = re.sub(
-                    "^" + self.unitNamePrefix + r"\.?(.*)$", "\\1", unit
-                )
-
-                # When the time changes, resolve comments
-                if event_time != time:
-                    if self.numEvents > next_progress_print_event_count:
-                        print("Parsed to time: %d" % event_time)
-                        next_progress_print_event_count = self.numEvents + 1000
-                    update_comments(comments, time)
-                    comments = []
-                    time = event_time
-
-                if line_type is None:
-                    # Treat this line as just a 'comment'
-                    comments.append((unit, rest))
-                elif line_type == "MinorTrace:":
-                    minor_trace_line_count += 1
-
-                    # Only insert this event if it's not the same as
-                    #   the last event we saw for this unit
-                    if last_time_lines.get(unit, None) != rest:
-                        event = BlobEvent(unit, event_time, {})
-                        pairs = parse.parse_pairs(rest)
-                        event.pairs = pairs
-
-                        # Try to decode the colour data for this event
-                        blobs = self.unitNameToBlobs.get(unit, [])
-                        for blob in blobs:
-                            if blob.visualDecoder is not None:
-                                event.visuals[
-                                    blob.picChar
-                                ] = blob.visualDecoder(pairs)
-
-                        self.add_unit_event(event)
-                        last_time_lines[unit] = rest
-                elif line_type == "MinorInst:":
-                    self.add_minor_inst(rest)
-                elif line_type == "MinorLine:":
-                    self.add_minor_line(rest)
-
-            if endTime is not None and time > endTime:
-                reached_end_time = True
-
-            l = f.readline()
-
-        update_comments(comments, time)
-        self.extract_times()
-        f.close()
+        if self.eventFile is not None:
+            self.eventFile.close()
+        self.eventFile = open(file, "rb")
+
+        ranges = []
+        for unit in self.unitEvents:
+            events = self.eventIndex.units.get(unit, None)
+            if events is None:
+                continue
+            lo = bisect_left(events.times, startTime)
+            if endTime is None:
+                hi = len(events)
+            else:
+                hi = bisect_right(events.times, endTime, lo)
+            self.unitRanges[unit] = (lo, hi)
+            ranges.append(memoryview(events.times)[lo:hi])
+            self.numEvents += hi - lo
+        self.times = merge_times(ranges)
+        if len(self.times) != 0:
+            self.lastTime = self.times[-1]
 
         end_wall_time = wall_time()
 
         print(
             "Total events:",
-            minor_trace_line_count,
+            self.eventIndex.minorTraceLineCount,
             "unique events:",
+            self.eventIndex.numEvents,
+            "shown events:",
             self.numEvents,
         )
-        print("Time to parse:", end_wall_time - start_wall_time)
+        print("Time to index:", end_wall_time - start_wall_time)
 
     def add_blob_picture(self, offset, pic, nameDict):
         """Add a parsed ASCII-art pipeline markup to the model"""
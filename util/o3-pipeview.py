@@ -38,8 +38,13 @@
 # Pipeline activity viewer for the O3 CPU model.
 
 import argparse
+import bisect
+import collections
 import copy
+import io
+import multiprocessing
 import os
+import struct
 import sys
 
 # Temporary storage for instructions. The queue is filled in out-of-order
@@ -65,6 +70,23 @@ insts = {
     "only_committed": 0,  # Set if only committed instructions are printed.
 }
 
+# Sidecar index of a trace, stored next to it as TRACE_FILE.idx. It holds an
+# entry every 'INDEX_STRIDE' instruction fetches so that a tick or sequence
+# number range can be opened with a seek instead of a scan from the start of
+# the trace. Each entry is the byte offset of a fetch line, its tick and
+# sequence number, and the largest tick and fetched sequence number of all
+# the lines before it. The latter two tell where a scan for the first line
+# at or after a given tick or sequence number can safely start.
+INDEX_MAGIC = b"O3PVIDX1"
+INDEX_STRIDE = 4096
+INDEX_HEADER = struct.Struct("<8sQQQ")  # magic, trace size, mtime, stride
+INDEX_ENTRY = struct.Struct("<QQQQQ")  # offset, tick, sn, max tick, max sn
+
+# The parallel parser splits the trace in chunks of at most this many bytes.
+# At most 2 chunks per process are in flight at once, so this bounds the
+# memory used.
+CHUNK_SIZE = 32 * 1024 * 1024
+
 
 def process_trace(
     trace,
@@ -125,31 +147,7 @@ def process_trace(
             return
         fields = line.split(":")
 
-    # Print header
-    outfile.write(
-        "// f = fetch, d = decode, n = rename, p = dispatch, "
-        "i = issue, c = complete, r = retire"
-    )
-
-    if store_completions:
-        outfile.write(", s = store-complete")
-    outfile.write("\n\n")
-
-    outfile.write(
-        " "
-        + "timeline".center(width)
-        + "   "
-        + "tick".center(15)
-        + "  "
-        + "pc.upc".center(12)
-        + "  "
-        + "disasm".ljust(25)
-        + "  "
-        + "seq_num".center(10)
-    )
-    if timestamps:
-        outfile.write("timestamps".center(25))
-    outfile.write("\n")
+    print_header(outfile, width, timestamps, store_completions)
 
     # Region of interest
     curr_inst = {}
@@ -207,6 +205,34 @@ def process_trace(
         fields = line.split(":")
 
 
+# Prints the legend and the column titles
+def print_header(outfile, width, timestamps, store_completions):
+    outfile.write(
+        "// f = fetch, d = decode, n = rename, p = dispatch, "
+        "i = issue, c = complete, r = retire"
+    )
+
+    if store_completions:
+        outfile.write(", s = store-complete")
+    outfile.write("\n\n")
+
+    outfile.write(
+        " "
+        + "timeline".center(width)
+        + "   "
+        + "tick".center(15)
+        + "  "
+        + "pc.upc".center(12)
+        + "  "
+        + "disasm".ljust(25)
+        + "  "
+        + "seq_num".center(10)
+    )
+    if timestamps:
+        outfile.write("timestamps".center(25))
+    outfile.write("\n")
+
+
 # Puts new instruction into the print queue.
 # Sorts out and prints instructions when their number reaches threshold value
 def queue_inst(
@@ -242,30 +268,8 @@ def print_insts(
     insts["queue"].sort(key=lambda inst: inst["sn"])
     while len(insts["queue"]) > lower_threshold:
         print_item = insts["queue"].pop(0)
-        # As the instructions are processed out of order the main loop starts
-        # earlier then specified by start_sn/tick and finishes later then what
-        # is defined in stop_sn/tick.
-        # Therefore, here we have to filter out instructions that reside out of
-        # the specified boundaries.
-        if insts["sn_start"] > 0 and print_item["sn"] < insts["sn_start"]:
+        if not in_range(print_item):
             continue
-            # earlier then the starting sequence number
-        if insts["sn_stop"] > 0 and print_item["sn"] > insts["sn_stop"]:
-            continue
-            # later then the ending sequence number
-        if (
-            insts["tick_start"] > 0
-            and print_item["fetch"] < insts["tick_start"]
-        ):
-            continue
-            # earlier then the starting tick number
-        if insts["tick_stop"] > 0 and print_item["fetch"] > insts["tick_stop"]:
-            continue
-            # later then the ending tick number
-
-        if insts["only_committed"] != 0 and print_item["retire"] == 0:
-            continue
-            # retire is set to zero if it hasn't been completed
         print_inst(
             outfile,
             print_item,
@@ -277,6 +281,49 @@ def print_insts(
         )
 
 
+# Checks whether an instruction has to be printed
+def in_range(inst):
+    # As the instructions are processed out of order the main loop starts
+    # earlier then specified by start_sn/tick and finishes later then what
+    # is defined in stop_sn/tick.
+    # Therefore, here we have to filter out instructions that reside out of
+    # the specified boundaries.
+    if insts["sn_start"] > 0 and inst["sn"] < insts["sn_start"]:
+        return False
+        # earlier then the starting sequence number
+    if insts["sn_stop"] > 0 and inst["sn"] > insts["sn_stop"]:
+        return False
+        # later then the ending sequence number
+    if insts["tick_start"] > 0 and inst["fetch"] < insts["tick_start"]:
+        return False
+        # earlier then the starting tick number
+    if insts["tick_stop"] > 0 and inst["fetch"] > insts["tick_stop"]:
+        return False
+        # later then the ending tick number
+
+    if insts["only_committed"] != 0 and inst["retire"] == 0:
+        return False
+        # retire is set to zero if it hasn't been completed
+    return True
+
+
+# Puts an instruction rendered by a worker of the parallel parser into the
+# print queue. The queue is sorted out exactly as for queue_inst() so that
+# the output does not depend on the number of workers.
+def queue_rendered(outfile, inst, lower_threshold=None):
+    global insts
+    if inst is not None:
+        insts["queue"].append(inst)
+        if len(insts["queue"]) <= insts["max_threshold"]:
+            return
+        lower_threshold = insts["min_threshold"]
+    insts["queue"].sort(key=lambda inst: inst["sn"])
+    while len(insts["queue"]) > lower_threshold:
+        print_item = insts["queue"].pop(0)
+        if print_item["text"] is not None:
+            outfile.write(print_item["text"])
+
+
 # Prints a single instruction
 def print_inst(
     outfile, inst, cycle_time, width, color, timestamps, store_completions
@@ -431,6 +478,332 @@ def print_inst(
             outfile.write("...".center(12) + "\n")
 
 
+# Returns the offset of the first fetch line at or after 'offset', or 'end'
+# if there is none before it. 'offset' may point into the middle of a line.
+def align_to_fetch(trace, offset, end):
+    trace.seek(offset)
+    if offset > 0:
+        trace.seek(offset - 1)
+        offset += len(trace.readline()) - 1
+    while offset < end:
+        line = trace.readline()
+        if not line:
+            break
+        if line.startswith(b"O3PipeView:fetch:"):
+            return offset
+        offset += len(line)
+    return end
+
+
+# Splits the bytes [start, end) of a trace in chunks starting at fetch lines
+def split_trace(path, start, end, num_chunks):
+    size = max(1, min(CHUNK_SIZE, (end - start) // max(1, num_chunks)))
+    bounds = [start]
+    with open(path, "rb") as trace:
+        while bounds[-1] < end:
+            bounds.append(align_to_fetch(trace, bounds[-1] + size, end))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# Scans the fetch lines of a chunk of the trace for the index. Returns the
+# entries of every 'stride'-th fetch of the chunk, with the maxima of the
+# lines before them within the chunk, and the maxima of the whole chunk.
+def index_chunk(task):
+    path, start, end, stride = task
+    entries = []
+    max_tick = 0
+    max_sn = 0
+    num_fetches = 0
+    offset = start
+    with open(path, "rb") as trace:
+        trace.seek(start)
+        for line in trace:
+            if offset >= end:
+                break
+            if line.startswith(b"O3PipeView:"):
+                fields = line.split(b":")
+                tick = int(fields[2])
+                if fields[1] == b"fetch":
+                    sn = int(fields[5])
+                    if num_fetches % stride == 0:
+                        entries.append((offset, tick, sn, max_tick, max_sn))
+                    num_fetches += 1
+                    max_sn = max(max_sn, sn)
+                max_tick = max(max_tick, tick)
+            offset += len(line)
+    return entries, max_tick, max_sn
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+# Builds the sidecar index of a trace, using 'jobs' processes
+def build_index(path, jobs):
+    size = os.path.getsize(path)
+    with open(path, "rb") as trace:
+        start = align_to_fetch(trace, 0, size)
+    tasks = [
+        (path, chunk_start, chunk_end, INDEX_STRIDE)
+        for chunk_start, chunk_end in split_trace(path, start, size, jobs)
+    ]
+    with multiprocessing.Pool(jobs) as pool:
+        chunks = pool.map(index_chunk, tasks)
+
+    # Make the maxima of each chunk relative to the start of the trace
+    index = []
+    max_tick = 0
+    max_sn = 0
+    for entries, chunk_max_tick, chunk_max_sn in chunks:
+        for offset, tick, sn, before_tick, before_sn in entries:
+            index.append(
+                (
+                    offset,
+                    tick,
+                    sn,
+                    max(max_tick, before_tick),
+                    max(max_sn, before_sn),
+                )
+            )
+        max_tick = max(max_tick, chunk_max_tick)
+        max_sn = max(max_sn, chunk_max_sn)
+
+    st = os.stat(path)
+    try:
+        with open(index_path(path), "wb") as f:
+            f.write(
+                INDEX_HEADER.pack(
+                    INDEX_MAGIC, st.st_size, st.st_mtime_ns, INDEX_STRIDE
+                )
+            )
+            for entry in index:
+                f.write(INDEX_ENTRY.pack(*entry))
+    except OSError as e:
+        print(f"Could not save the trace index: {e}", file=sys.stderr)
+    return index
+
+
+# Loads the sidecar index of a trace. Returns None if there is none or if
+# the trace changed since it was built.
+def load_index(path):
+    try:
+        with open(index_path(path), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < INDEX_HEADER.size:
+        return None
+    magic, size, mtime, _ = INDEX_HEADER.unpack_from(data)
+    st = os.stat(path)
+    if (magic, size, mtime) != (INDEX_MAGIC, st.st_size, st.st_mtime_ns):
+        return None
+    return list(INDEX_ENTRY.iter_unpack(data[INDEX_HEADER.size :]))
+
+
+# Returns the offset from which the trace has to be scanned to find the first
+# line at or after 'start_tick', or the first fetch at or after 'start_sn'
+def start_offset(index, start_tick, start_sn):
+    if start_tick != 0:
+        maxima = [entry[3] for entry in index]
+        i = bisect.bisect_left(maxima, start_tick) - 1
+    elif start_sn != 0:
+        maxima = [entry[4] for entry in index]
+        i = bisect.bisect_left(maxima, start_sn) - 1
+    else:
+        return 0
+    return index[i][0] if i >= 0 else 0
+
+
+# Returns an offset at which the region of interest is known to be over: the
+# first indexed fetch after 'start' that meets the stop condition
+def stop_offset(index, start, end, stop_tick, stop_sn):
+    for offset, tick, sn, _, _ in index:
+        if offset < start:
+            continue
+        if (stop_tick > 0 and tick > stop_tick + insts["tick_drift"]) or (
+            stop_sn > 0 and sn > stop_sn + insts["max_threshold"]
+        ):
+            return offset
+    return end
+
+
+# Skips lines up to the starting tick or sequence number, and then up to the
+# next instruction fetch, like process_trace(). Returns the offset of that
+# fetch line or None.
+def find_start(trace, offset, start_tick, start_sn):
+    trace.seek(offset)
+    line = b""
+    if start_tick != 0 or start_sn != 0:
+        while True:
+            offset += len(line)
+            line = trace.readline()
+            if not line:
+                return None
+            fields = line.split(b":")
+            if fields[0] != b"O3PipeView":
+                continue
+            if start_tick != 0 and int(fields[2]) >= start_tick:
+                break
+            if (
+                start_tick == 0
+                and fields[1] == b"fetch"
+                and int(fields[5]) >= start_sn
+            ):
+                break
+    while not line.startswith(b"O3PipeView:fetch:"):
+        offset += len(line)
+        line = trace.readline()
+        if not line:
+            return None
+    return offset
+
+
+# Parses and renders the instructions of a chunk of the trace. Returns the
+# instructions in trace order, and whether the stop condition was met.
+def render_chunk(task):
+    (
+        path,
+        start,
+        end,
+        cycle_time,
+        width,
+        color,
+        timestamps,
+        store_completions,
+        stop_tick,
+        stop_sn,
+    ) = task
+    rendered = []
+    curr_inst = {}
+    offset = start
+    with open(path, "rb") as trace:
+        trace.seek(start)
+        for line in trace:
+            if offset >= end:
+                break
+            offset += len(line)
+            if not line.startswith(b"O3PipeView:"):
+                continue
+            fields = line.decode().split(":")
+            curr_inst[fields[1]] = int(fields[2])
+            if fields[1] == "fetch":
+                if (
+                    stop_tick > 0
+                    and int(fields[2]) > stop_tick + insts["tick_drift"]
+                ) or (
+                    stop_sn > 0
+                    and int(fields[5]) > (stop_sn + insts["max_threshold"])
+                ):
+                    return rendered, True
+                (curr_inst["pc"], curr_inst["upc"]) = fields[3:5]
+                curr_inst["sn"] = int(fields[5])
+                curr_inst["disasm"] = " ".join(fields[6][:-1].split())
+            elif fields[1] == "retire":
+                if curr_inst["retire"] == 0:
+                    curr_inst["disasm"] = "-----" + curr_inst["disasm"]
+                if store_completions:
+                    curr_inst[fields[3]] = int(fields[4])
+                text = None
+                if in_range(curr_inst):
+                    out = io.StringIO()
+                    print_inst(
+                        out,
+                        curr_inst,
+                        cycle_time,
+                        width,
+                        color,
+                        timestamps,
+                        store_completions,
+                    )
+                    text = out.getvalue()
+                rendered.append({"sn": curr_inst["sn"], "text": text})
+    return rendered, False
+
+
+# Like pool.imap(), but only 'window' tasks are submitted ahead of the result
+# being consumed. imap() submits every task at once and buffers the results
+# that are done out of order, so the memory used grows with the trace.
+def imap_window(pool, func, tasks, window):
+    tasks = iter(tasks)
+    pending = collections.deque()
+    for task in tasks:
+        pending.append(pool.apply_async(func, (task,)))
+        if len(pending) == window:
+            break
+    while pending:
+        result = pending.popleft().get()
+        task = next(tasks, None)
+        if task is not None:
+            pending.append(pool.apply_async(func, (task,)))
+        yield result
+
+
+# Same as process_trace(), but the trace is split on instruction fetches and
+# the chunks are parsed and rendered by a pool of 'jobs' processes
+def process_trace_parallel(
+    path,
+    index,
+    outfile,
+    cycle_time,
+    width,
+    color,
+    timestamps,
+    committed_only,
+    store_completions,
+    start_tick,
+    stop_tick,
+    start_sn,
+    stop_sn,
+    jobs,
+):
+    global insts
+
+    insts["sn_start"] = start_sn
+    insts["sn_stop"] = stop_sn
+    insts["tick_start"] = start_tick
+    insts["tick_stop"] = stop_tick
+    insts["tick_drift"] = insts["tick_drift"] * cycle_time
+    insts["only_committed"] = committed_only
+
+    size = os.path.getsize(path)
+    offset = start_offset(index, start_tick, start_sn) if index else 0
+    with open(path, "rb") as trace:
+        start = find_start(trace, offset, start_tick, start_sn)
+    if start is None:
+        return
+    end = size
+    if index:
+        end = stop_offset(index, start, size, stop_tick, stop_sn)
+
+    print_header(outfile, width, timestamps, store_completions)
+
+    tasks = [
+        (
+            path,
+            chunk_start,
+            chunk_end,
+            cycle_time,
+            width,
+            color,
+            timestamps,
+            store_completions,
+            stop_tick,
+            stop_sn,
+        )
+        for chunk_start, chunk_end in split_trace(path, start, end, jobs * 4)
+    ]
+    # The workers inherit the range settings in 'insts' through fork()
+    with multiprocessing.get_context("fork").Pool(jobs) as pool:
+        for rendered, stopped in imap_window(
+            pool, render_chunk, tasks, 2 * jobs
+        ):
+            for inst in rendered:
+                queue_rendered(outfile, inst)
+            if stopped:
+                break
+    queue_rendered(outfile, None, 0)
+
+
 def validate_range(my_range):
     my_range = [int(i) for i in my_range.split(":")]
     if (
@@ -498,6 +871,19 @@ def main():
         default=False,
         help="additionally display store completion ticks",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of processes parsing and rendering the trace",
+    )
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        default=False,
+        help="do not build or use the TRACE_FILE.idx seek index",
+    )
     parser.add_argument("tracefile")
 
     args = parser.parse_args()
@@ -509,12 +895,21 @@ def main():
     if not inst_range:
         parser.error("invalid range")
         sys.exit(1)
+    # Load or build the seek index when only a window of the trace is needed
+    index = None
+    if not args.no_index and (tick_range != [0, -1] or inst_range != [0, -1]):
+        index = load_index(args.tracefile)
+        if index is None:
+            print("Indexing trace... ", end=" ")
+            index = build_index(args.tracefile, max(1, args.jobs))
+            print("done!")
     # Process trace
     print("Processing trace... ", end=" ")
-    with open(args.tracefile) as trace:
-        with open(args.outfile, "w") as out:
-            process_trace(
-                trace,
+    with open(args.outfile, "w") as out:
+        if args.jobs > 1:
+            process_trace_parallel(
+                args.tracefile,
+                index,
                 out,
                 args.cycle_time,
                 args.width,
@@ -523,7 +918,24 @@ def main():
                 args.only_committed,
                 args.store_completions,
                 *(tick_range + inst_range),
+                args.jobs,
             )
+        else:
+            with open(args.tracefile, "rb") as raw:
+                if index:
+                    raw.seek(start_offset(index, tick_range[0], inst_range[0]))
+                with io.TextIOWrapper(raw) as trace:
+                    process_trace(
+                        trace,
+                        out,
+                        args.cycle_time,
+                        args.width,
+                        args.color,
+                        args.timestamps,
+                        args.only_committed,
+                        args.store_completions,
+                        *(tick_range + inst_range),
+                    )
     print("done!")
 
 
@@ -68,9 +68,17 @@
 # with protobuf python messages. For eg, the decode scripts for different
 # types of proto objects can use the same function to decode a single message
 
+import csv
 import gzip
+import mmap
 import struct
 
+# Number of bytes read at once from compressed streams by readFrames()
+CHUNK_SIZE = 16 * 1024 * 1024
+
+# Number of messages per array yielded by messageArrays()
+BATCH_SIZE = 65536
+
 
 def openFileRd(in_file):
     """
@@ -135,7 +143,8 @@ def decodeMessage(in_file, message):
     """
     try:
         size, pos = _DecodeVarint32(in_file)
-        if size == 0:
+        # A zero size is an empty message, like in ProtoInputStream::read()
+        if pos == 0:
             return False
         buf = in_file.read(size)
         message.ParseFromString(buf)
@@ -144,6 +153,221 @@ def decodeMessage(in_file, message):
         return False
 
 
+def _decodeFrameHeader(buf, pos, end):
+    """
+    Decode the varint size prefix of the message at buf[pos:end], where buf
+    is a memoryview. Return (size, start of the message), or None if the
+    buffer ends before the varint does.
+    """
+    result = 0
+    shift = 0
+    while pos < end:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not (b & 0x80):
+            return (result & 0xFFFFFFFF, pos)
+        shift += 7
+        if shift >= 64:
+            raise OSError("Too many bytes when decoding varint.")
+    return None
+
+
+def _walkFrames(buf, pos):
+    """
+    Yield (start, end) of every complete message in the memoryview buf from
+    pos on, including empty ones. Return the position of the first
+    incomplete message.
+    """
+    end = len(buf)
+    while True:
+        header = _decodeFrameHeader(buf, pos, end)
+        if header is None:
+            return pos
+        size, start = header
+        if start + size > end:
+            return pos
+        yield (start, start + size)
+        pos = start + size
+
+
+def readFrames(proto_in, chunk_size=CHUNK_SIZE):
+    """
+    Generate memoryviews of the encoded messages remaining in a file opened
+    with openFileRd(), e.g. after its header was read with decodeMessage().
+
+    Uncompressed files are mapped in memory and walked in place. Gzipped
+    files are decompressed chunk_size bytes at a time. A memoryview is only
+    valid until the next one is generated.
+    """
+    if not isinstance(proto_in, gzip.GzipFile):
+        try:
+            buf = mmap.mmap(proto_in.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty files cannot be mapped
+            return
+        # The map is left to the garbage collector, as closing it fails
+        # while the caller still holds the last memoryview
+        view = memoryview(buf)
+        pos = proto_in.tell()
+        for start, end in _walkFrames(view, pos):
+            yield view[start:end]
+            pos = end
+        # Leave the file after the messages, as if they were read from it
+        proto_in.seek(pos)
+        return
+
+    leftover = b""
+    while True:
+        chunk = proto_in.read(chunk_size)
+        if not chunk:
+            return
+        data = leftover + chunk if leftover else chunk
+        view = memoryview(data)
+        frames = _walkFrames(view, 0)
+        try:
+            while True:
+                start, end = next(frames)
+                yield view[start:end]
+        except StopIteration as stop:
+            pos = stop.value
+        leftover = bytes(view[pos:])
+
+
+def decodeMessages(proto_in, message):
+    """
+    Generate the messages remaining in a file opened with openFileRd(). The
+    same message object is decoded into and yielded every time.
+    """
+    for frame in readFrames(proto_in):
+        message.ParseFromString(frame)
+        yield message
+
+
+def messageDtype(message, fields):
+    """
+    Return the NumPy structured dtype of the given fields of a message.
+    Repeated fields and strings are stored as Python objects.
+    """
+    import numpy as np
+    from google.protobuf.descriptor import FieldDescriptor
+
+    types = {
+        FieldDescriptor.CPPTYPE_INT32: np.int32,
+        FieldDescriptor.CPPTYPE_INT64: np.int64,
+        FieldDescriptor.CPPTYPE_UINT32: np.uint32,
+        FieldDescriptor.CPPTYPE_UINT64: np.uint64,
+        FieldDescriptor.CPPTYPE_DOUBLE: np.float64,
+        FieldDescriptor.CPPTYPE_FLOAT: np.float32,
+        FieldDescriptor.CPPTYPE_BOOL: np.bool_,
+        FieldDescriptor.CPPTYPE_ENUM: np.int32,
+    }
+    dtype = []
+    for name in fields:
+        field = message.DESCRIPTOR.fields_by_name[name]
+        # Newer protobuf releases replace 'label' with 'is_repeated'
+        if getattr(field, "is_repeated", None) or (
+            getattr(field, "label", None) == FieldDescriptor.LABEL_REPEATED
+        ):
+            dtype.append((name, object))
+        else:
+            dtype.append((name, types.get(field.cpp_type, object)))
+    return np.dtype(dtype)
+
+
+def messageArrays(proto_in, message, fields, batch_size=BATCH_SIZE):
+    """
+    Generate NumPy structured arrays holding the given fields of the
+    messages remaining in a file opened with openFileRd(), batch_size
+    messages at a time. Optional fields that are not set hold their
+    default value. Repeated fields hold a uint64 array per message, e.g.
+    the dependencies of an instruction dependency record.
+    """
+    import numpy as np
+
+    dtype = messageDtype(message, fields)
+    repeated = [dtype[name] == object for name in fields]
+    rows = []
+    for message in decodeMessages(proto_in, message):
+        rows.append(
+            tuple(
+                (
+                    np.fromiter(getattr(message, name), np.uint64)
+                    if is_repeated
+                    else getattr(message, name)
+                )
+                for name, is_repeated in zip(fields, repeated)
+            )
+        )
+        if len(rows) == batch_size:
+            yield np.array(rows, dtype=dtype)
+            rows = []
+    if rows:
+        yield np.array(rows, dtype=dtype)
+
+
+def writeTable(arrays, out_path):
+    """
+    Write the structured arrays generated by messageArrays() to out_path as
+    CSV, Parquet or NumPy .npy, depending on its extension. Repeated fields
+    are written as lists in Parquet and joined with ';' in CSV. Writing
+    Parquet needs pyarrow. Return the number of rows written.
+    """
+    import numpy as np
+
+    num_rows = 0
+    if out_path.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("Please install the Python pyarrow module to write Parquet")
+            exit(-1)
+        writer = None
+        for array in arrays:
+            table = pa.table(
+                {
+                    name: (
+                        pa.array(
+                            [list(v) for v in array[name]],
+                            pa.list_(pa.uint64()),
+                        )
+                        if array.dtype[name] == object
+                        else array[name]
+                    )
+                    for name in array.dtype.names
+                }
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(out_path, table.schema)
+            writer.write_table(table)
+            num_rows += len(array)
+        if writer is not None:
+            writer.close()
+    elif out_path.endswith(".npy"):
+        arrays = list(arrays)
+        num_rows = sum(len(array) for array in arrays)
+        np.save(out_path, np.concatenate(arrays) if arrays else arrays)
+    else:
+        with open(out_path, "w", newline="") as out:
+            writer = None
+            for array in arrays:
+                if writer is None:
+                    writer = csv.writer(out)
+                    writer.writerow(array.dtype.names)
+                columns = [
+                    (
+                        [";".join(map(str, v)) for v in array[name]]
+                        if array.dtype[name] == object
+                        else array[name].tolist()
+                    )
+                    for name in array.dtype.names
+                ]
+                writer.writerows(zip(*columns))
+                num_rows += len(array)
+    return num_rows
+
+
 def _EncodeVarint32(out_file, value):
     """
     The encoding of the Varint32 is copied from